@@ -0,0 +1,40 @@
+"""
+  Benchmark of DG-100 download and decode throughput, against a simulated device.
+  Reports decode throughput with no line limit, then download throughput at the device's baud rate with and without prefetching.
+  Usage: python benchmarks/dg100_download.py [tracks] [records per track]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ski.dg100 import stream_records
+from ski.processor import build_point_from_values
+from ski.simulator import BITS_PER_BYTE, SimulatedDevice
+
+BAUDRATE = 115200
+
+
+def run(tracks:int, records:int, baudrate:int=None, prefetch_tracks:int=1) -> tuple:
+    """Download and build points from a simulated device; returns points, bytes sent and elapsed seconds."""
+    device = SimulatedDevice.create(tracks, records, baudrate=baudrate)
+    start = time.perf_counter()
+    points = sum(1 for r in stream_records(device, prefetch_tracks=prefetch_tracks) if build_point_from_values(r['point']))
+    return points, device.bytes_sent, time.perf_counter() - start
+
+
+def report(label:str, points:int, bytes_sent:int, elapsed:float) -> None:
+    line_rate = BAUDRATE / BITS_PER_BYTE
+    print(f'{label:24} {points:>8d} {elapsed:>8.2f} {points / elapsed:>10.0f} {bytes_sent / elapsed / 1024:>8.1f} {bytes_sent / elapsed / line_rate * 100:>7.1f}%')
+
+
+if __name__ == '__main__':
+    tracks = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    records = int(sys.argv[2]) if len(sys.argv) > 2 else 64
+
+    print(f'{"MODE":24} {"POINTS":>8} {"SECS":>8} {"POINTS/S":>10} {"KiB/S":>8} {"LINE":>8}')
+    report('unthrottled', *run(tracks, records))
+    report(f'{BAUDRATE} baud', *run(tracks, records, BAUDRATE, prefetch_tracks=0))
+    report(f'{BAUDRATE} baud, prefetch', *run(tracks, records, BAUDRATE, prefetch_tracks=1))
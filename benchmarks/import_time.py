@@ -0,0 +1,59 @@
+"""
+  Benchmark of package import time.
+  Runs each import in a fresh interpreter and reports the median wall time, the slowest modules and any files created.
+  Usage: python benchmarks/import_time.py [runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = ['ski', 'ski.gsd', 'ski.processor', 'ski.dg100', 'ski.loader']
+
+
+def time_import(module:str, runs:int) -> float:
+    """Median wall time in ms to start an interpreter and import a module."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True, env=env)
+        timings.append((time.perf_counter() - start) * 1000.0)
+    return statistics.median(timings)
+
+
+def slowest_modules(module:str, top:int=5) -> list:
+    """Modules with the highest cumulative import time, as reported by -X importtime."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'], check=True, env=env, capture_output=True, text=True)
+    rows = []
+    for line in result.stderr.splitlines()[1:]:
+        parts = line.split('|')
+        if len(parts) == 3:
+            rows.append((int(parts[1]), parts[2].strip()))
+    return sorted(rows, reverse=True)[1:top + 1]
+
+
+def created_files(module:str) -> list:
+    """Files created in the working directory by importing a module."""
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    with tempfile.TemporaryDirectory() as cwd:
+        subprocess.run([sys.executable, '-c', f'import {module}'], check=True, env=env, cwd=cwd)
+        return os.listdir(cwd)
+
+
+if __name__ == '__main__':
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+
+    baseline = time_import('sys', runs)
+    print(f'{"interpreter":16} {baseline:8.1f} ms')
+
+    for m in MODULES:
+        print(f'{m:16} {time_import(m, runs) - baseline:8.1f} ms  files={created_files(m)}')
+        for us, name in slowest_modules(m):
+            print(f'{"":16} {us / 1000.0:8.1f} ms  {name}')
@@ -1,4 +0,0 @@
-from .logging import init as init_loggers
-
-# Init logs
-init_loggers()
\ No newline at end of file
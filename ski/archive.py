@@ -0,0 +1,118 @@
+"""
+  Module providing a local archive of tracks downloaded from a DG-100 data logger, so only new tracks need to be downloaded.
+"""
+
+import datetime
+import hashlib
+import json
+import logging
+import os
+
+from .dg100 import find_track, stream_track_payloads, track_key
+
+MANIFEST_FILE = 'manifest.json'
+TRACKS_DIR = 'tracks'
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+class TrackArchive:
+    """
+    Class holding raw track file payloads in a local directory, with a JSON manifest of the tracks held.
+    Each manifest entry records the track's header and the size and SHA-1 checksum of its payload.
+    """
+
+    def __init__(self, path:str) -> None:
+        self.path = path
+        self._manifest = None
+
+    @property
+    def manifest(self) -> dict:
+        """Manifest entries keyed by `track_key`, loaded when first used."""
+        if self._manifest is None:
+            manifest_path = os.path.join(self.path, MANIFEST_FILE)
+            if os.path.exists(manifest_path):
+                with open(manifest_path, 'r') as f:
+                    self._manifest = json.load(f)['tracks']
+                log.info('Loaded manifest of %d track(s) from %s', len(self._manifest), manifest_path)
+            else:
+                self._manifest = {}
+        return self._manifest
+
+    def add(self, header:dict, payload:bytes) -> bool:
+        """Add or replace a track's payload. Returns False if the archive already holds the same payload."""
+        key = track_key(header)
+        checksum = hashlib.sha1(payload).hexdigest()
+
+        entry = self.manifest.get(key)
+        if entry and entry['sha1'] == checksum:
+            log.debug('Track %s unchanged', key)
+            return False
+
+        # Write the payload first, so the manifest never refers to a missing file
+        file_name = os.path.join(TRACKS_DIR, f'{header["date"]:%Y%m%d%H%M%S}-{header["index"]:04d}.bin')
+        os.makedirs(os.path.join(self.path, TRACKS_DIR), exist_ok=True)
+        _write_atomic(os.path.join(self.path, file_name), payload)
+
+        self.manifest[key] = {
+            'index': header['index'],
+            'date': header['date'].isoformat(),
+            'file': file_name,
+            'size': len(payload),
+            'sha1': checksum
+        }
+        self.save()
+
+        log.info('%s track %s', 'Updated' if entry else 'Added', key)
+        return True
+
+    def has(self, header:dict) -> bool:
+        """Check if the archive holds a track."""
+        return track_key(header) in self.manifest
+
+    def headers(self) -> list:
+        """Get the headers of all tracks held, oldest first."""
+        headers = [{'index': e['index'], 'date': datetime.datetime.fromisoformat(e['date'])} for e in self.manifest.values()]
+        return sorted(headers, key=lambda h: (h['date'], h['index']))
+
+    def payload(self, header:dict) -> bytes:
+        """Read a track's payload, checking it against the manifest."""
+        entry = self.manifest[track_key(header)]
+        with open(os.path.join(self.path, entry['file']), 'rb') as f:
+            payload = f.read()
+
+        if hashlib.sha1(payload).hexdigest() != entry['sha1']:
+            raise ValueError(f'Checksum mismatch for track {track_key(header)}')
+        return payload
+
+    def save(self) -> None:
+        """Save the manifest, replacing the previous one atomically."""
+        manifest = json.dumps({'tracks': self.manifest}, indent=1)
+        _write_atomic(os.path.join(self.path, MANIFEST_FILE), manifest.encode())
+
+    def stream_records(self, position:dict=None) -> None:
+        """Streams records from all tracks held, in the same form as `dg100.stream_records`."""
+        headers = self.headers()
+        total_headers = len(headers)
+
+        if position:
+            # Continue from the track containing the last record; tracks are in date order, not index order
+            headers = headers[find_track(headers, position):]
+
+        yield from stream_track_payloads(self.tracks(headers), total_headers, position)
+
+    def tracks(self, headers:list) -> None:
+        """Yield (header, payload) tuples for the given headers, with any error reading a payload in its place."""
+        for h in headers:
+            try:
+                yield h, self.payload(h)
+            except (OSError, ValueError) as e:
+                yield h, ValueError(str(e))
+
+
+def _write_atomic(path:str, data:bytes) -> None:
+    tmp_path = f'{path}.tmp'
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
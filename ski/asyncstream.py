@@ -0,0 +1,262 @@
+"""
+  Module providing an asynchronous stream, for pipelines whose stages wait on I/O such as a serial device.
+  Kept apart from `ski.stream` so that loading a plain stream does not load asyncio.
+"""
+
+import asyncio
+import inspect
+import itertools
+import threading
+import time
+from collections import deque
+
+from .stream import EXECUTORS, _END, _StageError, _apply_chunk
+
+# Elements passed at once between stages, and between the event loop and threads
+CHUNK_SIZE = 256
+
+
+async def _aiter_blocking(iterable, chunksize:int):
+    """Read a blocking iterable in a worker thread, a chunk at a time."""
+    loop = asyncio.get_running_loop()
+    iterator = iter(iterable)
+    while True:
+        chunk = await loop.run_in_executor(None, list, itertools.islice(iterator, chunksize))
+        if chunk:
+            yield chunk
+        if len(chunk) < chunksize:
+            return
+
+
+async def _aiter_sync(iterable, chunksize:int):
+    """Read a non-blocking iterable, a chunk at a time."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(itertools.islice(iterator, chunksize))
+        if chunk:
+            yield chunk
+        if len(chunk) < chunksize:
+            return
+
+
+async def _achunk(source):
+    """Pass each element of an async iterable on as a chunk of its own, as it cannot be known when the next will arrive."""
+    async for x in source:
+        yield [x]
+
+
+async def _aflatten(source):
+    """Read the elements of a stream of chunks."""
+    async for chunk in source:
+        for x in chunk:
+            yield x
+
+
+async def _amap(source, func):
+    """Apply a sync or async function to each element."""
+    async for chunk in source:
+        output = []
+        for x in chunk:
+            res = func(x)
+            if inspect.isawaitable(res):
+                res = await res
+            output.append(res)
+        yield output
+
+
+def _apply_chunk_timed(func, chunk:list) -> tuple:
+    """Apply a function to each element of a chunk, also returning the time taken in the worker."""
+    start = time.perf_counter()
+    output = _apply_chunk(func, chunk)
+    return output, time.perf_counter() - start
+
+
+async def _amap_pool(source, func, pool_class, workers:int, chunksize:int, stage=None):
+    """
+    Apply a function to each element in a pool of workers, a chunk at a time, preserving order.
+    Pass a profiler stage to record the time each chunk takes in its worker.
+    """
+    loop = asyncio.get_running_loop()
+
+    async def __result(future):
+        output, elapsed = await future
+        if stage:
+            stage.record_chunk(len(output), sum(1 for res in output if res is not None), elapsed)
+        return output
+
+    with pool_class(max_workers=workers) as pool:
+        pending = deque()
+        chunk = []
+        async for x in _aflatten(source):
+            chunk.append(x)
+            if len(chunk) < chunksize:
+                continue
+            pending.append(loop.run_in_executor(pool, _apply_chunk_timed, func, chunk))
+            chunk = []
+            # Wait for the oldest chunk once enough work is in flight
+            if len(pending) >= 2 * workers:
+                yield await __result(pending.popleft())
+        if chunk:
+            pending.append(loop.run_in_executor(pool, _apply_chunk_timed, func, chunk))
+        while pending:
+            yield await __result(pending.popleft())
+
+
+async def _apipe_sync(source, func, size:int, chunksize:int):
+    """
+    Run a sync iterator function in a worker thread, bridging its input and output to the event loop a chunk at a time.
+    Output is passed on once a chunk is full, or before waiting for more input, so nothing is held back while the source is slow.
+    """
+    loop = asyncio.get_running_loop()
+    source = source.__aiter__()
+    queue = asyncio.Queue(size)
+    closed = threading.Event()
+    output = []
+
+    def __put(item):
+        asyncio.run_coroutine_threadsafe(queue.put(item), loop).result()
+
+    def __flush():
+        if output:
+            __put(output[:])
+            output.clear()
+
+    def __input():
+        while not closed.is_set():
+            __flush()
+            try:
+                chunk = asyncio.run_coroutine_threadsafe(source.__anext__(), loop).result()
+            except StopAsyncIteration:
+                return
+            yield from chunk
+
+    def __run():
+        try:
+            for res in func(__input()):
+                output.append(res)
+                if len(output) >= chunksize:
+                    __flush()
+                if closed.is_set():
+                    return
+            __flush()
+            item = _END
+        except Exception as e:
+            item = _StageError(e)
+        if not closed.is_set():
+            __put(item)
+
+    thread = loop.run_in_executor(None, __run)
+    try:
+        while True:
+            x = await queue.get()
+            if x is _END:
+                break
+            if isinstance(x, _StageError):
+                raise x.error
+            yield x
+    finally:
+        # Unblock the worker thread if it is waiting to put a result
+        closed.set()
+        while not queue.empty():
+            queue.get_nowait()
+        await thread
+
+
+async def _aqueued(source, size:int):
+    """Run a stage as its own task, buffering up to `size` elements for the next stage."""
+    queue = asyncio.Queue(size)
+
+    async def __pump():
+        try:
+            async for x in source:
+                await queue.put(x)
+            await queue.put(_END)
+        except Exception as e:
+            await queue.put(_StageError(e))
+
+    task = asyncio.ensure_future(__pump())
+    try:
+        while True:
+            x = await queue.get()
+            if x is _END:
+                break
+            if isinstance(x, _StageError):
+                raise x.error
+            yield x
+    finally:
+        task.cancel()
+
+
+class AsyncStream:
+    """
+    Class providing an asynchronous stream. Each stage runs as its own task, connected to the next by a bounded queue,
+    so reading, processing and writing overlap. Iterating with a plain `for` runs the stream on a background event loop.
+    Elements pass between stages, and between the event loop and threads, in chunks of up to `chunksize`,
+    as each crossing costs far more than handling an element; queues hold up to `queue_size` chunks.
+    """
+
+    def __init__(self, source, queue_size:int=64, profiler=None, chunksize:int=CHUNK_SIZE) -> None:
+        self._source = source
+        self.queue_size = queue_size
+        self.profiler = profiler
+        self.chunksize = chunksize
+
+    def __aiter__(self):
+        return _aflatten(self._source).__aiter__()
+
+    def __iter__(self):
+        """Iterate from synchronous code."""
+        loop = asyncio.new_event_loop()
+        thread = threading.Thread(target=loop.run_forever, daemon=True)
+        thread.start()
+
+        source = self._source.__aiter__()
+        try:
+            while True:
+                try:
+                    chunk = asyncio.run_coroutine_threadsafe(source.__anext__(), loop).result()
+                except StopAsyncIteration:
+                    break
+                yield from chunk
+        finally:
+            asyncio.run_coroutine_threadsafe(source.aclose(), loop).result()
+            asyncio.run_coroutine_threadsafe(loop.shutdown_default_executor(), loop).result()
+            loop.call_soon_threadsafe(loop.stop)
+            thread.join()
+            loop.close()
+
+    def create(iterable, queue_size:int=64, profiler=None, chunksize:int=CHUNK_SIZE):
+        """Create a stream from an async or non-blocking iterable."""
+        source = _achunk(iterable) if hasattr(iterable, '__aiter__') else _aiter_sync(iterable, chunksize)
+        return AsyncStream(_aqueued(source, queue_size), queue_size, profiler, chunksize)
+
+    def from_blocking(iterable, queue_size:int=64, profiler=None, chunksize:int=CHUNK_SIZE):
+        """Create a stream from a blocking iterable, such as a serial device, read in a worker thread `chunksize` elements at a time."""
+        return AsyncStream(_aqueued(_aiter_blocking(iterable, chunksize), queue_size), queue_size, profiler, chunksize)
+
+    def _derive(self, source):
+        """Create the next stream in the pipeline, running the stage as its own task."""
+        return AsyncStream(_aqueued(source, self.queue_size), self.queue_size, self.profiler, self.chunksize)
+
+    def map(self, func, name:str=None, workers:int=0, executor:str='process', chunksize:int=256):
+        """
+        Apply a sync or async function to each element; optionally in a pool of workers, preserving order.
+        Elements are sent to the workers in chunks of up to `chunksize`, so each round trip to a worker process carries many.
+        """
+        if workers > 0:
+            if getattr(func, 'stateful', False):
+                raise ValueError(f'Cannot run stateful stage {getattr(func, "__name__", func)} in parallel')
+            import concurrent.futures
+            stage = self.profiler.stage(func, name) if self.profiler else None
+            return self._derive(_amap_pool(self._source, func, getattr(concurrent.futures, EXECUTORS[executor]), workers, chunksize, stage))
+        if self.profiler and not inspect.iscoroutinefunction(func):
+            func = self.profiler.stage(func, name)
+        return self._derive(_amap(self._source, func))
+
+    def pipe(self, func, name:str=None):
+        """Apply an iterator function: an async generator function, or a sync function run in a worker thread."""
+        if inspect.isasyncgenfunction(func):
+            return self._derive(_achunk(func(_aflatten(self._source))))
+        if self.profiler:
+            func = self.profiler.stage(func, name).pipe
+        return self._derive(_apipe_sync(self._source, func, self.queue_size, self.chunksize))
@@ -0,0 +1,137 @@
+"""
+  Module providing capture of the raw byte stream of a DG-100 serial session, and replay of a capture without the device.
+  A capture file starts with a marker, followed by one entry per read or write: a direction byte, a 4-byte big-endian length and the bytes.
+"""
+
+import logging
+import struct
+from collections import defaultdict, deque
+
+CAPTURE_MARKER = b'DG100CAP1'
+REQUEST = b'>'
+RESPONSE = b'<'
+
+_ENTRY = struct.Struct('>cI')
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+class CaptureSerial:
+    """
+    Class wrapping a serial connection, writing every request and response to a capture file.
+    Anything else is passed through to the wrapped connection.
+    """
+
+    def __init__(self, ser, path:str) -> None:
+        self.ser = ser
+        self.path = path
+        self._file = open(path, 'wb')
+        self._file.write(CAPTURE_MARKER)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __getattr__(self, name):
+        return getattr(self.ser, name)
+
+    def close(self) -> None:
+        """Close the capture file; the wrapped connection is left to its owner."""
+        if not self._file.closed:
+            self._file.close()
+            log.info('Closed capture file %s', self.path)
+
+    def read(self, size:int=1) -> bytes:
+        return self._capture(RESPONSE, self.ser.read(size))
+
+    def read_until(self, expected:bytes=b'\n', size:int=None) -> bytes:
+        return self._capture(RESPONSE, self.ser.read_until(expected, size))
+
+    def write(self, data:bytes) -> int:
+        self._capture(REQUEST, data)
+        return self.ser.write(data)
+
+    def _capture(self, direction:bytes, data:bytes) -> bytes:
+        if data:
+            self._file.write(_ENTRY.pack(direction, len(data)))
+            self._file.write(data)
+        return data
+
+
+def read_capture(path:str) -> list:
+    """Read a capture file into a list of (direction, bytes) entries."""
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    if not data.startswith(CAPTURE_MARKER):
+        raise ValueError(f'{path} is not a capture file')
+
+    entries = []
+    offset = len(CAPTURE_MARKER)
+    while offset < len(data):
+        if offset + _ENTRY.size > len(data):
+            raise ValueError(f'{path} is truncated at byte {offset}')
+        direction, length = _ENTRY.unpack_from(data, offset)
+        offset += _ENTRY.size
+        if offset + length > len(data):
+            raise ValueError(f'{path} is truncated at byte {offset}; expected {length} byte(s)')
+        entries.append((direction, data[offset:offset + length]))
+        offset += length
+
+    log.info('Read %d capture entries from %s', len(entries), path)
+    return entries
+
+
+class ReplaySerial:
+    """
+    Class standing in for a serial connection by replaying a capture file, as fast as it is read.
+    Each request is answered with the responses that followed the same request in the capture, so requests may come in a different order.
+    """
+
+    def __init__(self, path:str) -> None:
+        self.name = path
+        self._responses = defaultdict(deque)
+        self._output = bytearray()
+
+        request = None
+        for direction, data in read_capture(path):
+            if direction == REQUEST:
+                request = bytes(data)
+                self._responses[request].append(bytearray())
+            elif request is not None:
+                self._responses[request][-1] += data
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._output.clear()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._output)
+
+    def read(self, size:int=1) -> bytes:
+        data = bytes(self._output[:size])
+        del self._output[:size]
+        return data
+
+    def read_until(self, expected:bytes=b'\n', size:int=None) -> bytes:
+        end = self._output.find(expected)
+        end = len(self._output) if end < 0 else end + len(expected)
+        return self.read(end if size is None else min(end, size))
+
+    def write(self, data:bytes) -> int:
+        responses = self._responses.get(bytes(data))
+        if responses:
+            self._output += responses.popleft()
+        else:
+            # Nothing to send back; the reader will time out as it would with the device
+            log.warn('Request not in capture: %s', bytes(data).hex())
+        return len(data)
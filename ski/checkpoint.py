@@ -0,0 +1,99 @@
+"""
+  Module providing checkpoints, so an interrupted pipeline run can be resumed.
+"""
+
+import json
+import logging
+import os
+
+from .utils import DateAwareJSONEncoder
+
+# Key used to carry a point's source position through the pipeline
+POSITION_KEY = '_pos'
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+def source_identity(source:str) -> dict:
+    """Identify a source by its path or port, and a file also by its size and modification time."""
+    if os.path.isfile(source):
+        stat = os.stat(source)
+        return {'path': os.path.abspath(source), 'size': stat.st_size, 'mtime': int(stat.st_mtime)}
+    return {'path': source}
+
+
+class Checkpoint:
+    """
+    Class saving and loading the state of a pipeline run to a local JSON file.
+    The state holds the position of the last source record and the state of the stateful stages after processing it,
+    along with the identity of the source, so a checkpoint is only resumed against the source it was saved from.
+    """
+
+    def __init__(self, path:str, every:int=10000) -> None:
+        self.path = path
+        self.every = every
+        self._since = 0
+
+    def clear(self) -> None:
+        """Remove the checkpoint file once a run completes."""
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def load(self, source:dict=None) -> dict:
+        """Load the last checkpoint, or None if there is no checkpoint. Raises ValueError if it was saved from a different source."""
+        if not os.path.exists(self.path):
+            log.info('No checkpoint found at %s', self.path)
+            return None
+
+        with open(self.path, 'r') as f:
+            state = json.load(f)
+
+        if source is not None and state.get('source') != source:
+            raise ValueError(f'Checkpoint {self.path} was saved from {state.get("source")}, not {source}')
+
+        log.info('Loaded checkpoint from %s: position=%s', self.path, state.get('position'))
+        return state
+
+    def save(self, state:dict) -> None:
+        """Save a checkpoint, replacing the previous one atomically."""
+        tmp_path = f'{self.path}.tmp'
+        with open(tmp_path, 'w') as f:
+            json.dump(state, f, cls=DateAwareJSONEncoder)
+        os.replace(tmp_path, self.path)
+
+        log.debug('Saved checkpoint to %s: position=%s', self.path, state.get('position'))
+
+    def sink(self, state_f, flush:list=(), source:dict=None):
+        """
+        Create a sink function that saves a checkpoint every `every` source points, with the identity of the source.
+        Points built from a source record carry its position, which is removed here; interpolated points carry none.
+        Buffered sinks in `flush` are flushed before each save, so no point before a checkpoint is left unwritten.
+        """
+        def __checkpoint(point):
+            position = point.pop(POSITION_KEY, None)
+            if position is None:
+                return
+
+            self._since += 1
+            if self._since >= self.every:
+                self._since = 0
+                for s in flush:
+                    s.flush()
+                state = state_f(point, position)
+                if source is not None:
+                    state['source'] = source
+                self.save(state)
+
+        return __checkpoint
+
+
+def positioned(build_f):
+    """Wrap a point building function to take a whole source record, tagging the point with the record's position."""
+    def __build(data):
+        point = build_f(data['point'])
+        if point is not None:
+            point[POSITION_KEY] = data['position']
+        return point
+
+    return __build
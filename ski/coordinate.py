@@ -223,6 +223,16 @@ def calc_central_meridian(zone):
     return radians(-183 + (zone * 6))
 
 
+def calc_utm_zone(latitude, longitude):
+    """
+      Determine the UTM zone and hemisphere holding a coordinate, as used by WGS_to_UTM.
+      @param latitude: The latitude, in degrees.
+      @param longitude: The longitude, in degrees.
+      @return The zone number and hemisphere, e.g. '13N'.
+    """
+    return '{:d}{:s}'.format(int((longitude + 180.0) / 6.0) + 1, 'S' if latitude < 0 else 'N')
+
+
 def footpoint_latitude(y):
     """
       Compute the footpoint latitude for use in converting transverse
@@ -0,0 +1,104 @@
+"""
+  Module providing data preparation for the Dash charts.
+"""
+
+import logging
+from collections import OrderedDict
+
+import numpy as np
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+def columns_from_points(points, keys:tuple=('ts', 'alt', 'spd')) -> dict:
+    """Convert a list of point dicts into a dict of NumPy columns."""
+    points = list(points)
+    return {k: np.fromiter((p.get(k, 0) for p in points), dtype=np.float64, count=len(points)) for k in keys}
+
+
+def lttb(x, y, threshold:int) -> np.ndarray:
+    """
+    Downsample a series using the Largest-Triangle-Three-Buckets algorithm.
+    Returns the indexes of the selected points, so the same selection can be applied to any column.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+
+    # Nothing to do if the series already fits
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+
+    # Split the points between the first and last into (threshold - 2) buckets
+    edges = (np.arange(threshold - 1) * ((n - 2) / (threshold - 2))).astype(np.int64) + 1
+    edges[-1] = n - 1
+    starts = edges[:-1]
+    ends = edges[1:]
+
+    # Average of each bucket from cumulative sums; the last bucket looks ahead to the final point
+    cs_x = np.concatenate(([0.0], np.cumsum(x)))
+    cs_y = np.concatenate(([0.0], np.cumsum(y)))
+    counts = ends - starts
+    avg_x = np.append(((cs_x[ends] - cs_x[starts]) / counts)[1:], x[-1])
+    avg_y = np.append(((cs_y[ends] - cs_y[starts]) / counts)[1:], y[-1])
+
+    selected = np.empty(threshold, dtype=np.int64)
+    selected[0] = 0
+    selected[-1] = n - 1
+
+    a = 0
+    for i in range(threshold - 2):
+        s, e = starts[i], ends[i]
+        # Twice the area of the triangle formed by the previous selected point, each candidate and the next bucket average
+        area = np.abs((x[a] - avg_x[i]) * (y[s:e] - y[a]) - (x[a] - x[s:e]) * (avg_y[i] - y[a]))
+        a = s + int(np.argmax(area))
+        selected[i + 1] = a
+
+    log.debug('lttb: %d -> %d point(s)', n, threshold)
+    return selected
+
+
+class ChartSeries:
+    """
+    Class holding track columns and serving downsampled series for charts.
+    Results are cached per track, column, chart width and visible range.
+    """
+
+    def __init__(self, points_per_pixel:float=1.0, max_entries:int=256) -> None:
+        self.points_per_pixel = points_per_pixel
+        self.max_entries = max_entries
+        self.tracks = {}
+        self._cache = OrderedDict()
+
+    def add_track(self, track_id, columns:dict) -> None:
+        """Add (or replace) the columns for a track. Columns must include `ts`, in ascending order."""
+        self.tracks[track_id] = {k: np.asarray(v) for k, v in columns.items()}
+
+        # Drop any cached series for the track
+        for key in [k for k in self._cache if k[0] == track_id]:
+            del self._cache[key]
+
+    def series(self, track_id, column:str, width:int, ts_from:int=None, ts_to:int=None) -> tuple:
+        """Get the (ts, value) arrays to plot a column across a chart of the given width, limited to the visible range."""
+        columns = self.tracks[track_id]
+        ts = columns['ts']
+
+        # Find the visible range
+        lo = 0 if ts_from is None else int(np.searchsorted(ts, ts_from, side='left'))
+        hi = len(ts) if ts_to is None else int(np.searchsorted(ts, ts_to, side='right'))
+
+        key = (track_id, column, width, lo, hi)
+        if key in self._cache:
+            self._cache.move_to_end(key)
+            return self._cache[key]
+
+        ix = lttb(ts[lo:hi], columns[column][lo:hi], max(3, int(width * self.points_per_pixel))) + lo
+        result = (ts[ix], columns[column][ix])
+
+        # Store in cache, discarding the least recently used entry if full
+        self._cache[key] = result
+        if len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+        return result
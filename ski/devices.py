@@ -0,0 +1,132 @@
+"""
+  Module providing concurrent downloads from several DG-100 data loggers, one worker thread per serial port.
+"""
+
+import logging
+import threading
+import time
+
+from .dg100 import stream_records
+from .processor import build_point_from_values
+from .stream import EXECUTORS, Stream
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+class DeviceStatus:
+    """Class holding the progress of a download from one device."""
+
+    def __init__(self, port:str) -> None:
+        self.port = port
+        self.state = 'pending'
+        self.records = 0
+        self.points = 0
+        self.section_count = 0
+        self.total_sections = 0
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def elapsed(self) -> float:
+        """Seconds spent downloading so far."""
+        if self.started is None:
+            return 0.0
+        return (self.finished or time.perf_counter()) - self.started
+
+    @property
+    def records_per_sec(self) -> float:
+        return self.records / self.elapsed if self.elapsed > 0 else 0.0
+
+
+def open_serial(port:str):
+    """Open a serial connection to a device."""
+    # Imported here; only needed when reading from a device
+    import serial
+    return serial.Serial(port, 115200, timeout=1)
+
+
+class DownloadManager:
+    """
+    Class downloading from many devices at once, with a worker thread per serial port.
+    Points are built in a pool shared by all devices, then fed to each device's own pipeline and sinks.
+    A device that fails is marked as failed; the others carry on.
+    """
+
+    def __init__(self, ports:list, open_f=open_serial, workers:int=0, executor:str='process', pipeline_f=None, sinks_f=None) -> None:
+        """
+        Create a manager for a list of ports.
+        `pipeline_f(port, stream)` adds per-device stages to the stream of built points; `sinks_f(port)` returns the device's sinks.
+        """
+        if executor not in EXECUTORS:
+            raise ValueError(f'Unknown executor: {executor}')
+
+        self.ports = ports
+        self.open_f = open_f
+        self.workers = workers
+        self.executor = executor
+        self.pipeline_f = pipeline_f
+        self.sinks_f = sinks_f
+        self.status = {port: DeviceStatus(port) for port in ports}
+
+    def report(self) -> str:
+        """Format a per-device report."""
+        report = f'{"PORT":24} {"STATE":12} {"SECTIONS":>9} {"RECORDS":>9} {"POINTS":>9} {"SECS":>8} {"RECORDS/S":>10}'
+        for s in self.status.values():
+            report += f'\n{s.port[:24]:24} {s.state:12} {f"{s.section_count}/{s.total_sections}":>9} {s.records:9d} {s.points:9d} {s.elapsed:8.1f} {s.records_per_sec:10.0f}'
+            if s.error:
+                report += f'\n{"":24} {s.error}'
+        return report
+
+    def run(self) -> dict:
+        """Download from all devices, returning once every device has finished or failed."""
+        pool = None
+        if self.workers > 0:
+            import concurrent.futures
+            pool = getattr(concurrent.futures, EXECUTORS[self.executor])(max_workers=self.workers)
+
+        try:
+            threads = [threading.Thread(target=self._download, args=(port, pool), name=f'download-{port}') for port in self.ports]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+        finally:
+            if pool:
+                pool.shutdown()
+
+        return self.status
+
+    def _download(self, port:str, pool) -> None:
+        status = self.status[port]
+        status.started = time.perf_counter()
+        status.state = 'downloading'
+
+        def __progress(record):
+            status.records += 1
+            status.section_count = record['section_count']
+            status.total_sections = record['total_sections']
+            return record['point']
+
+        try:
+            with self.open_f(port) as ser:
+                stream = Stream.create(stream_records(ser)).map(__progress)
+                if pool:
+                    stream = stream.parallel_map(build_point_from_values, workers=self.workers, pool=pool)
+                else:
+                    stream = stream.map(build_point_from_values)
+                # Drop records that failed to build
+                stream = stream.pipe(lambda it: (p for p in it if p is not None), name='valid')
+                if self.pipeline_f:
+                    stream = self.pipeline_f(port, stream)
+                status.points = stream.sink(*(self.sinks_f(port) if self.sinks_f else []))
+            status.state = 'done'
+
+        except Exception as e:
+            log.error('Download from %s failed: %s', port, e, exc_info=True)
+            status.state = 'failed'
+            status.error = f'{type(e).__name__}: {e}'
+
+        finally:
+            status.finished = time.perf_counter()
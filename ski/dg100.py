@@ -5,7 +5,12 @@
 
 import datetime
 import logging
-import serial
+from typing import TYPE_CHECKING
+from .stream import prefetch
+
+if TYPE_CHECKING:
+    # Only for annotations; pyserial is imported where a port is opened
+    import serial
 
 # Test serial parameters
 device='/dev/cu.usbserial-310'
@@ -23,6 +28,19 @@ COMMAND_IDs={
 TRACK_HEADER_MSG=b'\xBB'
 TRACK_RECORDS_MSG=b'\xB5'
 
+# Bytes read past a frame's stated length before giving up on it and resyncing
+FRAME_SLACK=16
+
+# Number of messages in a track file response
+TRACK_RECORDS_FRAMES=2
+
+# Track record layouts (big-endian signed ints) for formats A, B and C
+TRACK_RECORD_FIELDS={
+    0: ('lat', 'lon'),
+    1: ('lat', 'lon', 'tm', 'dt', 'spd'),
+    2: ('lat', 'lon', 'tm', 'dt', 'spd', 'alt', 'reserved', 'format')
+}
+
 # Define loggers
 log = logging.getLogger(__name__)
 parser_log = logging.getLogger(name='parser')
@@ -187,6 +205,28 @@ class MessageParser:
             'records': track_records
         }
 
+    def track_file_columns(self, payload_bytes:bytes) -> dict:
+        """Decode a track file response in bulk into a dict of NumPy int columns."""
+        # Imported here; only needed when decoding device data
+        import numpy as np
+
+        log.info('Decode track file: %d byte(s)', len(payload_bytes))
+
+        # First record is always format C, and holds the format of the remaining records
+        first = np.frombuffer(payload_bytes, dtype=_track_record_dtype(2), count=1)
+        record_format = int(first['format'][0])
+        if record_format not in TRACK_RECORD_FIELDS:
+            raise ValueError(f'Unknown record format ({record_format})')
+
+        dtype = _track_record_dtype(record_format)
+        rest = memoryview(payload_bytes)[32:]
+        if len(rest) % dtype.itemsize != 0:
+            raise ValueError(f'Invalid data; {len(rest)} byte(s) is not a whole number of {dtype.itemsize} byte records')
+        records = np.frombuffer(rest, dtype=dtype)
+
+        # Join the first record to the rest, keeping only the fields they share
+        return {f: np.concatenate((first[f], records[f])).astype(np.int64) for f in TRACK_RECORD_FIELDS[record_format] if f not in ('reserved', 'format')}
+
     def track_headers_response(self, payload_bytes:bytes) -> dict:
         """Parse track header response message."""
         log.info('Parse track headers: %d byte(s)', len(payload_bytes))
@@ -210,11 +250,86 @@ class MessageParser:
         }
         
 
+class FrameDecoder:
+    """
+    Class splitting a stream of bytes read from a DG100/DG200 data logger into message frames.
+    Bytes are fed in as they are read; complete frames are handed out as memoryviews of the decoder's buffer, without copying.
+    """
+
+    def __init__(self) -> None:
+        self._buffer = bytearray()
+        self._pos = 0
+
+    def feed(self, data:bytes) -> None:
+        """Add bytes read from the device."""
+        if self._pos:
+            # Drop consumed bytes; views handed out keep the old buffer alive
+            self._buffer = self._buffer[self._pos:]
+            self._pos = 0
+        try:
+            self._buffer += data
+        except BufferError:
+            # Views handed out still refer to this buffer, so extend a copy instead
+            self._buffer = self._buffer + data
+
+    def next_frame(self) -> memoryview:
+        """Get the next complete, valid frame, or None if more bytes are needed."""
+        buffer = self._buffer
+        while True:
+            # Resync on the start sequence, discarding anything before it
+            start = buffer.find(START_SEQ, self._pos)
+            if start < 0:
+                # Keep the last byte, in case it is the first half of a start sequence
+                self._pos = max(self._pos, len(buffer) - 1)
+                return None
+            if start > self._pos:
+                log.warn('Discarding %d byte(s) before start of frame', start - self._pos)
+                self._pos = start
+
+            if len(buffer) - start < 4:
+                return None
+            end = start + _from_bytes(buffer[start + 2:start + 4]) + 8
+
+            # Frame by the length field
+            if end <= len(buffer) and self._valid_frame(start, end):
+                return self._take(start, end)
+
+            # Some messages do not match their length field, so fall back to the first end sequence that closes a valid frame
+            candidate = buffer.find(END_SEQ, start + 6)
+            while 0 <= candidate and candidate + 2 <= end + FRAME_SLACK:
+                if self._valid_frame(start, candidate + 2):
+                    log.debug('Frame length mismatch: expected %d byte(s), read %d byte(s)', end - start, candidate + 2 - start)
+                    return self._take(start, candidate + 2)
+                candidate = buffer.find(END_SEQ, candidate + 1)
+
+            if len(buffer) < end + FRAME_SLACK:
+                # Frame may be incomplete
+                return None
+
+            # No valid frame at this start sequence; look for the next one
+            log.warn('Discarding invalid frame at byte %d', start)
+            self._pos = start + 1
+
+    def _take(self, start:int, end:int) -> memoryview:
+        self._pos = end
+        return memoryview(self._buffer)[start:end]
+
+    def _valid_frame(self, start:int, end:int) -> bool:
+        buffer = self._buffer
+        return buffer[end - 2:end] == END_SEQ and calculate_checksum(memoryview(buffer)[start + 4:end - 4]) == buffer[end - 4:end - 2]
+
+
 def _from_bytes(bytes:bytes) -> int:
     """Convert bytes to an int."""
     return int.from_bytes(bytes, byteorder='big')
 
 
+def _track_record_dtype(record_format:int):
+    """NumPy structured dtype for a track record format."""
+    import numpy as np
+    return np.dtype([(f, '>i4') for f in TRACK_RECORD_FIELDS[record_format]])
+
+
 def _message_checksum(message_bytes:bytes) -> bytes:
     """Extract checksum field from message."""
     return message_bytes[-4:-2]
@@ -247,12 +362,8 @@ def _to_bytes(value:int, length:int=2) -> bytes:
 
 def calculate_checksum(payload_bytes:bytes) -> bytes:
     """Calculates the checksum of a message payload according to the specification."""
-    payload_len = len(payload_bytes)
-    checksum = payload_bytes[0];
-    for i in range(1, payload_len):
-        checksum = checksum + payload_bytes[i]
     # From spec doc: The last line of the checksum function masks bit 15 (i.e. the most significant bit in the checksum.) This means that the checksum will never be larger than 32767 (decimal.)
-    checksum = checksum & 0x7FFF
+    checksum = sum(payload_bytes) & 0x7FFF
     return _to_bytes(checksum)
 
 
@@ -267,64 +378,88 @@ def format_track_record_as_gsd(track_record:dict) -> list:
     ]
 
 
-def get_track_records(ser:serial.Serial, track_index:int) -> list:
-    """Gets a list of track records for a file index from a serial connection."""
+def get_track_columns(ser:'serial.Serial', track_index:int) -> dict:
+    """Gets the track records for a file index from a serial connection, as a dict of NumPy columns."""
+    columns = MessageParser().track_file_columns(get_track_payload(ser, track_index))
+
+    log.info('Read %d track record(s)', len(columns['lat']))
+    return columns
+
+
+def get_track_payload(ser:'serial.Serial', track_index:int, decoder:FrameDecoder=None) -> bytearray:
+    """Gets the raw track file payload for a file index from a serial connection."""
     log.info('Requesting records for index %d', track_index)
+    decoder = decoder or FrameDecoder()
 
     # Write a message
     request_message = prepare_message(MessageBuilder().request_track_file(track_index))
-    serial_log.info('> Sending message: %d byte(s) %s', len(request_message), print_message(request_message))
+    if serial_log.isEnabledFor(logging.INFO):
+        serial_log.info('> Sending message: %d byte(s) %s', len(request_message), print_message(request_message))
     ser.write(request_message)
 
     merged_payload = bytearray()
 
     # Response will be sent over two messages
-    for i in range(0, 1):
-        # Read the response
-        response_message = ser.read_until(END_SEQ)
-        serial_log.info('< Received message: %d byte(s) %s', len(response_message), print_message(response_message))
-
-        # Parse and validate the message
-        message_type, payload_bytes = parse_message(response_message, ignore_length=True)
+    for i in range(0, TRACK_RECORDS_FRAMES):
+        # Read the response, parse and validate the message
+        message_type, payload_bytes = read_message(ser, decoder)
         
         # Check message is of expected type
         if message_type != TRACK_RECORDS_MSG:
-            log.error('Received a message of type %X when expecting one of type %X', message_type, TRACK_RECORDS_MSG)
+            log.error('Received a message of type %s when expecting one of type %s', message_type.hex(), TRACK_RECORDS_MSG.hex())
             raise ValueError(f'Unexpected message type ({message_type})')
 
         merged_payload += payload_bytes
 
+    return merged_payload
+
+
+def download_tracks(ser:'serial.Serial', headers:list) -> None:
+    """
+    Downloads the track file payload for each header in turn, yielding (header, payload) tuples.
+    If a track cannot be read, the error is yielded in place of its payload so the caller can skip it.
+    """
+    decoder = FrameDecoder()
+    for h in headers:
+        try:
+            yield h, get_track_payload(ser, h['index'], decoder)
+        except ValueError as e:
+            # Start afresh, dropping anything left of the failed response
+            decoder = FrameDecoder()
+            yield h, e
+
+
+def get_track_records(ser:'serial.Serial', track_index:int) -> list:
+    """Gets a list of track records for a file index from a serial connection."""
     # Parse record data
-    records = MessageParser().track_file_response(merged_payload)['records']
+    records = MessageParser().track_file_response(get_track_payload(ser, track_index))['records']
 
     log.info('Read %d track record(s)', len(records))
     return records
 
 
-def get_track_headers(ser:serial.Serial) -> list:
+def get_track_headers(ser:'serial.Serial', decoder:FrameDecoder=None) -> list:
     """Gets a list of all track headers from a serial connection."""
     # Start at zero
     track_index = 0
     output = []
+    decoder = decoder or FrameDecoder()
 
     while True:
         log.info('Requesting headers starting at %d', track_index)
 
         # Write a message
         request_message = prepare_message(MessageBuilder().request_track_headers(track_index))
-        serial_log.info('> Sending message: %s byte(s) %s', len(request_message), print_message(request_message))
+        if serial_log.isEnabledFor(logging.INFO):
+            serial_log.info('> Sending message: %s byte(s) %s', len(request_message), print_message(request_message))
         ser.write(request_message)
 
-        # Read the response
-        response_message = ser.read_until(END_SEQ)
-        serial_log.info('< Received message: %d byte(s) %s', len(response_message), print_message(response_message))
-        
-        # Parse and validate the message
-        message_type, payload_bytes = parse_message(response_message, ignore_length=True)
+        # Read the response, parse and validate the message
+        message_type, payload_bytes = read_message(ser, decoder)
         
         # Check message is of expected type
         if message_type != TRACK_HEADER_MSG:
-            log.error('Received a message of type %X when expecting one of type %X', message_type, TRACK_HEADER_MSG)
+            log.error('Received a message of type %s when expecting one of type %s', message_type.hex(), TRACK_HEADER_MSG.hex())
             raise ValueError(f'Unexpected message type ({message_type})')
         
         # Parse header data
@@ -363,11 +498,29 @@ def parse_message(message_bytes:bytes, ignore_length:bool=False, ignore_checksum
         raise ValueError(f'Message checksum mismatch: calculated {checksum_calc}; received {checksum_in}')
 
     # Check the message type
-    message_type = payload_bytes[0:1]
+    message_type = bytes(payload_bytes[0:1])
 
     return message_type, payload_bytes[1:payload_len]
 
 
+def read_message(ser:'serial.Serial', decoder:FrameDecoder) -> tuple:
+    """Reads the next message from a serial connection and returns its type and a view of its payload bytes."""
+    frame = decoder.next_frame()
+    while frame is None:
+        # Reads stop at an end sequence, but this may also appear in the payload; the decoder waits for the rest of the frame
+        data = ser.read_until(END_SEQ)
+        if len(data) == 0:
+            raise ValueError('Timed out waiting for message')
+        decoder.feed(data)
+        frame = decoder.next_frame()
+
+    if serial_log.isEnabledFor(logging.INFO):
+        serial_log.info('< Received message: %d byte(s) %s', len(frame), print_message(frame))
+
+    # Frame checksum was validated by the decoder
+    return parse_message(frame, ignore_length=True, ignore_checksum=True)
+
+
 def prepare_message(payload_bytes:bytes) -> bytearray:
     """Packages the supplied payload into a message with start/end markers, length and checksum."""
     payload_len = len(payload_bytes)
@@ -427,43 +580,135 @@ def print_track_record(record_data:dict) -> str:
     return f'{record_data["date"].isoformat()} lat={record_data["lat"]}, lon={record_data["lon"]}, alt={record_data["alt"]}, spd={record_data["spd"]}'
 
 
-def stream_records(ser: serial.Serial) -> None:
-    """Streams records from a serial connection."""
+def stream_records(ser:'serial.Serial', position:dict=None, prefetch_tracks:int=1) -> None:
+    """
+    Streams records from a serial connection.
+    Each record includes its position (track index and record index); pass a position to resume after that record.
+    Up to `prefetch_tracks` tracks are downloaded in a reader thread while earlier tracks are processed; pass 0 to download each track on demand.
+    """
     # Get headers from the device
     headers = get_track_headers(ser)
     log.info('Loaded %d header(s) from device', len(headers))
+    total_headers = len(headers)
+
+    if position:
+        # Continue from the track containing the last record
+        headers = headers[find_track(headers, position):]
+
+    # For every header, get the records
+    tracks = download_tracks(ser, headers)
+    if prefetch_tracks > 0:
+        tracks = prefetch(tracks, prefetch_tracks)
 
+    record_count = yield from stream_track_payloads(tracks, total_headers, position)
+    log.info('Loaded %d record(s) from %s', record_count, ser.name)
+
+
+def track_key(header:dict) -> str:
+    """Key identifying a track; the index alone is reused once the device is cleared."""
+    return f'{header["index"]}@{header["date"].isoformat()}'
+
+
+def find_track(headers:list, position:dict) -> int:
+    """Find the track holding a position in a list of headers, raising ValueError if it is not there."""
+    for i, h in enumerate(headers):
+        if track_key(h) == position['track_key']:
+            return i
+    raise ValueError(f'Track {position["track_key"]} to resume from was not found')
+
+
+def stream_track_payloads(tracks, total_headers:int, position:dict=None) -> int:
+    """
+    Streams records from (header, payload) tuples, as yielded by `download_tracks`.
+    Pass a position to skip records up to and including that record. Returns the number of records read.
+    """
     header_count = 0
     record_count = 0
+
+    if position:
+        log.info('Resuming at track %s, record %d', position['track_key'], position['index'] + 1)
+        header_count = position['section_count'] - 1
+        record_count = position['point_count'] - position['index'] - 1
+
     # Loop across all headers
-    for h in headers:
+    for h, payload in tracks:
         try:
-            # For every header, get the records
-            records = get_track_records(ser, track_index=h['index'])
+            if isinstance(payload, ValueError):
+                raise payload
+            columns = {f: c.tolist() for f, c in MessageParser().track_file_columns(payload).items()}
+            log.info('Read %d track record(s)', len(columns['lat']))
 
             # Increment header counter
             header_count += 1
+            key = track_key(h)
+
+            if 'tm' not in columns:
+                log.warn('Track %d records have no date/time (format A), skipping', h['index'])
+                continue
+            if 'alt' not in columns:
+                # Format B records have no altitude
+                columns['alt'] = [0] * len(columns['lat'])
             
-            # Loop across all records
-            for r in records:
+            # Loop across all records as tuples of ints
+            records = zip(*(columns[f] for f in ('lat', 'lon', 'tm', 'dt', 'spd', 'alt')))
+            for i, r in enumerate(records):
                 # Increment counter
                 record_count += 1
 
+                # Skip records already processed
+                if position and key == position['track_key'] and i <= position['index']:
+                    continue
+
                 # Return point data to the caller
                 yield {
-                    'point': format_track_record_as_gsd(r),
+                    'point': r,
                     'point_count': record_count,
                     'section_count': header_count,
-                    'total_sections': len(headers)
+                    'total_sections': total_headers,
+                    'position': {
+                        'track': h['index'],
+                        'track_key': key,
+                        'index': i,
+                        'point_count': record_count,
+                        'section_count': header_count
+                    }
                 }
 
         except ValueError as e:
             log.warn('Unable to load records for section %d: %s, skipping', h['index'], e)
 
-    log.info('Loaded %d record(s) from %s', record_count, ser.name)
+    return record_count
+
+
+def sync_tracks(ser:'serial.Serial', archive, prefetch_tracks:int=1) -> list:
+    """
+    Downloads tracks not yet in a local archive, and returns the headers of the tracks added or changed.
+    The most recent track on the device is always downloaded again, as it may have grown since the last sync.
+    """
+    headers = get_track_headers(ser)
+    log.info('Loaded %d header(s) from device', len(headers))
+
+    new_headers = [h for h in headers[:-1] if not archive.has(h)] + headers[-1:]
+    log.info('%d track(s) to download', len(new_headers))
+
+    tracks = download_tracks(ser, new_headers)
+    if prefetch_tracks > 0:
+        tracks = prefetch(tracks, prefetch_tracks)
+
+    synced = []
+    for h, payload in tracks:
+        if isinstance(payload, ValueError):
+            log.warn('Unable to download track %d: %s, skipping', h['index'], payload)
+            continue
+        if archive.add(h, payload):
+            synced.append(h)
+
+    log.info('Synced %d track(s) from %s', len(synced), ser.name)
+    return synced
 
 
 def test_connect():
+    import serial
 
     # Create serial device
     try:
@@ -486,6 +731,7 @@ def test_connect():
 
 
 def test_download():
+    import serial
 
     try:
         with serial.Serial(device, speed, timeout=1) as ser:
@@ -526,6 +772,7 @@ def test_records():
 
 
 def test_stream():
+    import serial
 
     try:
         with serial.Serial(device, speed, timeout=1) as ser:
@@ -0,0 +1,634 @@
+"""
+  Module providing storage of processed points in AWS DynamoDB.
+  Functions take a low-level DynamoDB client, so they run against AWS, DynamoDB Local or the in-process `LocalDynamoDB`.
+"""
+
+import bisect
+import datetime
+import logging
+import os
+import random
+import re
+import threading
+import time
+import zlib
+from collections import deque
+from collections.abc import Mapping
+from decimal import Decimal
+
+from .point import SCALES, fixed_value
+from .stream import EXECUTORS, Sink
+
+# Most items in a BatchWriteItem call
+BATCH_SIZE = 25
+
+# Bytes per write capacity unit
+WRITE_UNIT_SIZE = 1024
+
+# Seconds of points packed into each block item
+BLOCK_SECONDS = 300
+
+# Columns packed into block items, with the scale taking each to an int
+BLOCK_SCALES = SCALES
+
+# Prefix of the attribute holding each packed column
+COLUMN_PREFIX = 'c_'
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+class WriteError(Exception):
+    """Raised when items could not be written after retrying. The items are available as `items`."""
+
+    def __init__(self, msg:str, items:list) -> None:
+        super().__init__(msg, items)
+        self.msg = msg
+        self.items = items
+
+    def __str__(self):
+        return f'{self.msg}; {len(self.items)} item(s)'
+
+
+def client(endpoint_url:str=None, **kwargs):
+    """Create a DynamoDB client; pass an endpoint URL to use DynamoDB Local."""
+    # Imported here; only needed when storing to AWS
+    import boto3
+    return boto3.client('dynamodb', endpoint_url=endpoint_url, **kwargs)
+
+
+def to_attribute(value) -> dict:
+    """Convert a value into a DynamoDB attribute value."""
+    if value is None:
+        return {'NULL': True}
+    if isinstance(value, bool):
+        return {'BOOL': value}
+    if isinstance(value, (int, float, Decimal)):
+        return {'N': str(value)}
+    if isinstance(value, str):
+        return {'S': value}
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return {'B': bytes(value)}
+    if isinstance(value, datetime.datetime):
+        return {'S': value.isoformat()}
+    if isinstance(value, Mapping):
+        return {'M': to_item(value)}
+    if isinstance(value, (list, tuple)):
+        return {'L': [to_attribute(v) for v in value]}
+    raise ValueError(f'Cannot store value of type {type(value).__name__}')
+
+
+def from_attribute(attribute:dict):
+    """Convert a DynamoDB attribute value into a value."""
+    (attribute_type, value), = attribute.items()
+    if attribute_type == 'N':
+        return float(value) if any(c in value for c in '.eE') else int(value)
+    if attribute_type == 'M':
+        return from_item(value)
+    if attribute_type == 'L':
+        return [from_attribute(v) for v in value]
+    if attribute_type == 'NULL':
+        return None
+    return value
+
+
+def to_item(values:dict) -> dict:
+    """Convert a dict, such as a point, into a DynamoDB item."""
+    return {k: to_attribute(v) for k, v in values.items()}
+
+
+def from_item(item:dict) -> dict:
+    """Convert a DynamoDB item into a dict."""
+    return {k: from_attribute(v) for k, v in item.items()}
+
+
+def item_size(item:dict) -> int:
+    """Approximate size of an item in bytes, as counted for capacity units."""
+    def __size(attribute):
+        (attribute_type, value), = attribute.items()
+        if attribute_type == 'M':
+            return 3 + sum(len(k) + __size(v) for k, v in value.items())
+        if attribute_type == 'L':
+            return 3 + sum(1 + __size(v) for v in value)
+        if attribute_type in ('NULL', 'BOOL'):
+            return 1
+        if attribute_type == 'N':
+            return len(value) // 2 + 1
+        return len(value.encode() if isinstance(value, str) else value)
+
+    return sum(len(k) + __size(v) for k, v in item.items())
+
+
+def point_item(track:str):
+    """Create a function converting a point into an item keyed by track and timestamp."""
+    def __item(point):
+        return to_item(dict(point, track=track))
+    return __item
+
+
+class ThroughputBudget:
+    """Class limiting the rate of capacity units used, as a token bucket refilled every second."""
+
+    def __init__(self, units_per_sec:float, burst:float=None) -> None:
+        self.rate = units_per_sec
+        self.capacity = burst or units_per_sec
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self, units:float) -> None:
+        """Wait until `units` capacity units are available, then use them."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                # Requests larger than the bucket go through once it is full
+                if self._tokens >= min(units, self.capacity):
+                    self._tokens -= units
+                    return
+                wait = (min(units, self.capacity) - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BatchWriter:
+    """
+    Class writing items to a DynamoDB table in BatchWriteItem calls of up to 25 items, several calls at a time.
+    Unprocessed items are retried with jittered exponential backoff; an optional budget caps write units per second.
+    """
+
+    def __init__(self, client, table_name:str, item_f=to_item, workers:int=4, budget:ThroughputBudget=None, max_retries:int=8, base_delay:float=0.05, max_delay:float=5.0) -> None:
+        self.client = client
+        self.table_name = table_name
+        self.item_f = item_f
+        self.workers = workers
+        self.budget = budget
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.items_written = 0
+        self.retries = 0
+        self._pool = None
+        self._pending = deque()
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Wait for all batches to be written, raising the first error."""
+        try:
+            self.flush()
+        finally:
+            if self._pool:
+                self._pool.shutdown()
+                self._pool = None
+
+    def flush(self) -> None:
+        """Wait for the batches submitted so far to be written."""
+        while self._pending:
+            self._pending.popleft().result()
+
+    def sink(self) -> Sink:
+        """Create a sink, for use as the last stage of a stream, writing each element as an item."""
+        return Sink(self.write, buffer_size=BATCH_SIZE, close=self.close)
+
+    def write(self, values:list) -> None:
+        """Write a list of values, in batches of up to 25 items, without waiting for them to complete."""
+        if self._pool is None:
+            import concurrent.futures
+            self._pool = concurrent.futures.ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='dynamodb')
+
+        items = [self.item_f(v) for v in values]
+        for i in range(0, len(items), BATCH_SIZE):
+            self._pending.append(self._pool.submit(self._write_batch, items[i:i + BATCH_SIZE]))
+
+            # Wait for the oldest batch once enough are in flight, so memory use stays bounded
+            while len(self._pending) >= 2 * self.workers:
+                self._pending.popleft().result()
+
+    def _backoff(self, attempt:int) -> float:
+        # Full jitter: a random delay up to the exponential limit
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def _write_batch(self, items:list) -> None:
+        requests = [{'PutRequest': {'Item': item}} for item in items]
+        for attempt in range(self.max_retries + 1):
+            if attempt > 0:
+                with self._lock:
+                    self.retries += 1
+                time.sleep(self._backoff(attempt))
+
+            if self.budget:
+                self.budget.acquire(sum(-(-item_size(r['PutRequest']['Item']) // WRITE_UNIT_SIZE) for r in requests))
+
+            response = self.client.batch_write_item(RequestItems={self.table_name: requests})
+            unprocessed = response.get('UnprocessedItems', {}).get(self.table_name, [])
+
+            with self._lock:
+                self.items_written += len(requests) - len(unprocessed)
+            if not unprocessed:
+                return
+
+            log.debug('%d unprocessed item(s), retrying', len(unprocessed))
+            requests = unprocessed
+
+        raise WriteError(f'Items unprocessed after {self.max_retries} retries', [r['PutRequest']['Item'] for r in requests])
+
+
+def block_key(track:str, ts:int, block_seconds:int=BLOCK_SECONDS) -> tuple:
+    """
+    Partition key (track and UTC day) and sort key (block start time) of the block holding a timestamp.
+    Block length must divide a day, so blocks never span two partitions.
+    """
+    day = datetime.datetime.fromtimestamp(ts, tz=datetime.timezone.utc).strftime('%Y-%m-%d')
+    return f'{track}/{day}', ts - (ts % block_seconds)
+
+
+def pack_block(track:str, points:list, block_seconds:int=BLOCK_SECONDS) -> dict:
+    """Pack points from one block into an item, as delta-encoded, compressed binary columns."""
+    # Imported here; only needed when packing blocks
+    import numpy as np
+
+    pk, sk = block_key(track, points[0]['ts'], block_seconds)
+    item = {
+        'pk': {'S': pk},
+        'sk': {'N': str(sk)},
+        'n': {'N': str(len(points))}
+    }
+    for column in BLOCK_SCALES:
+        if column not in points[0]:
+            continue
+        values = np.rint(np.array([fixed_value(p, column) for p in points], dtype=np.float64)).astype(np.int64)
+        # First value in full, then deltas between neighbouring points, which are small so compress well
+        data = values[:1].astype('<i8').tobytes() + np.diff(values).astype('<i4').tobytes()
+        item[COLUMN_PREFIX + column] = {'B': zlib.compress(data)}
+    return item
+
+
+def unpack_block(item:dict) -> dict:
+    """Unpack the columns held in a block item into a dict of NumPy arrays."""
+    import numpy as np
+
+    columns = {}
+    for name, attribute in item.items():
+        if not name.startswith(COLUMN_PREFIX):
+            continue
+        column = name[len(COLUMN_PREFIX):]
+        data = zlib.decompress(attribute['B'])
+        first = np.frombuffer(data[:8], dtype='<i8')
+        values = np.concatenate((first, first + np.cumsum(np.frombuffer(data[8:], dtype='<i4'), dtype=np.int64)))
+        scale = BLOCK_SCALES.get(column, 1)
+        columns[column] = values / scale if scale != 1 else values
+    return columns
+
+
+def block_items(track:str, block_seconds:int=BLOCK_SECONDS):
+    """Create a pipe function grouping a time-ordered stream of points into block items."""
+    def __blocks(iter_in):
+        block = []
+        block_start = None
+        for point in iter_in:
+            start = block_key(track, point['ts'], block_seconds)
+            if block and start != block_start:
+                yield pack_block(track, block, block_seconds)
+                block = []
+            block_start = start
+            block.append(point)
+        if block:
+            yield pack_block(track, block, block_seconds)
+
+    return __blocks
+
+
+def to_points(columns:dict) -> list:
+    """Convert a dict of columns into a list of points."""
+    names = list(columns)
+    return [dict(zip(names, values)) for values in zip(*(columns[n].tolist() for n in names))]
+
+
+def concat_columns(blocks:list) -> dict:
+    """Join the columns of several unpacked blocks, in order."""
+    import numpy as np
+
+    if not blocks:
+        return {}
+    return {c: np.concatenate([b[c] for b in blocks]) for c in blocks[0]}
+
+
+def query_pages(client, table_name:str, pk:str, sk_from:int, sk_to:int, columns:list=None, page_size:int=None) -> list:
+    """Query the block items of one partition between two sort keys, following pagination. Returns the items in sort key order."""
+    request = {
+        'TableName': table_name,
+        'KeyConditionExpression': '#pk = :pk AND #sk BETWEEN :from AND :to',
+        'ExpressionAttributeNames': {'#pk': 'pk', '#sk': 'sk'},
+        'ExpressionAttributeValues': {':pk': {'S': pk}, ':from': {'N': str(sk_from)}, ':to': {'N': str(sk_to)}}
+    }
+    if columns:
+        # Only fetch the columns needed
+        names = {f'#c{i}': COLUMN_PREFIX + c for i, c in enumerate(columns)}
+        request['ProjectionExpression'] = ', '.join(['#sk'] + list(names))
+        request['ExpressionAttributeNames'].update(names)
+    if page_size:
+        request['Limit'] = page_size
+
+    items = []
+    while True:
+        response = client.query(**request)
+        items.extend(response.get('Items', []))
+        if 'LastEvaluatedKey' not in response:
+            return items
+        request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def query_range(client, table_name:str, track:str, ts_from:int, ts_to:int, columns:list=None, workers:int=4, block_seconds:int=BLOCK_SECONDS, page_size:int=None) -> dict:
+    """
+    Read a track's points between two timestamps (inclusive) as a dict of NumPy columns.
+    The range is split by partition, then into up to `workers` sort key ranges, and each range is queried in parallel.
+    """
+    import concurrent.futures
+    import numpy as np
+
+    if columns and 'ts' not in columns:
+        # Timestamps are needed to trim the first and last blocks
+        columns = ['ts'] + list(columns)
+
+    # Split the range on block boundaries, into ranges that do not span a partition
+    ranges = []
+    block_start = block_key(track, ts_from, block_seconds)[1]
+    while block_start <= ts_to:
+        pk = block_key(track, block_start, block_seconds)[0]
+        start = block_start
+        while block_start <= ts_to and block_key(track, block_start, block_seconds)[0] == pk:
+            block_start += block_seconds
+        ranges.append((pk, start, block_start - block_seconds))
+
+    # Split ranges further, so each worker has one
+    segments = []
+    for pk, start, end in ranges:
+        blocks = (end - start) // block_seconds + 1
+        step = -(-blocks // max(1, workers // len(ranges))) * block_seconds
+        segments.extend((pk, s, min(end, s + step - block_seconds)) for s in range(start, end + 1, step))
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=workers) as pool:
+        pages = pool.map(lambda s: query_pages(client, table_name, *s, columns=columns, page_size=page_size), segments)
+        blocks = [unpack_block(item) for items in pages for item in items]
+
+    result = concat_columns(blocks)
+    if not result:
+        return result
+
+    # Trim points outside the range from the first and last blocks
+    keep = (result['ts'] >= ts_from) & (result['ts'] <= ts_to)
+    return {c: v[keep] for c, v in result.items()} if not np.all(keep) else result
+
+
+class ScanSummary:
+    """
+    Class summarising block items per track, such as total descent and top speed.
+    Summaries of separate sets of blocks can be merged, so blocks can be summarised in any order and on any worker.
+    The first and last time and altitude of each block are kept, so altitude changes between neighbouring blocks are counted as blocks are merged.
+    """
+
+    def __init__(self) -> None:
+        self.tracks = {}
+
+    def add_block(self, track:str, columns:dict) -> None:
+        """Add the unpacked columns of one block."""
+        import numpy as np
+
+        summary = {'blocks': 1, 'points': len(next(iter(columns.values()), []))}
+        if 'ts' in columns and len(columns['ts']):
+            summary['ts_from'] = int(columns['ts'][0])
+            summary['ts_to'] = int(columns['ts'][-1])
+        if 'alt' in columns and len(columns['alt']):
+            alt_d = np.diff(columns['alt'])
+            summary['min_alt'] = int(columns['alt'].min())
+            summary['max_alt'] = int(columns['alt'].max())
+            summary['total_asc'] = int(alt_d[alt_d > 0].sum())
+            summary['total_desc'] = int(-alt_d[alt_d < 0].sum())
+            if 'ts' in columns:
+                summary['ends'] = [(int(columns['ts'][0]), int(columns['alt'][0]), int(columns['ts'][-1]), int(columns['alt'][-1]))]
+        if 'spd' in columns and len(columns['spd']):
+            i = int(columns['spd'].argmax())
+            summary['max_spd'] = float(columns['spd'][i])
+            if 'ts' in columns:
+                summary['max_spd_ts'] = int(columns['ts'][i])
+
+        self._merge_track(track, summary)
+
+    def merge(self, other:'ScanSummary') -> 'ScanSummary':
+        """Merge another summary into this one."""
+        for track, summary in other.tracks.items():
+            self._merge_track(track, summary)
+        return self
+
+    def _merge_track(self, track:str, summary:dict) -> None:
+        current = self.tracks.get(track)
+        if current is None:
+            self.tracks[track] = dict(summary, ends=list(summary['ends'])) if 'ends' in summary else dict(summary)
+            return
+
+        for k in ('blocks', 'points', 'total_asc', 'total_desc'):
+            if k in summary:
+                current[k] = current.get(k, 0) + summary[k]
+        if 'ends' in summary:
+            self._stitch(current, summary['ends'])
+        for k in ('ts_from', 'min_alt'):
+            if k in summary:
+                current[k] = min(current[k], summary[k]) if k in current else summary[k]
+        for k in ('ts_to', 'max_alt'):
+            if k in summary:
+                current[k] = max(current[k], summary[k]) if k in current else summary[k]
+        if 'max_spd' in summary and summary['max_spd'] > current.get('max_spd', float('-inf')):
+            current['max_spd'] = summary['max_spd']
+            if 'max_spd_ts' in summary:
+                current['max_spd_ts'] = summary['max_spd_ts']
+
+    @staticmethod
+    def _stitch(current:dict, ends:list) -> None:
+        """Insert the ends of merged blocks in time order, counting the altitude steps to their new neighbours."""
+        def __step(prev, following, sign):
+            d = following[1] - prev[3]
+            current['total_asc'] = current.get('total_asc', 0) + max(d, 0) * sign
+            current['total_desc'] = current.get('total_desc', 0) + max(-d, 0) * sign
+
+        # Steps between the merged blocks were counted in their totals, and are counted again as each is inserted
+        for prev, following in zip(ends, ends[1:]):
+            __step(prev, following, -1)
+
+        current_ends = current.setdefault('ends', [])
+        for end in ends:
+            i = bisect.bisect(current_ends, end)
+            prev = current_ends[i - 1] if i > 0 else None
+            following = current_ends[i] if i < len(current_ends) else None
+            if prev and following:
+                __step(prev, following, -1)
+            if prev:
+                __step(prev, end, 1)
+            if following:
+                __step(end, following, 1)
+            current_ends.insert(i, end)
+
+
+def summarise_items(items:list) -> ScanSummary:
+    """Unpack and summarise block items. Module-level, so it can run in a worker process."""
+    summary = ScanSummary()
+    for item in items:
+        # Partition key is track/day
+        track = item['pk']['S'].rsplit('/', 1)[0]
+        summary.add_block(track, unpack_block(item))
+    return summary
+
+
+def scan_pages(client, table_name:str, segment:int, total_segments:int, columns:list=None, page_size:int=None):
+    """Scan one segment of a table, yielding a list of items per page."""
+    request = {
+        'TableName': table_name,
+        'Segment': segment,
+        'TotalSegments': total_segments
+    }
+    if columns:
+        # Only fetch the columns needed, with the partition key to group by track
+        names = {'#pk': 'pk'}
+        names.update({f'#c{i}': COLUMN_PREFIX + c for i, c in enumerate(columns)})
+        request['ProjectionExpression'] = ', '.join(names)
+        request['ExpressionAttributeNames'] = names
+    if page_size:
+        request['Limit'] = page_size
+
+    while True:
+        response = client.scan(**request)
+        yield response.get('Items', [])
+        if 'LastEvaluatedKey' not in response:
+            return
+        request['ExclusiveStartKey'] = response['LastEvaluatedKey']
+
+
+def scan_summary(client, table_name:str, segments:int=4, columns:list=('ts', 'spd', 'alt'), workers:int=None, executor:str='process', page_size:int=None) -> ScanSummary:
+    """
+    Summarise every block in a table with a parallel scan.
+    Segments are scanned in a pool of threads; each page of items is unpacked and summarised in a pool of `executor` workers, then the summaries merged.
+    Each segment holds at most 2 pages per worker in the pool at once, so a fast scan waits for decoding rather than queuing the table in memory.
+    """
+    if executor not in EXECUTORS:
+        raise ValueError(f'Unknown executor: {executor}')
+
+    import concurrent.futures
+    pool_class = getattr(concurrent.futures, EXECUTORS[executor])
+
+    # Pages decoding at once per segment, as in BatchWriter
+    max_pending = 2 * (workers or os.cpu_count() or 1)
+
+    with pool_class(max_workers=workers) as decode_pool, concurrent.futures.ThreadPoolExecutor(max_workers=segments) as scan_pool:
+        def __scan(segment):
+            # Send each page to be decoded as soon as it arrives, and merge the oldest once too many are pending
+            segment_summary = ScanSummary()
+            pending = deque()
+            for items in scan_pages(client, table_name, segment, segments, columns, page_size):
+                if items:
+                    pending.append(decode_pool.submit(summarise_items, items))
+                while len(pending) >= max_pending:
+                    segment_summary.merge(pending.popleft().result())
+            while pending:
+                segment_summary.merge(pending.popleft().result())
+            return segment_summary
+
+        summary = ScanSummary()
+        for segment_summary in scan_pool.map(__scan, range(segments)):
+            summary.merge(segment_summary)
+
+    log.info('Summarised %d track(s) from %s', len(summary.tracks), table_name)
+    return summary
+
+
+class LocalDynamoDB:
+    """
+    Class standing in for a low-level DynamoDB client, holding tables in memory.
+    Supports the calls made by this module; `unprocessed_rate` is the chance each item in a batch is returned unprocessed.
+    """
+
+    def __init__(self, unprocessed_rate:float=0.0, seed:int=None) -> None:
+        self.tables = {}
+        self.unprocessed_rate = unprocessed_rate
+        self.calls = 0
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def create_table(self, TableName:str, KeySchema:list, **kwargs) -> dict:
+        keys = {k['KeyType']: k['AttributeName'] for k in KeySchema}
+        self.tables[TableName] = {'hash': keys['HASH'], 'range': keys.get('RANGE'), 'items': {}}
+        return {'TableDescription': {'TableName': TableName, 'KeySchema': KeySchema}}
+
+    def batch_write_item(self, RequestItems:dict) -> dict:
+        with self._lock:
+            self.calls += 1
+            if sum(len(r) for r in RequestItems.values()) > BATCH_SIZE:
+                raise ValueError(f'Too many items in batch; at most {BATCH_SIZE}')
+
+            unprocessed = {}
+            for table_name, requests in RequestItems.items():
+                for r in requests:
+                    if self._random.random() < self.unprocessed_rate:
+                        unprocessed.setdefault(table_name, []).append(r)
+                    else:
+                        self._put(table_name, r['PutRequest']['Item'])
+
+        return {'UnprocessedItems': unprocessed}
+
+    def get_item(self, TableName:str, Key:dict) -> dict:
+        item = self.tables[TableName]['items'].get(self._key(TableName, Key))
+        return {'Item': item} if item else {}
+
+    def put_item(self, TableName:str, Item:dict) -> dict:
+        with self._lock:
+            self._put(TableName, Item)
+        return {}
+
+    def query(self, TableName:str, KeyConditionExpression:str, ExpressionAttributeValues:dict, ExpressionAttributeNames:dict=None, ProjectionExpression:str=None, Limit:int=None, ExclusiveStartKey:dict=None, **kwargs) -> dict:
+        """Query a partition; only equality on the hash key, with an optional BETWEEN on the range key, is supported."""
+        names = ExpressionAttributeNames or {}
+        values = {k: from_attribute(v) for k, v in ExpressionAttributeValues.items()}
+        match = re.fullmatch(r'\s*(\S+)\s*=\s*(:\w+)(?:\s+AND\s+(\S+)\s+BETWEEN\s+(:\w+)\s+AND\s+(:\w+))?\s*', KeyConditionExpression)
+        if not match:
+            raise ValueError(f'Unsupported key condition: {KeyConditionExpression}')
+
+        table = self.tables[TableName]
+        pk = values[match.group(2)]
+        lo, hi = (values[match.group(4)], values[match.group(5)]) if match.group(3) else (None, None)
+        keys = sorted(k for k in table['items'] if k[0] == pk and (lo is None or lo <= k[1] <= hi))
+        return self._page(table, keys, names, ProjectionExpression, Limit, ExclusiveStartKey, TableName)
+
+    def scan(self, TableName:str, Segment:int=0, TotalSegments:int=1, ExpressionAttributeNames:dict=None, ProjectionExpression:str=None, Limit:int=None, ExclusiveStartKey:dict=None, **kwargs) -> dict:
+        """Scan one segment of a table; items are assigned to segments by their hash key."""
+        table = self.tables[TableName]
+        keys = sorted(k for k in table['items'] if zlib.crc32(repr(k[0]).encode()) % TotalSegments == Segment)
+        return self._page(table, keys, ExpressionAttributeNames or {}, ProjectionExpression, Limit, ExclusiveStartKey, TableName)
+
+    def _key(self, table_name:str, item:dict) -> tuple:
+        table = self.tables[table_name]
+        return tuple(from_attribute(item[k]) for k in (table['hash'], table['range']) if k)
+
+    def _page(self, table:dict, keys:list, names:dict, projection:str, limit:int, start_key:dict, table_name:str) -> dict:
+        if start_key:
+            start = self._key(table_name, start_key)
+            keys = [k for k in keys if k > start]
+
+        page = keys[:limit] if limit else keys
+        items = [table['items'][k] for k in page]
+        if projection:
+            attributes = [names.get(a.strip(), a.strip()) for a in projection.split(',')]
+            items = [{a: item[a] for a in attributes if a in item} for item in items]
+
+        response = {'Items': items, 'Count': len(items)}
+        if len(page) < len(keys):
+            last = table['items'][page[-1]]
+            response['LastEvaluatedKey'] = {k: last[k] for k in (table['hash'], table['range']) if k}
+        return response
+
+    def _put(self, table_name:str, item:dict) -> None:
+        self.tables[table_name]['items'][self._key(table_name, item)] = item
+
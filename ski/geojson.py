@@ -0,0 +1,102 @@
+"""
+  Module providing a streaming writer of GeoJSON files.
+  A track is written as a FeatureCollection with a LineString feature per segment, without building the document in memory.
+  A segment of one point is written as a Point feature, as a LineString needs two positions.
+"""
+
+import json
+import logging
+
+from .stream import Sink
+from .utils import iso_utc
+
+# Points formatted and written together by a sink
+CHUNK_SIZE = 1000
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+class GeoJSONWriter:
+    """
+    Class writing points to a GeoJSON file as they arrive.
+    Coordinates are [lon, lat, alt], written to `precision` decimal places; a new feature is started wherever points are more than `split_gap` seconds apart.
+    Each feature's properties hold its segment number, start and end times and point count; a segment of one point is written as a Point.
+    """
+
+    def __init__(self, path:str, name:str=None, precision:int=6, split_gap:int=None, chunk_size:int=CHUNK_SIZE) -> None:
+        self.path = path
+        self.name = name
+        self.split_gap = split_gap
+        self.chunk_size = chunk_size
+        self.point_count = 0
+        self.segment_count = 0
+        self._coord_format = f'[{{:.{precision}f}},{{:.{precision}f}}'
+        self._segment = None
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write('{"type":"FeatureCollection","features":[\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """End the open feature and the document."""
+        if self._file.closed:
+            return
+
+        self._file.write(self._end_segment() + '\n]}\n')
+        self._file.close()
+        log.info('Wrote %d point(s) in %d feature(s) to %s', self.point_count, self.segment_count, self.path)
+
+    def write(self, point:dict) -> None:
+        self.write_points([point])
+
+    def write_points(self, points:list) -> None:
+        """Format a chunk of points and write them at once."""
+        chunk = []
+        for p in points:
+            ts = p['ts']
+            coord = self._coord_format.format(p['lon'], p['lat']) + (f',{p["alt"]}]' if 'alt' in p else ']')
+            segment = self._segment
+            if segment is None or (self.split_gap is not None and ts - segment['end'] > self.split_gap):
+                chunk.append(self._end_segment())
+                self.segment_count += 1
+                # The geometry is only started at the second point, once the segment is known to be a line
+                segment = self._segment = {'segment': self.segment_count, 'start': ts, 'end': ts, 'points': 0, 'first': coord}
+            elif segment['points'] == 1:
+                chunk.append(self._start_feature(segment, 'LineString') + '[\n' + segment['first'] + ',\n' + coord)
+            else:
+                chunk.append(',\n' + coord)
+
+            segment['end'] = ts
+            segment['points'] += 1
+
+        self._file.write(''.join(chunk))
+        self.point_count += len(points)
+
+    def sink(self) -> Sink:
+        """Create a sink writing points to the file a chunk at a time, closing it when the stream ends."""
+        return Sink(self.write_points, self.chunk_size, close=self.close)
+
+    def _start_feature(self, segment:dict, geometry_type:str) -> str:
+        return (',\n' if segment['segment'] > 1 else '') + '{"type":"Feature","geometry":{"type":"' + geometry_type + '","coordinates":'
+
+    def _end_segment(self) -> str:
+        # Properties follow the coordinates, as the end of a segment is only known once it is written
+        segment = self._segment
+        if segment is None:
+            return ''
+        self._segment = None
+
+        if segment['points'] == 1:
+            geometry = self._start_feature(segment, 'Point') + segment['first'] + '}'
+        else:
+            geometry = '\n]}'
+
+        properties = {'segment': segment['segment'], 'start': iso_utc(segment['start']), 'end': iso_utc(segment['end']), 'points': segment['points']}
+        if self.name:
+            properties['name'] = self.name
+        return geometry + ',"properties":' + json.dumps(properties) + '}'
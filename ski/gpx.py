@@ -0,0 +1,204 @@
+"""
+  Module providing a streaming reader and writer of GPX files.
+  Track points are read incrementally and cleared once read, so memory stays flat however large the file.
+  Points are yielded as GSD values held as ints, as read from a DG-100, so they are built by `build_point_from_values`.
+"""
+
+import datetime
+import logging
+
+from .stream import Sink
+from .utils import iso_utc
+
+# GPX speeds are in m/s; GSD speeds in 10^-2 km/h
+MS_TO_GSD_SPEED = 360
+
+# GSD altitudes are in 10^-4 m
+GSD_ALT_SCALE = 10000
+
+# Points formatted and written together by a sink
+CHUNK_SIZE = 1000
+
+# Namespace of the Garmin track point extension, holding speed; GPX 1.1 only allows elements from other namespaces in extensions
+TPX_NS = 'http://www.garmin.com/xmlschemas/TrackPointExtension/v2'
+
+GPX_HEADER = f'<?xml version="1.0" encoding="UTF-8"?>\n<gpx version="1.1" creator="pySki" xmlns="http://www.topografix.com/GPX/1/1" xmlns:gpxtpx="{TPX_NS}">\n'
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+# Local names of the tags seen so far; the same few tags repeat for every point
+_local_names = {}
+
+
+def _local_name(tag:str) -> str:
+    # Namespaces differ between GPX versions and extensions, so match on the local name
+    name = _local_names.get(tag)
+    if name is None:
+        name = _local_names[tag] = tag.rpartition('}')[2]
+    return name
+
+
+def convert_gpx_coord(value:str) -> int:
+    """Convert a coordinate in decimal degrees into a GSD coordinate value (degrees, then 10^-4 minutes)."""
+    degrees = float(value)
+    sign = -1 if degrees < 0 else 1
+    d, f = divmod(abs(degrees), 1)
+    m = round(f * 600000)
+    if m == 600000:
+        d, m = d + 1, 0
+    return sign * (int(d) * 1000000 + m)
+
+
+def convert_gpx_time(value:str) -> tuple:
+    """
+    Convert an ISO 8601 time into GSD time (HHMMSS) and date (DDMMYY) values.
+    UTC times are read by position rather than parsed, as this runs for every point; other times are converted to UTC.
+    """
+    value = value.strip()
+    if len(value) >= 20 and value.endswith('Z') and value[4] == '-' and value[10] == 'T':
+        # e.g. 2018-02-15T16:16:55Z, with any fraction of a second ignored
+        return int(value[11:13] + value[14:16] + value[17:19]), int(value[8:10] + value[5:7] + value[2:4])
+
+    dt = datetime.datetime.fromisoformat(value)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(datetime.timezone.utc)
+    return dt.hour * 10000 + dt.minute * 100 + dt.second, dt.day * 10000 + dt.month * 100 + dt.year % 100
+
+
+def read_track_point(elem) -> tuple:
+    """Read a `trkpt` element into GSD values (lat, lon, tm, dt, spd, alt). Speed may be given in the point or an extension."""
+    names = _local_names
+    fields = {names.get(e.tag) or _local_name(e.tag): e.text for e in elem.iter()}
+    if not fields.get('time'):
+        raise ValueError('Track point has no time')
+
+    tm, dt = convert_gpx_time(fields['time'])
+    spd = round(float(fields['speed']) * MS_TO_GSD_SPEED) if fields.get('speed') else 0
+    alt = round(float(fields['ele']) * GSD_ALT_SCALE) if fields.get('ele') else 0
+    return convert_gpx_coord(elem.get('lat')), convert_gpx_coord(elem.get('lon')), tm, dt, spd, alt
+
+
+def stream_records(f, position:dict=None) -> None:
+    """
+    Retrieve GPS records from a GPX file, one per track point.
+    The number of segments is not known until the end of the file, so records have no total.
+    Pass a position to resume after that record; the file is read again up to it.
+    """
+    # Imported here; only needed when reading GPX
+    import xml.etree.ElementTree as ET
+
+    point_count = 0
+    section_count = 0
+    skip = position['point_count'] if position else 0
+    segment = None
+
+    names = _local_names
+    for event, elem in ET.iterparse(f, events=('start', 'end')):
+        name = names.get(elem.tag) or _local_name(elem.tag)
+
+        if event == 'start':
+            if name == 'trkseg':
+                section_count += 1
+                segment = elem
+            continue
+
+        if name in ('trkseg', 'rte', 'wpt', 'metadata'):
+            # Drop anything else that would build up
+            elem.clear()
+            continue
+
+        if name != 'trkpt':
+            continue
+
+        point_count += 1
+        try:
+            if point_count > skip:
+                yield {
+                    'point': read_track_point(elem),
+                    'point_count': point_count,
+                    'section_count': section_count,
+                    'total_sections': None,
+                    'position': {
+                        'point_count': point_count,
+                        'section_count': section_count
+                    }
+                }
+
+        except (TypeError, ValueError) as e:
+            log.warn('Failed to read track point %d: %s', point_count, e)
+
+        finally:
+            # Points are read once ended, so remove them from the segment
+            if segment is not None:
+                del segment[:]
+
+    log.info('stream_records: read %d point(s) in %d segment(s)', point_count, section_count)
+
+
+class GPXWriter:
+    """
+    Class writing points to a GPX file as they arrive, as a single track.
+    Coordinates are written to `precision` decimal places; a new segment is started wherever points are more than `split_gap` seconds apart.
+    """
+
+    def __init__(self, path:str, name:str=None, precision:int=6, split_gap:int=None, chunk_size:int=CHUNK_SIZE) -> None:
+        self.path = path
+        self.split_gap = split_gap
+        self.chunk_size = chunk_size
+        self.point_count = 0
+        self.segment_count = 0
+        self._trkpt_format = f'<trkpt lat="{{:.{precision}f}}" lon="{{:.{precision}f}}">'
+        self._last_ts = None
+        self._file = open(path, 'w', encoding='utf-8')
+        self._file.write(GPX_HEADER + '<trk>\n')
+        if name:
+            # Imported here; saxutils loads urllib
+            from xml.sax.saxutils import escape
+            self._file.write(f'<name>{escape(name)}</name>\n')
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """End the open segment, the track and the document."""
+        if self._file.closed:
+            return
+
+        if self.segment_count:
+            self._file.write('</trkseg>\n')
+        self._file.write('</trk>\n</gpx>\n')
+        self._file.close()
+        log.info('Wrote %d point(s) in %d segment(s) to %s', self.point_count, self.segment_count, self.path)
+
+    def write(self, point:dict) -> None:
+        self.write_points([point])
+
+    def write_points(self, points:list) -> None:
+        """Format a chunk of points and write them at once."""
+        chunk = []
+        for p in points:
+            ts = p['ts']
+            if self._last_ts is None or (self.split_gap is not None and ts - self._last_ts > self.split_gap):
+                chunk.append('</trkseg>\n<trkseg>\n' if self.segment_count else '<trkseg>\n')
+                self.segment_count += 1
+            self._last_ts = ts
+
+            chunk.append(self._trkpt_format.format(p['lat'], p['lon']))
+            if 'alt' in p:
+                chunk.append(f'<ele>{p["alt"]}</ele>')
+            chunk.append(f'<time>{iso_utc(ts)}</time>')
+            if 'spd' in p:
+                # Speed in m/s, as read back by `stream_records`
+                chunk.append(f'<extensions><gpxtpx:TrackPointExtension><gpxtpx:speed>{p["spd"] / 3.6:.3f}</gpxtpx:speed></gpxtpx:TrackPointExtension></extensions>')
+            chunk.append('</trkpt>\n')
+
+        self._file.write(''.join(chunk))
+        self.point_count += len(points)
+
+    def sink(self) -> Sink:
+        """Create a sink writing points to the file a chunk at a time, closing it when the stream ends."""
+        return Sink(self.write_points, self.chunk_size, close=self.close)
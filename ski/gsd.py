@@ -278,6 +278,14 @@ def convert_gsd_coord(gsd_coord:str) -> tuple:
     return dms
 
 
+def convert_gsd_coord_value(gsd_coord:int) -> tuple:
+    """Convert a GSD coordinate held as an int into a DMS tuple."""
+    # Degrees are the leading digits (with sign); minutes are the last 6 digits in 10^-4 minutes
+    sign = -1 if gsd_coord < 0 else 1
+    d, m = divmod(abs(gsd_coord), 1000000)
+    return add_seconds(sign * d, m / 10000.0)
+
+
 def convert_gsd_date(gsd_dt:str, gsd_tm:str) -> datetime.datetime:
     """Convert read GSD date and time strings into datetime object."""
     if not gsd_dt.isnumeric():
@@ -300,6 +308,14 @@ def convert_gsd_date(gsd_dt:str, gsd_tm:str) -> datetime.datetime:
     return dt
 
 
+def convert_gsd_date_values(gsd_dt:int, gsd_tm:int) -> datetime.datetime:
+    """Convert GSD date (DDMMYY) and time (HHMMSS) held as ints into a naive datetime object, in UTC."""
+    day, month, year = gsd_dt // 10000, (gsd_dt // 100) % 100, gsd_dt % 100
+    hour, minute, second = gsd_tm // 10000, (gsd_tm // 100) % 100, gsd_tm % 100
+    # Two digit years follow strptime: 69-99 are 1900s
+    return datetime.datetime(year + (1900 if year >= 69 else 2000), month, day, hour, minute, second)
+
+
 def convert_gsd_speed(gsd_spd:str) -> float:
     """Convert read GSD speed into km/h."""
     if not gsd_spd.isnumeric():
@@ -317,17 +333,32 @@ def convert_gsd_speed(gsd_spd:str) -> float:
     return spd
 
 
-def stream_records(f) -> None:
-    """Retrieve GPS records from the specified GSD file."""
+def stream_records(f, position:dict=None) -> None:
+    """
+    Retrieve GPS records from the specified GSD file.
+    Each record includes its position (section byte offset and index); pass a position to resume after that record.
+    """
     # Create GSDFile object; read the header
     gsd = GSDFile(f)
 
     point_count = 0
     section_count = 0
+    skip = 0
+
+    if position:
+        # Continue from the section containing the last record
+        f.seek(position['offset'])
+        point_count = position['point_count'] - position['index'] - 1
+        section_count = position['section_count'] - 1
+        skip = position['index'] + 1
+        log.info('stream_records: resuming at section %d, point %d', position['section_count'], position['index'] + 1)
 
     #for s in gsd.sections:
     while True:
         try:
+            # Points section starts here
+            offset = f.tell()
+
             points = gsd.load_gsd_points()
             if len(points) == 0:
                 log.debug('stream_records: reached end of stream')
@@ -337,15 +368,27 @@ def stream_records(f) -> None:
             section_count += 1
             
             # Yield each point
-            for p in points:
+            for i, p in enumerate(points):
                 # Increment counter
                 point_count += 1
+
+                # Skip points already processed
+                if skip > 0:
+                    skip -= 1
+                    continue
+
                 # Return point data to the caller
                 yield {
                     'point': p,
                     'point_count': point_count,
                     'section_count': section_count,
-                    'total_sections': len(gsd.sections)
+                    'total_sections': len(gsd.sections),
+                    'position': {
+                        'offset': offset,
+                        'index': i,
+                        'point_count': point_count,
+                        'section_count': section_count
+                    }
                 }
 
         except EOFError:
@@ -1,33 +1,153 @@
 import json
 import logging
-import serial
+import os
 import sys
+from .archive import TrackArchive
+from .capture import CaptureSerial, ReplaySerial
+from .checkpoint import Checkpoint, positioned, source_identity
 from .dg100 import stream_records as stream_records_from_device
-from .dg100 import serial_log
+from .devices import DownloadManager
+from .dg100 import serial_log, sync_tracks
+from .geojson import GeoJSONWriter
+from .gpx import GPXWriter, stream_records as stream_records_from_gpx
 from .gsd import stream_records as stream_records_from_file
-from .processor import add_timezone, build_point_from_gsd, enrich_point, linear_interpolate, summary
-from .stream import Stream
+from .nmea import stream_records as stream_records_from_nmea
+from .logging import init as init_loggers, point_trace
+from .processor import add_timezone, build_point_from_gsd, build_point_from_values, enrich_point, linear_interpolate, summary
+from .store import TRACK_KEY, PointStore
+from .stream import Profiler, Stream, stateful
+from .trackfile import TrackWriter
 from .utils import DateAwareJSONEncoder, MovingWindow
 
 
+# Options taken by each source command
+DEVICE_OPTIONS = {'workers', 'profiler', 'checkpoint', 'resume', 'archive', 'capture', 'store', 'output'}
+REPLAY_OPTIONS = DEVICE_OPTIONS - {'capture'}
+FILE_OPTIONS = REPLAY_OPTIONS - {'archive'}
+# Devices are downloaded in threads with their own pipelines, which are not checkpointed or profiled
+DEVICES_OPTIONS = {'workers'}
+
+# Command line flag setting each option
+OPTION_FLAGS = {
+    'workers': '-j/--jobs',
+    'profiler': '--profile',
+    'checkpoint': '-c/--checkpoint',
+    'resume': '--resume',
+    'archive': '-a/--archive',
+    'capture': '--capture',
+    'store': '-s/--store',
+    'output': '-o/--output'
+}
+
+
 def cmdline(cmd_args:list):
     #logging.basicConfig(level=logging.INFO)
     """Process the command line"""
+    # Options passed to the load functions
+    options = {}
+    # Point trace options, which may be given in any order
+    trace = {}
+
+    def __load(load_f, source, supported:set):
+        if check_options(command, options, supported):
+            init_loggers(**trace)
+            load_f(source, **options)
+
     while len(cmd_args) > 0:
         command = cmd_args.pop(0)
 
         if command == '-d' or command == '--device':
             # Load from serial device
-            device_path = cmd_args.pop(0)
-            load_from_device(device_path)
+            __load(load_from_device, cmd_args.pop(0), DEVICE_OPTIONS)
+            break
+
+        if command == '--devices':
+            # Load from several serial devices at once, given as PORT,PORT,...
+            __load(load_from_devices, cmd_args.pop(0).split(','), DEVICES_OPTIONS)
             break
 
         if command == '-f' or command == '--file':
             # Load from a file
-            file_name = cmd_args.pop(0)
-            load_from_gsd_file(file_name)
+            __load(load_from_gsd_file, cmd_args.pop(0), FILE_OPTIONS)
+            break
+
+        if command == '-g' or command == '--gpx':
+            # Load from a GPX file
+            __load(load_from_gpx_file, cmd_args.pop(0), FILE_OPTIONS)
             break
 
+        if command == '-n' or command == '--nmea':
+            # Load from a file of NMEA sentences
+            __load(load_from_nmea_file, cmd_args.pop(0), FILE_OPTIONS)
+            break
+
+        if command == '-r' or command == '--replay':
+            # Load from a captured serial session
+            __load(load_from_replay, cmd_args.pop(0), REPLAY_OPTIONS)
+            break
+
+        if command == '--capture':
+            # Capture the raw serial session to a file
+            options['capture'] = cmd_args.pop(0)
+            continue
+
+        if command == '-a' or command == '--archive':
+            # Only download tracks not already held in a local archive
+            options['archive'] = TrackArchive(cmd_args.pop(0))
+            continue
+
+        if command == '-s' or command == '--store':
+            # Save built points to a local store
+            options['store'] = PointStore(cmd_args.pop(0))
+            continue
+
+        if command == '-o' or command == '--output':
+            # Write processed points to a GPX, GeoJSON or compressed track file, opened once the load starts
+            options['output'] = cmd_args.pop(0)
+            continue
+
+        if command == '-c' or command == '--checkpoint':
+            # Save periodic checkpoints to a file
+            options['checkpoint'] = Checkpoint(cmd_args.pop(0))
+            continue
+
+        if command == '--resume':
+            # Continue from the last checkpoint
+            options['resume'] = True
+            continue
+
+        if command == '-j' or command == '--jobs':
+            # Build points using a pool of worker processes
+            options['workers'] = int(cmd_args.pop(0))
+            continue
+
+        if command == '--profile':
+            # Report time spent in each pipeline stage
+            options['profiler'] = Profiler()
+            continue
+
+        if command == '--profile-memory':
+            # Report time and memory allocated in each pipeline stage
+            options['profiler'] = Profiler(trace_memory=True)
+            continue
+
+        if command == '-t' or command == '--trace':
+            # Trace points to a JSON lines file
+            trace['trace_path'] = cmd_args.pop(0)
+            continue
+
+        if command == '--trace-every':
+            # Only trace every Nth second
+            trace['trace_every'] = int(cmd_args.pop(0))
+            continue
+
+        if command == '--trace-window':
+            # Limit trace to a window of timestamps, given as FROM:TO
+            ts_from, ts_to = cmd_args.pop(0).split(':')
+            trace['trace_from'] = int(ts_from) if ts_from else None
+            trace['trace_to'] = int(ts_to) if ts_to else None
+            continue
+
         if command == '-v':
             # Enable debug logging
             logging.basicConfig(level=logging.DEBUG)
@@ -35,76 +155,310 @@ def cmdline(cmd_args:list):
 
         print(f'Unknkown command: {command}')
 
+    # Flush any point trace
+    point_trace.close()
+
+    if 'store' in options:
+        options['store'].close()
+
+    if 'profiler' in options:
+        print(options['profiler'].report())
+
+
+def check_options(command:str, options:dict, supported:set) -> bool:
+    """Check a source command takes all the options given, printing any it does not."""
+    unsupported = [OPTION_FLAGS[o] for o in options if o not in supported]
+    if unsupported:
+        print(f'{command} does not support {", ".join(unsupported)}')
+        return False
+    if options.get('output') and options.get('resume'):
+        # A resumed load only has the points after the checkpoint
+        print(f'{OPTION_FLAGS["output"]} cannot be used with --resume; load again without --resume to write the output')
+        return False
+    return True
+
+
+def open_output(path:str):
+    """Open a writer for processed points, chosen by the file's extension."""
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.gpx':
+        return GPXWriter(path)
+    if ext in ('.geojson', '.json'):
+        return GeoJSONWriter(path)
+    return TrackWriter(path, compression='zlib')
+
+
+def build_stream(stream, build_f, workers:int):
+    """Add the point building stage to a stream, in parallel if workers are requested."""
+    # Wrapped stages are closures, which cannot be sent to worker processes
+    executor = 'process' if build_f in (build_point_from_gsd, build_point_from_values) else 'thread'
+    if not isinstance(stream, Stream):
+        # An AsyncStream runs workers in its map stage
+        return stream.map(build_f, name='build', workers=workers, executor=executor)
+    if workers > 0:
+        return stream.parallel_map(build_f, workers=workers, executor=executor, name='build')
+    return stream.map(build_f, name='build')
+
         
-def load_stream(data:dict) -> list:
+def load_stream(data:dict, keep_record:bool=False) -> list:
 
     point_count = data['point_count']
-    sections_complete = (data['section_count'] / data['total_sections']) * 100.0
+    if data['total_sections']:
+        sections_complete = (data['section_count'] / data['total_sections']) * 100.0
+        print(f'\rLoading GPS data... {sections_complete:.02f}%', end='')
+    else:
+        # Streamed formats do not know their length up front
+        print(f'\rLoading GPS data... {point_count} point(s)', end='')
+
+    return data if keep_record else data['point']
+
+
+def tracked(build_f, whole_record:bool=False):
+    """Wrap a point building function to take a whole device record, tagging the point with the key of the track holding it."""
+    def __build(data):
+        point = build_f(data if whole_record else data['point'])
+        if point is not None:
+            point[TRACK_KEY] = data['position']['track_key']
+        return point
+
+    return __build
+
 
-    print(f'\rLoading GPS data... {sections_complete:.02f}%', end='')
+def load_state(checkpoint:Checkpoint, resume:bool, source:dict=None) -> dict:
+    """Get the pipeline state to start from; empty unless resuming from a checkpoint. None if the checkpoint is for another source."""
+    try:
+        state = checkpoint.load(source) if checkpoint and resume else None
+    except ValueError as err:
+        print(err)
+        return None
+    if state:
+        print(f'Resuming after {state["count"]} point(s)')
+        return state
+
+    return {
+        'position': None,
+        'count': 0,
+        'prev_point': None,
+        'window': [],
+        'summary': {},
+        'zonename': None,
+        'sample': []
+    }
 
-    return data['point']
 
+def sample_points(sample:list, start:int, end:int, counter:dict):
+    """Create a sink function that counts points and keeps those between two indexes."""
+    def __sample(p):
+        if start <= counter['count'] < end:
+            sample.append(p)
+        counter['count'] += 1
+    return __sample
 
-def load_from_device(device_path):
+
+def load_from_device(device_path, workers:int=0, profiler:Profiler=None, checkpoint:Checkpoint=None, resume:bool=False, archive:TrackArchive=None, capture:str=None, store:PointStore=None, output:str=None):
+
+    # Imported here; only needed when reading from a device
+    import serial
 
     speed = 115200
     try:
         with serial.Serial(device_path, speed, timeout=1) as ser:
             serial_log.info(ser)
 
-            loader_f = load_stream
-            build_f = build_point_from_gsd
-            interpolate_f = linear_interpolate
+            if capture:
+                with CaptureSerial(ser, capture) as capture_ser:
+                    load_from_serial(capture_ser, workers, profiler, checkpoint, resume, archive, store, output)
+            else:
+                load_from_serial(ser, workers, profiler, checkpoint, resume, archive, store, output)
 
-            enrich_window = MovingWindow(2)
-            enrich_f = lambda p: enrich_point(enrich_window, p)
+    except serial.SerialException as err:
+        print(err)
 
-            summary_obj = {}
-            summary_f = lambda p: summary(summary_obj, p)
+    except ValueError as err:
+        # Raised when the track a checkpoint is in is no longer on the logger, or the data read is not valid
+        if resume:
+            print(f'Checkpoint no longer matches the device; run without --resume to start again: {err}')
+        else:
+            print(err)
 
-            records = stream_records_from_device(ser)
 
-            result = Stream.create(records).map(loader_f).map(build_f).pipe(interpolate_f).map(enrich_f).map(summary_f)
-            
-            count = len(list(result))
-            print(f'\n{count} point(s) loaded and processed')
-            print(summary_obj)
+def load_from_replay(capture_path, workers:int=0, profiler:Profiler=None, checkpoint:Checkpoint=None, resume:bool=False, archive:TrackArchive=None, store:PointStore=None, output:str=None):
 
-    except serial.SerialException as err:
+    try:
+        with ReplaySerial(capture_path) as ser:
+            # A replay reads from disk, with no device to wait on, so runs on a plain stream
+            load_from_serial(ser, workers, profiler, checkpoint, resume, archive, store, output, blocking=False)
+
+    except (IOError, ValueError) as err:
         print(err)
 
 
-def load_from_gsd_file(filename):
+def load_from_serial(ser, workers:int=0, profiler:Profiler=None, checkpoint:Checkpoint=None, resume:bool=False, archive:TrackArchive=None, store:PointStore=None, output:str=None, blocking:bool=True):
+
+    # Archive loads read the tracks held in the archive, rather than from the device
+    source = source_identity(archive.path if archive else ser.name)
+    state = load_state(checkpoint, resume, source)
+    if state is None:
+        return
+
+    loader_f = lambda d: load_stream(d, keep_record=checkpoint is not None or store is not None)
+    build_f = point_trace.wrap('DG100', build_point_from_values)
+    if checkpoint:
+        build_f = positioned(build_f)
+    if store:
+        # Points are stored under the device track they were read from, so each track is held apart
+        build_f = tracked(build_f, whole_record=checkpoint is not None)
+    interpolate_f = point_trace.wrap_pipe('INT', lambda it: linear_interpolate(it, state['prev_point']))
+
+    enrich_window = MovingWindow(2)
+    enrich_window.data = state['window']
+    enrich_f = point_trace.wrap('ENR', stateful(lambda p: enrich_point(enrich_window, p)))
+
+    summary_obj = state['summary']
+    summary_f = stateful(lambda p: summary(summary_obj, p))
 
+    counter = {'count': state['count']}
+    sinks = [sample_points([], 0, 0, counter)]
+    # Points interpolated after resuming follow the track of the last point
+    store_sinks = [store.sink((state['prev_point'] or {}).get(TRACK_KEY))] if store else []
+    sinks += store_sinks
+    if output:
+        sinks.append(open_output(output).sink())
+    if checkpoint:
+        sinks.append(checkpoint.sink(lambda p, pos: {
+            'position': pos,
+            'count': counter['count'],
+            'prev_point': p,
+            'window': enrich_window.data,
+            'summary': summary_obj
+        }, flush=store_sinks, source=source))
+
+    if archive:
+        # Bring the archive up to date, then load every track it holds
+        synced = sync_tracks(ser, archive)
+        print(f'{len(synced)} track(s) synced to {archive.path}')
+        records = archive.stream_records(state['position'])
+    else:
+        records = stream_records_from_device(ser, state['position'])
+
+    if checkpoint or not blocking:
+        # Stages must run in step for checkpoints to be consistent, and reads that do not block gain nothing from a thread
+        stream = Stream.create(records, profiler)
+    else:
+        # Read from the device in a worker thread so serial reads overlap processing
+        # Imported here; asyncio is only needed when reading from a device
+        from .asyncstream import AsyncStream
+        stream = AsyncStream.from_blocking(records, profiler=profiler)
+    stream = build_stream(stream.map(loader_f, name='load'), build_f, workers)
+    result = stream.pipe(interpolate_f, name='interpolate').map(enrich_f, name='enrich').map(summary_f, name='summary')
+    
+    Stream.create(result).sink(*sinks)
+    print(f'\n{counter["count"]} point(s) loaded and processed')
+    print(summary_obj)
+
+    if checkpoint:
+        checkpoint.clear()
+
+
+def load_from_devices(ports:list, workers:int=0):
+
+    summaries = {}
+
+    def __pipeline(port, stream):
+        # Each device has its own stateful stages
+        enrich_window = MovingWindow(2)
+        summary_obj = summaries.setdefault(port, {})
+        return stream.pipe(linear_interpolate, name='interpolate').map(stateful(lambda p: enrich_point(enrich_window, p)), name='enrich').map(stateful(lambda p: summary(summary_obj, p)), name='summary')
+
+    manager = DownloadManager(ports, workers=workers, pipeline_f=__pipeline)
+    manager.run()
+    print(manager.report())
+    for port, summary_obj in summaries.items():
+        print(f'{port}: {summary_obj}')
+
+
+def load_from_gsd_file(filename, workers:int=0, profiler:Profiler=None, checkpoint:Checkpoint=None, resume:bool=False, store:PointStore=None, output:str=None):
+    load_from_file(filename, 'GSD', workers, profiler, checkpoint, resume, store, output)
+
+
+def load_from_gpx_file(filename, workers:int=0, profiler:Profiler=None, checkpoint:Checkpoint=None, resume:bool=False, store:PointStore=None, output:str=None):
+    load_from_file(filename, 'GPX', workers, profiler, checkpoint, resume, store, output)
+
+
+def load_from_nmea_file(filename, workers:int=0, profiler:Profiler=None, checkpoint:Checkpoint=None, resume:bool=False, store:PointStore=None, output:str=None):
+    load_from_file(filename, 'NMEA', workers, profiler, checkpoint, resume, store, output)
+
+
+# File mode, record reader and point builder of each file format
+FILE_FORMATS = {
+    'GSD': ('r', stream_records_from_file, build_point_from_gsd),
+    'GPX': ('rb', stream_records_from_gpx, build_point_from_values),
+    'NMEA': ('rb', stream_records_from_nmea, build_point_from_values)
+}
+
+
+def load_from_file(filename, file_format:str, workers:int=0, profiler:Profiler=None, checkpoint:Checkpoint=None, resume:bool=False, store:PointStore=None, output:str=None):
+
+    mode, stream_records_f, build_point_f = FILE_FORMATS[file_format]
     try:
-        with open(filename, 'r') as f:
-            loader_f = load_stream
-            build_f = build_point_from_gsd
+        with open(filename, mode) as f:
+            source = source_identity(filename)
+            state = load_state(checkpoint, resume, source)
+            if state is None:
+                return
+
+            loader_f = lambda d: load_stream(d, keep_record=checkpoint is not None)
+            build_f = point_trace.wrap(file_format, build_point_f)
+            if checkpoint:
+                build_f = positioned(build_f)
 
-            interpolate_f = linear_interpolate
+            interpolate_f = point_trace.wrap_pipe('INT', lambda it: linear_interpolate(it, state['prev_point']))
 
-            tz_cache = {}
-            add_timezone_f = lambda p: add_timezone(p, tz_cache)
+            tz_cache = {'zonename': state['zonename']} if state['zonename'] else {}
+            add_timezone_f = stateful(lambda p: add_timezone(p, tz_cache))
 
             enrich_window = MovingWindow(2)
-            enrich_f = lambda p: enrich_point(enrich_window, p)
+            enrich_window.data = state['window']
+            enrich_f = point_trace.wrap('ENR', stateful(lambda p: enrich_point(enrich_window, p)))
             
-            summary_obj = {}
-            summary_f = lambda p: summary(summary_obj, p)
+            summary_obj = state['summary']
+            summary_f = stateful(lambda p: summary(summary_obj, p))
 
-            records = stream_records_from_file(f)
+            # Hold back a sample of points to print after the summary
+            sample = state['sample']
+            counter = {'count': state['count']}
+            sinks = [sample_points(sample, 1000, 1020, counter)]
+            # Points are stored under the file's name
+            store_sinks = [store.sink(os.path.splitext(os.path.basename(filename))[0])] if store else []
+            sinks += store_sinks
+            if output:
+                sinks.append(open_output(output).sink())
+            if checkpoint:
+                sinks.append(checkpoint.sink(lambda p, pos: {
+                    'position': pos,
+                    'count': counter['count'],
+                    'prev_point': p,
+                    'window': enrich_window.data,
+                    'summary': summary_obj,
+                    'zonename': tz_cache.get('zonename'),
+                    'sample': sample
+                }, flush=store_sinks, source=source))
 
-            result = Stream.create(records).map(loader_f).map(build_f).pipe(interpolate_f).map(add_timezone_f).map(enrich_f).map(summary_f)
+            records = stream_records_f(f, state['position'])
+
+            result = build_stream(Stream.create(records, profiler).map(loader_f, name='load'), build_f, workers).pipe(interpolate_f, name='interpolate').map(add_timezone_f, name='timezone').map(enrich_f, name='enrich').map(summary_f, name='summary')
             
-            points = list(result)
-            count = len(points)
-            print(f'\n{count} point(s) loaded and processed')
+            result.sink(*sinks)
+            print(f'\n{counter["count"]} point(s) loaded and processed')
             print(summary_obj)
-            for p in points[1000:1020]:
+            for p in sample:
                 print(json.dumps(p, indent=2, cls=DateAwareJSONEncoder))
 
-    except IOError as err:
+            if checkpoint:
+                checkpoint.clear()
+
+    # Malformed GPX raises a ParseError, which is a SyntaxError
+    except (IOError, SyntaxError) as err:
         print(err)
 
 
@@ -0,0 +1,181 @@
+"""
+  Module providing a streaming reader of NMEA 0183 sentences, as written by GPS loggers, from a file or serial port.
+  RMC and GGA sentences for the same time are merged into one fix; sentences failing their checksum are dropped.
+  Fixes are yielded as GSD values held as ints, as read from a DG-100, so they are built by `build_point_from_values`.
+"""
+
+import datetime
+import logging
+
+# NMEA speeds are in knots; GSD speeds in 10^-2 km/h
+KNOTS_TO_GSD_SPEED = 185.2
+
+# GSD altitudes are in 10^-4 m
+GSD_ALT_SCALE = 10000
+
+# Columns read by `read_columns`
+COLUMNS = ('ts', 'lat', 'lon', 'spd', 'alt')
+
+# Masks keeping the low half of a value 2^(k+1) bytes wide
+_FOLD_MASKS = tuple((1 << (8 << k)) - 1 for k in range(16))
+
+_EPOCH = datetime.date(1970, 1, 1)
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+def nmea_checksum(body:bytes) -> int:
+    """Get the checksum of a sentence body (between the `$` and the `*`): the XOR of its bytes."""
+    # Fold the bytes held as one int in half until one byte is left, rather than XOR each byte in turn
+    x = int.from_bytes(body, 'little')
+    k = (len(body) - 1).bit_length()
+    while k:
+        k -= 1
+        x = (x >> (8 << k)) ^ (x & _FOLD_MASKS[k])
+    return x
+
+
+def read_sentence(line:bytes) -> list:
+    """Split a sentence into its fields, the first being the talker and type (e.g. `GPRMC`). Returns None if the sentence is not valid."""
+    line = line.strip()
+    star = line.rfind(b'*')
+    if star < 0 or line[:1] != b'$':
+        return None
+
+    body = line[1:star]
+    try:
+        if nmea_checksum(body) != int(line[star + 1:], 16):
+            return None
+    except ValueError:
+        return None
+    return body.split(b',')
+
+
+def convert_nmea_coord(value:bytes, hemisphere:bytes) -> int:
+    """Convert a coordinate in degrees and minutes (e.g. `3953.1388`, `N`) into a GSD coordinate value (degrees, then 10^-4 minutes)."""
+    dot = value.find(b'.')
+    if dot < 0:
+        dot = len(value)
+    d = int(value[:dot - 2] or 0)
+    m = round(float(value[dot - 2:]) * 10000)
+    if m == 600000:
+        d, m = d + 1, 0
+    gsd = d * 1000000 + m
+    return -gsd if hemisphere in (b'S', b'W') else gsd
+
+
+def stream_fixes(lines, counts:dict=None) -> None:
+    """
+    Merge RMC and GGA sentences into fixes, yielding GSD values (lat, lon, tm, dt, spd, alt) for each.
+    A fix is yielded once both sentences for its time are read, or when the time moves on.
+    RMC gives the date, so times without a valid RMC sentence are dropped; altitude is 0 without a GGA sentence.
+    Pass a dict of counts to have sentences read and dropped counted.
+    """
+    sentences = invalid = 0
+    fix_tm = None
+    fix = None
+    alt = None
+    done = False
+
+    for line in lines:
+        sentences += 1
+        fields = read_sentence(line)
+        if fields is None:
+            invalid += 1
+            continue
+
+        kind = fields[0][2:]
+        if kind != b'RMC' and kind != b'GGA':
+            continue
+
+        try:
+            tm = int(fields[1][:6])
+            if tm != fix_tm:
+                if fix is not None and not done:
+                    yield (*fix, alt or 0)
+                fix_tm, fix, alt, done = tm, None, None, False
+
+            if kind == b'RMC':
+                # Status V marks a fix that is not valid
+                if fields[2] != b'A':
+                    continue
+                spd = round(float(fields[7]) * KNOTS_TO_GSD_SPEED) if fields[7] else 0
+                fix = (convert_nmea_coord(fields[3], fields[4]), convert_nmea_coord(fields[5], fields[6]), tm, int(fields[9]), spd)
+            elif fields[6] != b'0' and fields[9]:
+                # Quality 0 is no fix
+                alt = round(float(fields[9]) * GSD_ALT_SCALE)
+
+        except (IndexError, ValueError) as e:
+            invalid += 1
+            log.warn('Failed to read sentence: %s; %s', line, e)
+            continue
+
+        if fix is not None and alt is not None and not done:
+            yield (*fix, alt)
+            done = True
+
+    if fix is not None and not done:
+        yield (*fix, alt or 0)
+
+    if counts is not None:
+        counts['sentences'] = sentences
+        counts['invalid'] = invalid
+
+
+def stream_records(f, position:dict=None) -> None:
+    """
+    Retrieve GPS records from NMEA sentences, one per fix. `f` is a file opened in binary mode or a serial port.
+    NMEA has no sections, so every record is in section 1 and there is no total.
+    Pass a position to resume after that record; the sentences are read again up to it.
+    """
+    point_count = 0
+    skip = position['point_count'] if position else 0
+    counts = {}
+
+    for values in stream_fixes(f, counts):
+        point_count += 1
+        if point_count <= skip:
+            continue
+
+        yield {
+            'point': values,
+            'point_count': point_count,
+            'section_count': 1,
+            'total_sections': None,
+            'position': {
+                'point_count': point_count,
+                'section_count': 1
+            }
+        }
+
+    log.info('stream_records: read %d fix(es) from %d sentence(s), %d not valid', point_count, counts.get('sentences', 0), counts.get('invalid', 0))
+
+
+def read_columns(f) -> dict:
+    """
+    Read every fix as a dict of NumPy columns (ts, lat, lon, spd, alt), in the units of a point's items.
+    Values are converted a column at a time rather than built into points, for loading whole files in batches.
+    Latitude and longitude are rounded directly, so may differ from a built point's in the last place where they fall on a tie.
+    """
+    import numpy as np
+
+    values = np.array(list(stream_fixes(f)), dtype=np.int64).reshape(-1, 6)
+    lat, lon, tm, dt, spd, alt = values.T
+
+    # Few days in a file, so convert each date once; two digit years follow strptime as for GSD dates
+    days = {d: (datetime.date(d % 100 + (1900 if d % 100 >= 69 else 2000), d // 100 % 100, d // 10000) - _EPOCH).days for d in np.unique(dt).tolist()}
+    day = np.array([days[d] for d in dt.tolist()], dtype=np.int64) if days else dt
+
+    def __degrees(gsd):
+        d, m = np.divmod(np.abs(gsd), 1000000)
+        # Held to 4 decimal places, as in a point
+        return np.round(np.sign(gsd) * (d + m / 600000) * 10000) / 10000
+
+    return {
+        'ts': day * 86400 + tm // 10000 * 3600 + tm // 100 % 100 * 60 + tm % 100,
+        'lat': __degrees(lat),
+        'lon': __degrees(lon),
+        'spd': spd / 100,
+        'alt': np.trunc(alt / GSD_ALT_SCALE).astype(np.int64)
+    }
@@ -0,0 +1,117 @@
+"""
+  Module providing a compact GPS point, holding position, speed and altitude as fixed-point ints.
+"""
+
+from collections.abc import Mapping, MutableMapping
+
+# Fixed-point scale of each field held as an int: 10^-4 degrees, 10^-3 km/h, and whole seconds and metres
+SCALES = {'ts': 1, 'lat': 10000, 'lon': 10000, 'x': 1, 'y': 1, 'spd': 1000, 'alt': 1}
+
+# Fields held in slots; derived fields are held as they are set
+FIELDS = tuple(SCALES)
+DERIVED_FIELDS = ('dt', 'd', 'hdg', 'alt_d', 'spd_d')
+
+_SLOT_SCALES = {**SCALES, **{k: 1 for k in DERIVED_FIELDS}}
+
+
+class Point(MutableMapping):
+    """
+    Class holding a GPS point in slots, read and written like a dict.
+    Items are in plain units, as for a dict point (`point['lat']` in degrees); attributes hold the fixed-point ints (`point.lat` in 10^-4 degrees).
+    Keys other than the known fields, such as a checkpoint position, are held in a dict.
+    Each field is still a boxed int, so a point takes a few hundred bytes rather than the few dozen of a packed record;
+    only columns of points, such as a structured NumPy array, get down to that, which a pipeline passing one point at a time cannot use.
+    """
+
+    __slots__ = FIELDS + DERIVED_FIELDS + ('_extra',)
+
+    def __init__(self, values:Mapping=None, **kwargs) -> None:
+        self._extra = None
+        if values:
+            self.update(values)
+        if kwargs:
+            self.update(kwargs)
+
+    @classmethod
+    def fixed(cls, **values) -> 'Point':
+        """Create a point from fixed-point values, without conversion."""
+        point = cls.__new__(cls)
+        point._extra = None
+        for k, v in values.items():
+            setattr(point, k, v)
+        return point
+
+    def __getitem__(self, key:str):
+        scale = _SLOT_SCALES.get(key)
+        if scale is None:
+            if self._extra is None:
+                raise KeyError(key)
+            return self._extra[key]
+
+        try:
+            value = getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+        return value / scale if scale != 1 else value
+
+    def __setitem__(self, key:str, value) -> None:
+        scale = _SLOT_SCALES.get(key)
+        if scale is None:
+            if self._extra is None:
+                self._extra = {}
+            self._extra[key] = value
+        elif scale != 1:
+            setattr(self, key, int(round(value * scale)))
+        else:
+            setattr(self, key, value)
+
+    def __delitem__(self, key:str) -> None:
+        if key in _SLOT_SCALES:
+            try:
+                delattr(self, key)
+            except AttributeError:
+                raise KeyError(key) from None
+        elif self._extra is None:
+            raise KeyError(key)
+        else:
+            del self._extra[key]
+
+    def __contains__(self, key) -> bool:
+        if key in _SLOT_SCALES:
+            return hasattr(self, key)
+        return self._extra is not None and key in self._extra
+
+    def __iter__(self):
+        for k in _SLOT_SCALES:
+            if hasattr(self, k):
+                yield k
+        if self._extra:
+            yield from self._extra
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __bool__(self) -> bool:
+        # Points almost always hold a timestamp, so avoid counting the fields
+        return hasattr(self, 'ts') or len(self) > 0
+
+    def __repr__(self) -> str:
+        return f'Point({dict(self)!r})'
+
+    def copy(self) -> 'Point':
+        point = Point.fixed(**{k: getattr(self, k) for k in _SLOT_SCALES if hasattr(self, k)})
+        if self._extra:
+            point._extra = dict(self._extra)
+        return point
+
+
+def as_point(values:Mapping) -> Point:
+    """Get a point as a Point, converting a dict point."""
+    return values if isinstance(values, Point) else Point(values)
+
+
+def fixed_value(point:Mapping, key:str) -> int:
+    """Get the fixed-point value of a field from a Point or a dict point."""
+    if isinstance(point, Point):
+        return getattr(point, key)
+    return int(round(point[key] * SCALES[key]))
@@ -1,17 +1,15 @@
+import calendar
 import datetime
 import logging
 import zoneinfo
 from math import atan2, degrees, hypot
-from timezonefinder import TimezoneFinderL
 from .coordinate import DMSCoordinate, DMS_to_WGS, WGS_to_UTM
-from .gsd import convert_gsd_alt, convert_gsd_coord, convert_gsd_date, convert_gsd_speed
+from .gsd import convert_gsd_alt, convert_gsd_coord, convert_gsd_coord_value, convert_gsd_date, convert_gsd_date_values, convert_gsd_speed
+from .point import FIELDS, SCALES, Point, as_point
+from .stream import stateful
 from .utils import MovingWindow
 
 log = logging.getLogger(__name__)
-points_log = logging.getLogger('points')
-
-def __log_point(msg:str, point:dict, *args:str):
-    points_log.info('[%10s] ' + msg, point['ts'], *[point[x] for x in args])
 
 def map_all(iterable, *functions):
     for f in functions:
@@ -20,11 +18,15 @@ def map_all(iterable, *functions):
     return iterable
 
 
+@stateful
 def add_timezone(point, tz_cache):
     """Add a timezone-aware datetime to a point. If no cached timezone is available then we look it up based on lat/long data"""
     def __lookup_tz(point):
         if 'lat' in point and 'lon' in point:
-            tz_cache['tf'] = TimezoneFinderL()
+            if 'tf' not in tz_cache:
+                # Imported here; timezonefinder loads NumPy and its data files, which is slow
+                from timezonefinder import TimezoneFinderL
+                tz_cache['tf'] = TimezoneFinderL()
 
             lat = point['lat']
             lon = point['lon']
@@ -50,13 +52,13 @@ def add_timezone(point, tz_cache):
                 tz_cache['zoneinfo'] = zoneinfo.ZoneInfo(tz_cache['zonename'])
 
         # Convert timestamp
-        dtz = datetime.datetime.utcfromtimestamp(point['ts']).astimezone(tz=tz_cache['zoneinfo'])
+        dtz = datetime.datetime.fromtimestamp(point['ts'], tz=tz_cache['zoneinfo'])
         point['dt'] = dtz
 
     return point
     
 
-def build_point_from_gsd(gsd_line:list, convert_coords:bool=True) -> dict:
+def build_point_from_gsd(gsd_line:list, convert_coords:bool=True) -> Point:
     """Build a GPS point from a line of GSD-formatted data"""
     if gsd_line is None:
         return None
@@ -77,14 +79,12 @@ def build_point_from_gsd(gsd_line:list, convert_coords:bool=True) -> dict:
     gsd_alt = gsd_line[5]
     log.debug('build_point_from_gsd: lat=%s; lon=%s; tm=%s; dt=%s; spd=%s; alt=%s', gsd_lat, gsd_lon, gsd_tm, gsd_dt, gsd_spd, gsd_alt)
 
-    point = {}
+    point = Point()
 
     try:
-        # Convert GSD date and time strings to UTC timestamp?
-        point['dt'] = convert_gsd_date(gsd_dt, gsd_tm)
-        point['ts'] = int(point['dt'].timestamp())
-        __log_point(f'SRC=GSD{gsd_line}', point)
-        __log_point('dt=%s', point, 'dt')
+        # Convert GSD date and time strings to UTC timestamp; the datetime is naive UTC, so not converted from local time
+        point.dt = convert_gsd_date(gsd_dt, gsd_tm)
+        point.ts = calendar.timegm(point.dt.timetuple())
         
         # Convert GSD coordinate to DMS
         dms = DMSCoordinate(*convert_gsd_coord(gsd_lat), *convert_gsd_coord(gsd_lon))
@@ -92,11 +92,9 @@ def build_point_from_gsd(gsd_line:list, convert_coords:bool=True) -> dict:
         wgs = DMS_to_WGS(dms)
         log.debug('build_point_from_gsd: (%s,%s) -> %s -> %s', gsd_lat, gsd_lon, dms, wgs)
 
-        # Latitude & Longitude
-        point['lat'] = round(wgs.get_latitude_degrees(), 4)
-        point['lon'] = round(wgs.get_longitude_degrees(), 4)
-        __log_point('lat=%4f', point, 'lat')
-        __log_point('lon=%.4f', point, 'lon')
+        # Latitude & Longitude, held to 4 decimal places
+        point['lat'] = wgs.get_latitude_degrees()
+        point['lon'] = wgs.get_longitude_degrees()
 
         # Cartesian coordinates
         if convert_coords:
@@ -105,19 +103,15 @@ def build_point_from_gsd(gsd_line:list, convert_coords:bool=True) -> dict:
             log.debug('build_point_from_gsd: %s -> %s', wgs, utm)
 
             # X & Y
-            point['x'] = utm.x
-            point['y'] = utm.y
-            __log_point('x=%d', point, 'x')
-            __log_point('y=%d', point, 'y')
+            point.x = utm.x
+            point.y = utm.y
             
 
         # GSD speed in m/h?
-        point['spd'] = round(convert_gsd_speed(gsd_spd), 3)
-        __log_point('spd=%.3f', point, 'spd')
+        point['spd'] = convert_gsd_speed(gsd_spd)
 
         # GSD altitude in 10^-5?!, convert from floating point to int
-        point['alt'] = convert_gsd_alt(gsd_alt)
-        __log_point('alt=%4d', point, 'alt')
+        point.alt = convert_gsd_alt(gsd_alt)
 
     except ValueError as e:
         log.warn('Failed to parse GSD line: %s; %s', gsd_line, e, exc_info=True)
@@ -127,6 +121,49 @@ def build_point_from_gsd(gsd_line:list, convert_coords:bool=True) -> dict:
     return point
 
 
+def build_point_from_values(values:tuple, convert_coords:bool=True) -> Point:
+    """Build a GPS point from GSD values held as ints (lat, lon, tm, dt, spd, alt), such as decoded DG100 records."""
+    if values is None:
+        return None
+
+    lat, lon, tm, dt, spd, alt = values
+    point = Point()
+
+    try:
+        # Convert date and time to UTC timestamp; the datetime is naive UTC, so not converted from local time
+        point.dt = convert_gsd_date_values(dt, tm)
+        point.ts = calendar.timegm(point.dt.timetuple())
+
+        # Convert coordinate to DMS, then to WGS
+        # DMS degrees carry the sign, which is lost under 1 degree, so the sign of each value is applied after
+        wgs = DMS_to_WGS(DMSCoordinate(*convert_gsd_coord_value(abs(lat)), *convert_gsd_coord_value(abs(lon))))
+        if lat < 0:
+            wgs.latitude = -wgs.latitude
+        if lon < 0:
+            wgs.longitude = -wgs.longitude
+
+        # Latitude & Longitude, held to 4 decimal places
+        point['lat'] = wgs.get_latitude_degrees()
+        point['lon'] = wgs.get_longitude_degrees()
+
+        # Cartesian coordinates
+        if convert_coords:
+            utm = WGS_to_UTM(wgs)
+            point.x = utm.x
+            point.y = utm.y
+
+        # Speed in 10^-2 km/h, altitude in 10^-4 m
+        point.spd = spd * (SCALES['spd'] // 100)
+        point.alt = int(alt / 10000)
+
+    except ValueError as e:
+        log.warn('Failed to build point from values: %s; %s', values, e, exc_info=True)
+        return None
+
+    return point
+
+
+@stateful
 def enrich_point(window: MovingWindow, point: dict, add_distance:bool=True, add_deltas:bool=True) -> dict:
     # Add point to window
     window.add_point(point)
@@ -137,32 +174,29 @@ def enrich_point(window: MovingWindow, point: dict, add_distance:bool=True, add_
         calc_spd = (point['d'] / window.delta('ts')) if window.delta('ts') > 0 else 0
         # Get heading
         point['hdg'] = degrees(atan2(window.delta('x'), window.delta('y')))
-        __log_point('d=%.3f', point, 'd')
-        __log_point('hdg=%03d', point, 'hdg')
 
     if add_deltas and 'alt' in point:
         # Altitude delta
         point['alt_d'] = window.delta('alt')
-        __log_point('alt_d=%d', point, 'alt_d')
 
     if add_deltas and 'spd' in point:
         # Speed delta
         point['spd_d'] = window.delta('spd')
-        __log_point('spd_d=%.3f', point, 'spd_d')
 
     return point
 
 
-def linear_interpolate(iter_in) -> None:
+def linear_interpolate(iter_in, prev_point:dict=None) -> None:
 
-    # Define internal interpolation function
-    def __interp_f(prev_point: dict, point: dict, item:str, delta:int):
-        int_value = prev_point[item] + ((point[item] - prev_point[item]) / delta)
-        log.debug('linear_interpolate: (%s,%s)[%d] -> %s', prev_point[item], point[item], delta, int_value)
+    # Define internal interpolation function, over fixed-point values
+    def __interp_f(prev_point: Point, point: Point, item:str, delta:int):
+        prev_value = getattr(prev_point, item)
+        value = getattr(point, item)
+        int_value = prev_value + ((value - prev_value) / delta)
+        log.debug('linear_interpolate: (%s,%s)[%d] -> %s', prev_value, value, delta, int_value)
         return int_value
 
     try:
-        prev_point = None
         while True:
             point = next(iter_in)
             
@@ -175,19 +209,17 @@ def linear_interpolate(iter_in) -> None:
                     log.info('linear_interpolate: duplicate identified at %d, removing', point['ts'])
                     continue
                 
+                if ts_d > 1:
+                    # Interpolate the fields both points hold; fixed-point fields are rounded, whole units are truncated
+                    prev_point = as_point(prev_point)
+                    next_point = as_point(point)
+                    fields = [(k, round if SCALES[k] != 1 else int) for k in FIELDS if k in prev_point and k in next_point]
+
                 while ts_d > 1:
-                    int_ts = int(__interp_f(prev_point, point, 'ts', ts_d))
-                    log.debug('linear_interpolate: Adding interpolated point at %d', int_ts)
-                    new_point = {
-                        'ts': int_ts,
-                        'lat': round(__interp_f(prev_point, point, 'lat', ts_d), 4),
-                        'lon': round(__interp_f(prev_point, point, 'lon', ts_d), 4),
-                        'x': int(__interp_f(prev_point, point, 'x', ts_d)),
-                        'y': int(__interp_f(prev_point, point, 'y', ts_d)),
-                        'spd': round(__interp_f(prev_point, point, 'spd', ts_d), 3),
-                        'alt': int(__interp_f(prev_point, point, 'alt', ts_d))
-                    }
-                    __log_point(f'SRC=INT{new_point}', new_point)
+                    new_point = Point.fixed()
+                    for k, convert_f in fields:
+                        setattr(new_point, k, convert_f(__interp_f(prev_point, next_point, k, ts_d)))
+                    log.debug('linear_interpolate: Adding interpolated point at %d', new_point.ts)
                     log.debug('linear_interpolate: %s', new_point)
                     
                     yield new_point
@@ -207,6 +239,7 @@ def remove_outlyers(window: MovingWindow, point: dict) -> list:
     pass
 
 
+@stateful
 def summary(summary_obj:dict, point:dict) -> dict:
 
     # Total distance
@@ -0,0 +1,140 @@
+"""
+  Module providing a simulated DG-100 data logger, serving synthetic tracks over a serial-like interface.
+  Used to exercise and benchmark downloads without the device attached.
+"""
+
+import datetime
+import logging
+import random
+import struct
+import time
+
+from .dg100 import TRACK_HEADER_MSG, TRACK_RECORDS_FRAMES, TRACK_RECORDS_MSG, FrameDecoder, parse_message, prepare_message
+
+# Most headers sent in one response
+HEADERS_PER_MESSAGE = 150
+
+# Serial bytes are sent with a start and stop bit
+BITS_PER_BYTE = 10
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+def synthetic_track(records:int, record_format:int=2, start:datetime.datetime=None, lat:int=39531388, lon:int=-105457814) -> bytes:
+    """
+    Generate a track file payload of one record per second, heading north-east from a GSD coordinate.
+    The first record is always format C; the rest use the given format.
+    """
+    start = start or datetime.datetime(2018, 2, 15, 16, 16, 55)
+    payload = bytearray()
+    for i in range(records):
+        dt = start + datetime.timedelta(seconds=i)
+        # Coordinates move a little each second, keeping minutes below 60
+        values = (lat + (i % 1000) * 10, lon - (i % 1000) * 10, int(f'{dt:%H%M%S}'), int(f'{dt:%d%m%y}'), 1500 + (i % 100), 27760000 + i * 100, 0, record_format)
+        if i == 0 or record_format == 2:
+            payload += struct.pack('>8i', *values)
+        elif record_format == 1:
+            payload += struct.pack('>5i', *values[:5])
+        else:
+            payload += struct.pack('>2i', *values[:2])
+    return bytes(payload)
+
+
+class SimulatedDevice:
+    """
+    Class standing in for a serial connection to a DG-100, answering track header and track file requests.
+    Responses can be throttled to a baud rate and corrupted at random, to exercise timing and resync.
+    """
+
+    def __init__(self, tracks:list, baudrate:int=None, corrupt_rate:float=0.0, noise_rate:float=0.0, seed:int=None) -> None:
+        """
+        Create a device holding a list of (date, payload) tracks.
+        `corrupt_rate` is the chance of flipping a byte in each response message; `noise_rate` the chance of junk bytes before it.
+        """
+        self.tracks = tracks
+        self.baudrate = baudrate
+        self.corrupt_rate = corrupt_rate
+        self.noise_rate = noise_rate
+        self.name = 'simulator'
+        self.bytes_sent = 0
+        self._random = random.Random(seed)
+        self._decoder = FrameDecoder()
+        self._output = bytearray()
+
+    @classmethod
+    def create(cls, track_count:int, records:int, record_format:int=2, **kwargs) -> 'SimulatedDevice':
+        """Create a device holding synthetic tracks, one day apart."""
+        start = datetime.datetime(2018, 2, 15, 9, 0, 0)
+        tracks = [(start + datetime.timedelta(days=i), synthetic_track(records, record_format, start + datetime.timedelta(days=i))) for i in range(track_count)]
+        return cls(tracks, **kwargs)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._output.clear()
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self._output)
+
+    def read(self, size:int=1) -> bytes:
+        """Read up to `size` bytes of the pending response."""
+        return self._send(min(size, len(self._output)))
+
+    def read_until(self, expected:bytes=b'\n', size:int=None) -> bytes:
+        """Read the pending response up to and including `expected`."""
+        end = self._output.find(expected)
+        end = len(self._output) if end < 0 else end + len(expected)
+        return self._send(end if size is None else min(end, size))
+
+    def write(self, data:bytes) -> int:
+        """Receive request bytes, queueing a response to each complete request."""
+        self._decoder.feed(data)
+        frame = self._decoder.next_frame()
+        while frame is not None:
+            message_type, payload = parse_message(frame, ignore_length=True, ignore_checksum=True)
+            index = int.from_bytes(payload[0:2], byteorder='big')
+            if message_type == TRACK_HEADER_MSG:
+                self._respond(self._headers_response(index))
+            elif message_type == TRACK_RECORDS_MSG:
+                for response in self._track_response(index):
+                    self._respond(response)
+            else:
+                log.warn('Unknown request type %s', message_type.hex())
+            frame = self._decoder.next_frame()
+        return len(data)
+
+    def _headers_response(self, index:int) -> bytes:
+        headers = [(date, i) for i, (date, _) in enumerate(self.tracks)][index:index + HEADERS_PER_MESSAGE]
+        next_index = index + len(headers)
+        header_bytes = b''.join(struct.pack('>3i', int(f'{d:%H%M%S}'), int(f'{d:%d%m%y}'), i) for d, i in headers)
+        return TRACK_HEADER_MSG + struct.pack('>2H', len(headers), next_index) + header_bytes + bytes(4)
+
+    def _track_response(self, index:int) -> list:
+        payload = self.tracks[index][1] if index < len(self.tracks) else b''
+        # Split across messages on a record boundary
+        record_length = {0: 8, 1: 20, 2: 32}[payload[31]] if payload else 32
+        split = 32 + ((len(payload) - 32) // record_length // TRACK_RECORDS_FRAMES) * record_length
+        return [TRACK_RECORDS_MSG + payload[:split], TRACK_RECORDS_MSG + payload[split:]]
+
+    def _respond(self, payload:bytes) -> None:
+        message = prepare_message(payload)
+        if self._random.random() < self.noise_rate:
+            self._output += bytes(self._random.randrange(256) for _ in range(self._random.randrange(1, 16)))
+        if self._random.random() < self.corrupt_rate:
+            message[self._random.randrange(4, len(message) - 4)] ^= 0xFF
+        self._output += message
+
+    def _send(self, size:int) -> bytes:
+        data = bytes(self._output[:size])
+        del self._output[:size]
+        self.bytes_sent += size
+        if self.baudrate:
+            # Hold the caller for as long as the bytes would take on the line
+            time.sleep(size * BITS_PER_BYTE / self.baudrate)
+        return data
@@ -0,0 +1,194 @@
+"""
+  Module providing a local SQLite store of built points, indexed by track and time and by UTM zone and grid tile.
+  Latitude, longitude and speed are held as fixed-point ints, as in a Point.
+  Tracks can be queried again by time range or bounding box without reparsing the source files.
+"""
+
+import logging
+import sqlite3
+
+from .coordinate import calc_utm_zone
+from .point import FIELDS, SCALES, fixed_value
+from .stream import Sink
+
+# Columns held for each point
+COLUMNS = FIELDS
+
+# Width of a UTM grid tile, in metres
+TILE_SIZE = 1000
+
+# Points written per transaction by a sink
+SINK_BUFFER_SIZE = 5000
+
+# Key of the track a point was read from, for sources holding several tracks
+TRACK_KEY = '_track'
+
+# Version of the schema, held in the database's user_version; stores made before it was set are version 1
+SCHEMA_VERSION = 2
+
+_SCHEMA = f'''
+CREATE TABLE IF NOT EXISTS points (
+    track TEXT NOT NULL,
+    ts INTEGER NOT NULL,
+    lat INTEGER,
+    lon INTEGER,
+    x REAL,
+    y REAL,
+    zone TEXT,
+    spd INTEGER,
+    alt INTEGER,
+    tx INTEGER,
+    ty INTEGER,
+    PRIMARY KEY (track, ts)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS points_tile ON points (zone, tx, ty);
+'''
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+def tile_key(x:float, y:float, tile_size:int=TILE_SIZE) -> tuple:
+    """Get the (column, row) of the UTM grid tile holding a coordinate."""
+    if x is None or y is None:
+        return None, None
+    return int(x // tile_size), int(y // tile_size)
+
+
+def point_zone(point) -> str:
+    """Get the UTM zone of a point's x and y, e.g. '13N', or None if it has none."""
+    if point.get('x') is None or point.get('y') is None or point.get('lat') is None or point.get('lon') is None:
+        return None
+    return calc_utm_zone(point['lat'], point['lon'])
+
+
+class PointStore:
+    """
+    Class storing points in a local SQLite database.
+    A point is keyed by track and timestamp, so loading a track again replaces its points.
+    UTM coordinates are only comparable within a zone, so points are held with their zone and tiles are looked up by zone.
+    """
+
+    def __init__(self, path:str, tile_size:int=TILE_SIZE) -> None:
+        self.path = path
+        self.tile_size = tile_size
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        # Write-ahead logging lets readers query while a load is running
+        self._conn.execute('PRAGMA journal_mode=WAL')
+        self._conn.execute('PRAGMA synchronous=NORMAL')
+        try:
+            self._upgrade()
+        except Exception:
+            self._conn.close()
+            raise
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    def _upgrade(self) -> None:
+        """Create the schema, or migrate a store made by an earlier version. Raises ValueError for a store made by a later version."""
+        version = self._conn.execute('PRAGMA user_version').fetchone()[0]
+        if version == 0 and self._conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'points'").fetchone():
+            version = 1
+        if version > SCHEMA_VERSION:
+            raise ValueError(f'Store {self.path} has schema version {version}; only versions up to {SCHEMA_VERSION} can be read')
+
+        if version == 1:
+            # Version 1 held no UTM zone, and its first stores held latitude, longitude and speed as REAL plain units
+            # rather than fixed-point ints; the table is rebuilt, converting REAL values and filling in each point's zone
+            log.info('Migrating store %s to schema version %d', self.path, SCHEMA_VERSION)
+            fixed = {c: f"CASE WHEN typeof({c}) = 'real' THEN CAST(round({c} * {SCALES[c]}) AS INTEGER) ELSE {c} END" for c in ('lat', 'lon', 'spd')}
+            scale = SCALES['lat']
+            self._conn.create_function('utm_zone', 2, lambda lat, lon: calc_utm_zone(lat / scale, lon / scale), deterministic=True)
+            with self._conn:
+                self._conn.execute('BEGIN')
+                self._conn.execute('DROP INDEX IF EXISTS points_tile')
+                self._conn.execute('ALTER TABLE points RENAME TO points_v1')
+                for statement in _SCHEMA.split(';'):
+                    if statement.strip():
+                        self._conn.execute(statement)
+                self._conn.execute(f'''
+                    INSERT INTO points (track, ts, lat, lon, x, y, zone, spd, alt, tx, ty)
+                    SELECT track, ts, {fixed['lat']}, {fixed['lon']}, x, y,
+                        CASE WHEN x IS NOT NULL AND y IS NOT NULL AND lat IS NOT NULL AND lon IS NOT NULL THEN utm_zone({fixed['lat']}, {fixed['lon']}) END,
+                        {fixed['spd']}, alt, tx, ty
+                    FROM points_v1
+                ''')
+                self._conn.execute('DROP TABLE points_v1')
+                self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+            return
+
+        self._conn.executescript(_SCHEMA)
+        self._conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def add(self, track:str, points:list) -> int:
+        """Add points to a track in one transaction, returning the number added."""
+        rows = []
+        for p in points:
+            rows.append((track, *(fixed_value(p, c) if c in p else None for c in COLUMNS), point_zone(p), *tile_key(p.get('x'), p.get('y'), self.tile_size)))
+
+        with self._conn:
+            self._conn.executemany(f'INSERT OR REPLACE INTO points (track, {", ".join(COLUMNS)}, zone, tx, ty) VALUES ({", ".join("?" * (len(COLUMNS) + 4))})', rows)
+
+        log.debug('Added %d point(s) to %s', len(rows), track)
+        return len(rows)
+
+    def sink(self, track:str, buffer_size:int=SINK_BUFFER_SIZE) -> Sink:
+        """
+        Create a sink adding points to a track, a buffer at a time.
+        A point holding a track under TRACK_KEY moves the sink on to that track; points after it without one, such as interpolated points, follow it.
+        """
+        current = {'track': track}
+
+        def __add(points):
+            run = []
+            for p in points:
+                track = p.get(TRACK_KEY)
+                if track is not None and track != current['track']:
+                    if run:
+                        self.add(current['track'], run)
+                    current['track'], run = track, []
+                run.append(p)
+            if run:
+                self.add(current['track'], run)
+
+        return Sink(__add, buffer_size)
+
+    def tracks(self) -> list:
+        """List the tracks held, as (track, point count, first ts, last ts)."""
+        return self._conn.execute('SELECT track, COUNT(*), MIN(ts), MAX(ts) FROM points GROUP BY track ORDER BY track').fetchall()
+
+    def query_range(self, track:str, ts_from:int, ts_to:int, columns:list=None) -> dict:
+        """Read a track's points between two timestamps (inclusive) as a dict of NumPy columns."""
+        return self._query('track = ? AND ts BETWEEN ? AND ?', (track, ts_from, ts_to), columns)
+
+    def query_bbox(self, zone:str, x_min:float, y_min:float, x_max:float, y_max:float, track:str=None, columns:list=None) -> dict:
+        """Read the points within a bounding box (inclusive) in a UTM zone (e.g. '13N') as a dict of NumPy columns, optionally from one track."""
+        tx_min, ty_min = tile_key(x_min, y_min, self.tile_size)
+        tx_max, ty_max = tile_key(x_max, y_max, self.tile_size)
+        # Tiles narrow the search through the index; coordinates trim the edge tiles
+        where = 'zone = ? AND tx BETWEEN ? AND ? AND ty BETWEEN ? AND ? AND x BETWEEN ? AND ? AND y BETWEEN ? AND ?'
+        params = (zone, tx_min, tx_max, ty_min, ty_max, x_min, x_max, y_min, y_max)
+        if track is not None:
+            where += ' AND track = ?'
+            params += (track,)
+        return self._query(where, params, columns)
+
+    def _query(self, where:str, params:tuple, columns:list=None) -> dict:
+        import numpy as np
+
+        columns = list(columns or COLUMNS)
+        for c in columns:
+            if c not in COLUMNS and c not in ('track', 'zone'):
+                raise ValueError(f'Unknown column: {c}')
+
+        rows = self._conn.execute(f'SELECT {", ".join(columns)} FROM points WHERE {where} ORDER BY track, ts', params).fetchall()
+        values = list(zip(*rows)) if rows else [()] * len(columns)
+        # Fixed-point columns are scaled back, with any missing values as NaN
+        return {c: np.array(v, dtype=np.float64) / SCALES[c] if SCALES.get(c, 1) != 1 else np.array(v) for c, v in zip(columns, values)}
@@ -1,9 +1,159 @@
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from itertools import chain, islice
+
+# Pool classes in concurrent.futures, imported when first used
+EXECUTORS = {
+    'process': 'ProcessPoolExecutor',
+    'thread': 'ThreadPoolExecutor'
+}
+
+
+# Markers passed between stages running in threads or as async tasks
+_END = object()
+
+
+class _StageError:
+    """Wraps an exception raised in an async stage so it can be re-raised downstream."""
+
+    def __init__(self, error:Exception) -> None:
+        self.error = error
+
+
+class StreamError(Exception):
+    """Raised when a stage fails on an element. The element is available as `item`."""
+
+    def __init__(self, msg:str, item) -> None:
+        super().__init__(msg, item)
+        self.msg = msg
+        self.item = item
+
+    def __str__(self):
+        return f'{self.msg}; item={self.item}'
+
+
+def _apply_chunk(func, chunk:list) -> list:
+    """Apply a function to each element of a chunk, identifying the element on failure."""
+    output = []
+    for x in chunk:
+        try:
+            output.append(func(x))
+        except Exception as e:
+            raise StreamError(f'{type(e).__name__}: {e}', x) from e
+    return output
+
+
+def _chunks(iterable, size:int):
+    """Group an iterable into lists of up to `size` elements."""
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def _as_sink(sink):
+    """Use an object with write() and close() as a sink, or wrap a per-element function."""
+    if hasattr(sink, 'write') and hasattr(sink, 'close'):
+        return sink
+    return Sink(sink, buffer_size=0)
+
+
+def prefetch(iterable, size:int=1):
+    """
+    Read an iterable in a worker thread, up to `size` elements ahead of the consumer.
+    Useful when producing an element blocks on I/O, so the next one is read while the current one is processed.
+    """
+    # Imported here; only needed when prefetching
+    import queue
+
+    buffer = queue.Queue(size)
+    closed = threading.Event()
+
+    def __put(item):
+        while not closed.is_set():
+            try:
+                buffer.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                pass
+
+    def __run():
+        try:
+            for x in iterable:
+                __put(x)
+                if closed.is_set():
+                    return
+            __put(_END)
+        except Exception as e:
+            __put(_StageError(e))
+
+    thread = threading.Thread(target=__run, name='prefetch', daemon=True)
+    thread.start()
+    try:
+        while True:
+            x = buffer.get()
+            if x is _END:
+                break
+            if isinstance(x, _StageError):
+                raise x.error
+            yield x
+    finally:
+        # Unblock the worker thread if it is waiting to put an element
+        closed.set()
+        thread.join()
+
+
+def stateful(func):
+    """Mark a stage function as holding state between elements, so it is never run in parallel."""
+    func.stateful = True
+    return func
+
+
+class Sink:
+    """
+    Class buffering elements for a consumer. The function receives lists of up to `buffer_size` elements,
+    or single elements if `buffer_size` is 0.
+    """
+
+    def __init__(self, func, buffer_size:int=1, close=None) -> None:
+        self._func = func
+        self._close = close
+        self.buffer_size = buffer_size
+        self.buffer = []
+
+    def close(self) -> None:
+        """Flush remaining elements and close the consumer."""
+        self.flush()
+        if self._close:
+            self._close()
+
+    def flush(self) -> None:
+        """Send buffered elements to the consumer."""
+        if self.buffer:
+            self._func(self.buffer)
+            self.buffer = []
+
+    def write(self, item) -> None:
+        """Add an element, sending the buffer to the consumer when full."""
+        if self.buffer_size == 0:
+            self._func(item)
+            return
+        self.buffer.append(item)
+        if len(self.buffer) >= self.buffer_size:
+            self.flush()
 
 
 class Stream:
 
-    def __init__(self, iterable) -> None:
-        self._iterable = iterable
+    def __init__(self, iterable, batch_size:int=None, profiler=None) -> None:
+        self._iterable = iter(iterable)
+        self.batch_size = batch_size
+        self.profiler = profiler
 
     def __iter__(self):
         return self._iterable
@@ -11,22 +161,173 @@ class Stream:
     def __next__(self):
         return next(self._iterable)
 
-    def create(iterable):
-        return Stream(iterable)
+    def create(iterable, profiler=None):
+        return Stream(iterable, profiler=profiler)
+
+    def _derive(self, iterable, batch_size:int=None):
+        """Create the next stream in the pipeline, keeping the profiler."""
+        return Stream(iterable, batch_size, self.profiler)
 
-    def map(self, func):
-        return Stream(map(func, self._iterable))
+    def _stage(self, func, name:str, batch:bool=False):
+        """Wrap a per-element or per-chunk stage function for profiling, if enabled."""
+        return self.profiler.stage(func, name, batch) if self.profiler else func
 
-    def pipe(self, func):
-        return Stream(func(self._iterable))
+    def _pipe_stage(self, func, name:str):
+        """Wrap an iterator stage function for profiling, if enabled."""
+        return self.profiler.stage(func, name).pipe if self.profiler else func
+
+    def batch(self, size:int):
+        """Move elements between stages in chunks of up to `size` elements."""
+        if self.batch_size:
+            return self.unbatch().batch(size)
+        return self._derive(_chunks(self._iterable, size), size)
+
+    def unbatch(self):
+        """Return to moving single elements between stages."""
+        if not self.batch_size:
+            return self
+        return self._derive(chain.from_iterable(self._iterable))
+
+    def map(self, func, name:str=None):
+        func = self._stage(func, name)
+        if self.batch_size:
+            # Apply per-element function across each chunk
+            return self._derive(([func(x) for x in chunk] for chunk in self._iterable), self.batch_size)
+        return self._derive(map(func, self._iterable))
+
+    def map_batch(self, func, name:str=None):
+        """Apply a function to each chunk. The function may return any iterable, e.g. a list or NumPy array."""
+        if not self.batch_size:
+            raise ValueError('Stream is not batched; call batch() first')
+        return self._derive(map(self._stage(func, name, batch=True), self._iterable), self.batch_size)
+
+    def parallel_map(self, func, workers:int=None, executor:str='process', chunksize:int=256, max_pending:int=None, name:str=None, pool=None):
+        """
+        Apply a per-element function using a pool of workers, preserving order.
+        At most `max_pending` chunks (default twice the workers) are in flight at once.
+        A process pool requires a picklable, module-level function.
+        Pass an existing `pool` executor to share it between streams; it is left open when the stream ends.
+        """
+        if getattr(func, 'stateful', False):
+            raise ValueError(f'Cannot run stateful stage {getattr(func, "__name__", func)} in parallel')
+        if executor not in EXECUTORS:
+            raise ValueError(f'Unknown executor: {executor}')
+
+        import concurrent.futures
+        pool_class = getattr(concurrent.futures, EXECUTORS[executor])
+        workers = workers or os.cpu_count() or 1
+        limit = max_pending or (2 * workers)
+
+        def __run(chunks):
+            with nullcontext(pool) if pool else pool_class(max_workers=workers) as run_pool:
+                pending = deque()
+                for chunk in chunks:
+                    pending.append(run_pool.submit(_apply_chunk, func, chunk))
+                    # Wait for the oldest chunk once enough work is in flight
+                    if len(pending) >= limit:
+                        yield pending.popleft().result()
+                while pending:
+                    yield pending.popleft().result()
+
+        name = name or getattr(func, '__name__', None)
+        if self.batch_size:
+            return self._derive(self._pipe_stage(__run, name)(self._iterable), self.batch_size)
+        return self._derive(self._pipe_stage(lambda it: chain.from_iterable(__run(_chunks(it, chunksize))), name)(self._iterable))
+
+    def sink(self, *sinks) -> int:
+        """Consume the stream, feeding every element to each sink, then close the sinks. Returns the number of elements."""
+        count = 0
+        for count, _ in enumerate(self.unbatch().tee(*sinks), 1):
+            pass
+        return count
+
+    def tee(self, *sinks):
+        """Feed every element to each sink as it passes; sinks are closed when the stream is exhausted."""
+        sinks = [_as_sink(s) for s in sinks]
+
+        def __tee(iter_in):
+            for x in iter_in:
+                # Chunks are fed to the sinks element by element
+                for e in (x if self.batch_size else (x,)):
+                    for s in sinks:
+                        s.write(e)
+                yield x
+            for s in sinks:
+                s.close()
+
+        return self._derive(__tee(self._iterable), self.batch_size)
+
+    def pipe(self, func, name:str=None):
+        func = self._pipe_stage(func, name)
+        if self.batch_size:
+            # Run the function once over the flattened elements so any state carries across chunk boundaries
+            return self._derive(_chunks(func(chain.from_iterable(self._iterable)), self.batch_size), self.batch_size)
+        return self._derive(func(self._iterable))
 
 
 class StreamFunction:
+    """
+    Class wrapping a stage function to record calls, items in and out, latency and (optionally) memory allocations.
+    """
+
+    # Number of latency samples kept for percentiles
+    MAX_SAMPLES = 10000
 
-    def __init__(self, func) -> None:
+    def __init__(self, func, name:str=None, batch:bool=False, trace_memory:bool=False) -> None:
         self._func = func
+        self.name = name or getattr(func, '__name__', repr(func))
+        self.batch = batch
+        self.trace_memory = trace_memory
         self.counter = 0
         self.pct = 0.0
+        self.items_in = 0
+        self.items_out = 0
+        self.total_time = 0.0
+        self.mem_delta = 0
+        self._samples = []
+        if trace_memory:
+            import tracemalloc
+            self._traced_memory = lambda: tracemalloc.get_traced_memory()[0]
+
+    def __call__(self, *args, **kwargs):
+        mem_start = self._traced_memory() if self.trace_memory else 0
+        start = time.perf_counter()
+        res = self._func(*args, **kwargs)
+        if self.batch and not hasattr(res, '__len__'):
+            # A batch function may return a generator, which only does its work as it is read; read it here to time and count it
+            res = list(res)
+        elapsed = time.perf_counter() - start
+        if self.trace_memory:
+            self.mem_delta += self._traced_memory() - mem_start
+
+        # Count elements in and out; None results are dropped elements
+        if self.batch:
+            self.items_in += len(args[0])
+            self.items_out += len(res)
+        else:
+            self.items_in += 1
+            self.items_out += 0 if res is None else 1
+
+        self._record(elapsed)
+        return res
+
+    def _record(self, elapsed:float) -> None:
+        """Record a call latency, keeping a uniform sample for percentiles."""
+        self.counter += 1
+        self.total_time += elapsed
+        if len(self._samples) < StreamFunction.MAX_SAMPLES:
+            self._samples.append(elapsed)
+        else:
+            import random
+            ix = random.randrange(self.counter)
+            if ix < StreamFunction.MAX_SAMPLES:
+                self._samples[ix] = elapsed
+
+    def record_chunk(self, items_in:int, items_out:int, elapsed:float) -> None:
+        """Record a chunk of elements processed elsewhere, such as in a worker process, as one call."""
+        self.items_in += items_in
+        self.items_out += items_out
+        self._record(elapsed)
 
     def exec(self, *args, **kwargs):
         res = self._func(*args, **kwargs)
@@ -38,4 +339,77 @@ class StreamFunction:
     @property
     def func(self):
         self.counter += 1
-        return self._func
\ No newline at end of file
+        return self._func
+
+    def percentile(self, pct:float) -> float:
+        """Latency percentile, in seconds."""
+        if not self._samples:
+            return 0.0
+        samples = sorted(self._samples)
+        return samples[min(len(samples) - 1, int(len(samples) * pct / 100.0))]
+
+    def pipe(self, iter_in):
+        """Run an iterator stage function, timing each output without the time spent upstream."""
+        upstream = [0.0]
+
+        def __counted():
+            iterator = iter(iter_in)
+            while True:
+                start = time.perf_counter()
+                try:
+                    x = next(iterator)
+                except StopIteration:
+                    upstream[0] += time.perf_counter() - start
+                    return
+                upstream[0] += time.perf_counter() - start
+                self.items_in += 1
+                yield x
+
+        output = iter(self._func(__counted()))
+        while True:
+            mem_start = self._traced_memory() if self.trace_memory else 0
+            upstream_start = upstream[0]
+            start = time.perf_counter()
+            try:
+                res = next(output)
+            except StopIteration:
+                return
+            elapsed = time.perf_counter() - start - (upstream[0] - upstream_start)
+            if self.trace_memory:
+                self.mem_delta += self._traced_memory() - mem_start
+
+            self.items_out += 1
+            self._record(elapsed)
+            yield res
+
+
+class Profiler:
+    """
+    Class collecting per-stage profiling for a pipeline.
+    """
+
+    def __init__(self, trace_memory:bool=False) -> None:
+        self.trace_memory = trace_memory
+        self.stages = []
+        if trace_memory:
+            import tracemalloc
+            if not tracemalloc.is_tracing():
+                tracemalloc.start()
+
+    def report(self) -> str:
+        """Format a per-stage report."""
+        report = f'{"STAGE":24} {"CALLS":>9} {"IN":>9} {"OUT":>9} {"TOTAL ms":>10} {"MEAN us":>9} {"P50 us":>9} {"P95 us":>9} {"P99 us":>9}'
+        if self.trace_memory:
+            report += f' {"ALLOC KiB":>10}'
+        for s in self.stages:
+            mean = (s.total_time / s.counter) if s.counter else 0.0
+            report += f'\n{s.name[:24]:24} {s.counter:9d} {s.items_in:9d} {s.items_out:9d} {s.total_time * 1e3:10.1f} {mean * 1e6:9.1f} {s.percentile(50) * 1e6:9.1f} {s.percentile(95) * 1e6:9.1f} {s.percentile(99) * 1e6:9.1f}'
+            if self.trace_memory:
+                report += f' {s.mem_delta / 1024.0:10.1f}'
+        return report
+
+    def stage(self, func, name:str=None, batch:bool=False) -> StreamFunction:
+        """Wrap a stage function and add it to the report."""
+        stage = StreamFunction(func, name, batch, self.trace_memory)
+        self.stages.append(stage)
+        return stage
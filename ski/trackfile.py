@@ -0,0 +1,286 @@
+"""
+  Module providing a compact binary file format for processed tracks.
+  Columns are held as fixed-point integers, delta and zigzag-varint encoded in blocks, each optionally compressed.
+
+  A file holds:
+  - the marker, then a 4-byte length and a JSON header with the columns, their scales and the origin (first value of each column);
+  - blocks, each a point count, a byte length and the body. The body holds each column as a 4-byte length and varints.
+    The first value in a block is a delta from the origin, so any block can be read on its own;
+  - an empty block, the block index and a footer giving the offset of the index, so blocks can be found without reading the file.
+"""
+
+import json
+import logging
+import lzma
+import struct
+import zlib
+
+from .coordinate import calc_utm_zone
+from .point import SCALES, fixed_value
+from .stream import Sink
+
+TRACK_MARKER = b'SKITRACK'
+VERSION = 1
+
+# Points per block
+BLOCK_SIZE = 4096
+
+COMPRESSORS = {
+    None: (lambda b: b, lambda b: b),
+    'zlib': (zlib.compress, zlib.decompress),
+    'lzma': (lzma.compress, lzma.decompress)
+}
+
+_LENGTH = struct.Struct('<I')
+_BLOCK = struct.Struct('<II')
+_INDEX_ENTRY = struct.Struct('<qqQI')
+_FOOTER = struct.Struct('<QI8s')
+
+# Define loggers
+log = logging.getLogger(__name__)
+
+
+def encode_varints(values) -> bytes:
+    """Encode an array of signed integers as zigzag varints."""
+    import numpy as np
+
+    values = np.asarray(values, dtype=np.int64)
+    # Zigzag maps small negative and positive values to small unsigned values
+    zigzag = ((values << 1) ^ (values >> 63)).astype(np.uint64)
+
+    # Bytes needed for each value, at 7 bits per byte
+    nbytes = np.ones(len(zigzag), dtype=np.int64)
+    for k in range(1, 10):
+        nbytes += zigzag >= np.uint64(1 << (7 * k))
+
+    offsets = np.cumsum(nbytes) - nbytes
+    out = np.zeros(int(nbytes.sum()), dtype=np.uint8)
+    for k in range(int(nbytes.max()) if len(nbytes) else 0):
+        sel = nbytes > k
+        chunk = (zigzag[sel] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        # Set the high bit on all but the last byte of a value
+        out[offsets[sel] + k] = chunk | np.where(nbytes[sel] > k + 1, 0x80, 0).astype(np.uint64)
+    return out.tobytes()
+
+
+def decode_varints(data:bytes):
+    """Decode zigzag varints into an array of signed integers."""
+    import numpy as np
+
+    b = np.frombuffer(data, dtype=np.uint8)
+    last = b < 0x80
+    # Value each byte belongs to, and its position within the value
+    value_index = np.cumsum(last) - last
+    starts = np.flatnonzero(np.concatenate(([True], last[:-1])))
+    position = np.arange(len(b)) - starts[value_index]
+
+    zigzag = np.zeros(int(last.sum()), dtype=np.uint64)
+    for k in range(int(position.max()) + 1 if len(b) else 0):
+        sel = position == k
+        zigzag[value_index[sel]] |= (b[sel] & 0x7F).astype(np.uint64) << np.uint64(7 * k)
+
+    return (zigzag >> np.uint64(1)).astype(np.int64) ^ -(zigzag & np.uint64(1)).astype(np.int64)
+
+
+class TrackWriter:
+    """
+    Class writing points to a track file as they arrive, a block at a time.
+    Columns default to those in SCALES held by the first point; the zone defaults to the UTM zone of the first point, which x and y are in.
+    """
+
+    def __init__(self, path:str, columns:list=None, block_size:int=BLOCK_SIZE, compression:str=None, zone:str=None) -> None:
+        if compression not in COMPRESSORS:
+            raise ValueError(f'Unknown compression: {compression}')
+
+        self.path = path
+        self.columns = columns
+        self.block_size = block_size
+        self.compression = compression
+        self.zone = zone
+        self.origin = None
+        self.point_count = 0
+        self._file = open(path, 'wb')
+        self._buffer = []
+        self._index = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Write any buffered points, the index and the footer."""
+        if self._file.closed:
+            return
+
+        if self.origin is None:
+            self._write_header(self.columns or [], {})
+        self.flush()
+
+        self._file.write(_BLOCK.pack(0, 0))
+        index_offset = self._file.tell()
+        for entry in self._index:
+            self._file.write(_INDEX_ENTRY.pack(*entry))
+        self._file.write(_FOOTER.pack(index_offset, len(self._index), TRACK_MARKER))
+        self._file.close()
+
+        log.info('Wrote %d point(s) in %d block(s) to %s', self.point_count, len(self._index), self.path)
+
+    def flush(self) -> None:
+        """Write buffered points as a block."""
+        if self._buffer:
+            self._write_block(self._buffer)
+            self._buffer = []
+
+    def write(self, point:dict) -> None:
+        """Add a point, writing a block when the buffer is full."""
+        if self.origin is None:
+            columns = self.columns or [c for c in SCALES if c in point]
+            if self.zone is None and 'lat' in point and 'lon' in point:
+                self.zone = calc_utm_zone(point['lat'], point['lon'])
+            self._write_header(columns, {c: int(round(fixed_value(point, c))) for c in columns})
+
+        self._buffer.append(point)
+        if len(self._buffer) >= self.block_size:
+            self.flush()
+
+    def sink(self) -> Sink:
+        """Create a sink writing points to the file, closing it when the stream ends."""
+        return Sink(self.write, buffer_size=0, close=self.close)
+
+    def _write_header(self, columns:list, origin:dict) -> None:
+        for c in columns:
+            if c not in SCALES:
+                raise ValueError(f'Unknown column: {c}')
+
+        self.columns = columns
+        self.origin = origin
+        header = {
+            'version': VERSION,
+            'zone': self.zone,
+            'start': origin.get('ts'),
+            'origin': origin,
+            'scales': {c: SCALES[c] for c in columns},
+            'compression': self.compression,
+            'block_size': self.block_size
+        }
+        header_bytes = json.dumps(header).encode('utf-8')
+        self._file.write(TRACK_MARKER + _LENGTH.pack(len(header_bytes)) + header_bytes)
+
+    def _write_block(self, points:list) -> None:
+        import numpy as np
+
+        body = bytearray()
+        ts = None
+        for c in self.columns:
+            values = np.round(np.array([fixed_value(p, c) for p in points], dtype=np.float64)).astype(np.int64)
+            if c == 'ts':
+                ts = values
+            encoded = encode_varints(np.diff(values, prepend=self.origin[c]))
+            body += _LENGTH.pack(len(encoded)) + encoded
+
+        body = COMPRESSORS[self.compression][0](bytes(body))
+        offset = self._file.tell()
+        self._file.write(_BLOCK.pack(len(points), len(body)) + body)
+
+        ts_from, ts_to = (int(ts[0]), int(ts[-1])) if ts is not None else (0, 0)
+        self._index.append((ts_from, ts_to, offset, len(points)))
+        self.point_count += len(points)
+
+
+class TrackReader:
+    """Class reading points from a track file, in order or a block at a time through the index."""
+
+    def __init__(self, path:str) -> None:
+        self.path = path
+        self._file = open(path, 'rb')
+        if self._file.read(len(TRACK_MARKER)) != TRACK_MARKER:
+            self._file.close()
+            raise ValueError(f'{path} is not a track file')
+
+        header_length, = _LENGTH.unpack(self._file.read(_LENGTH.size))
+        self.header = json.loads(self._file.read(header_length))
+        self.columns = list(self.header['scales'])
+        self._data_offset = self._file.tell()
+        self._index = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def __iter__(self):
+        return self.points()
+
+    def close(self) -> None:
+        self._file.close()
+
+    @property
+    def index(self) -> list:
+        """List of (first ts, last ts, offset, point count) for each block, read from the end of the file."""
+        if self._index is None:
+            self._file.seek(-_FOOTER.size, 2)
+            index_offset, block_count, marker = _FOOTER.unpack(self._file.read(_FOOTER.size))
+            if marker != TRACK_MARKER:
+                raise ValueError(f'{self.path} has no index; it may be incomplete')
+            self._file.seek(index_offset)
+            data = self._file.read(block_count * _INDEX_ENTRY.size)
+            self._index = list(_INDEX_ENTRY.iter_unpack(data))
+        return self._index
+
+    def blocks(self):
+        """Read every block in order, yielding a dict of NumPy columns per block. Does not need the index."""
+        self._file.seek(self._data_offset)
+        while True:
+            data = self._file.read(_BLOCK.size)
+            if len(data) < _BLOCK.size:
+                # Still being written, or not closed
+                log.warn('%s ends without an index', self.path)
+                return
+            count, length = _BLOCK.unpack(data)
+            if count == 0:
+                return
+            yield self._decode_block(self._file.read(length))
+
+    def read_block(self, i:int) -> dict:
+        """Read one block by its position in the index."""
+        offset = self.index[i][2]
+        self._file.seek(offset)
+        count, length = _BLOCK.unpack(self._file.read(_BLOCK.size))
+        return self._decode_block(self._file.read(length))
+
+    def columns_between(self, ts_from:int, ts_to:int) -> dict:
+        """Read the points between two timestamps (inclusive) as a dict of NumPy columns, reading only the blocks needed."""
+        import numpy as np
+
+        blocks = [self.read_block(i) for i, (first, last, _, _) in enumerate(self.index) if first <= ts_to and last >= ts_from]
+        if not blocks:
+            return {c: np.array([]) for c in self.columns}
+
+        columns = {c: np.concatenate([b[c] for b in blocks]) for c in self.columns}
+        keep = (columns['ts'] >= ts_from) & (columns['ts'] <= ts_to)
+        return {c: v[keep] for c, v in columns.items()}
+
+    def points(self):
+        """Read the points in order, as dicts."""
+        for block in self.blocks():
+            names = list(block)
+            for values in zip(*(block[c].tolist() for c in names)):
+                yield dict(zip(names, values))
+
+    def _decode_block(self, body:bytes) -> dict:
+        import numpy as np
+
+        body = COMPRESSORS[self.header['compression']][1](body)
+        columns = {}
+        offset = 0
+        for c in self.columns:
+            length, = _LENGTH.unpack_from(body, offset)
+            offset += _LENGTH.size
+            values = np.cumsum(decode_varints(body[offset:offset + length])) + self.header['origin'][c]
+            offset += length
+            scale = self.header['scales'][c]
+            columns[c] = values if scale == 1 else values / scale
+        return columns
@@ -0,0 +1,68 @@
+import datetime
+import os
+import struct
+import tempfile
+import unittest
+import ski.archive as undertest
+
+
+def make_payload(count):
+    return b''.join(struct.pack('>8i', 45556543 + i, 6516060, 85701 + i, 180222, 1500, 12640000, 0, 2) for i in range(count))
+
+
+HEADER = { 'index': 3, 'date': datetime.datetime(2022, 2, 18, 8, 57, 1) }
+
+
+class TestTrackArchive(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+        self.archive = undertest.TrackArchive(self.path)
+
+    def test_add(self):
+        self.assertTrue(self.archive.add(HEADER, make_payload(2)))
+        self.assertTrue(self.archive.has(HEADER))
+        self.assertEqual(make_payload(2), self.archive.payload(HEADER))
+
+    def test_add_unchanged(self):
+        self.archive.add(HEADER, make_payload(2))
+        self.assertFalse(self.archive.add(HEADER, make_payload(2)))
+        self.assertTrue(self.archive.add(HEADER, make_payload(3)))
+        self.assertEqual(make_payload(3), self.archive.payload(HEADER))
+
+    def test_index_reused(self):
+        self.archive.add(HEADER, make_payload(2))
+        self.assertFalse(self.archive.has({ 'index': 3, 'date': datetime.datetime(2023, 1, 1) }))
+
+    def test_manifest_saved(self):
+        self.archive.add(HEADER, make_payload(2))
+        archive = undertest.TrackArchive(self.path)
+        self.assertTrue(archive.has(HEADER))
+        self.assertListEqual([HEADER], archive.headers())
+
+    def test_payload_checksum(self):
+        self.archive.add(HEADER, make_payload(2))
+        with open(os.path.join(self.path, self.archive.manifest[undertest.track_key(HEADER)]['file']), 'wb') as f:
+            f.write(make_payload(1))
+        self.assertRaises(ValueError, lambda: self.archive.payload(HEADER))
+
+    def test_stream_records(self):
+        earlier = { 'index': 7, 'date': datetime.datetime(2021, 1, 1) }
+        self.archive.add(HEADER, make_payload(2))
+        self.archive.add(earlier, make_payload(3))
+        records = list(self.archive.stream_records())
+        self.assertListEqual([7, 7, 7, 3, 3], [r['position']['track'] for r in records])
+        self.assertListEqual(records[2:], list(self.archive.stream_records(records[1]['position'])))
+
+    def test_stream_records_resume_reused_index(self):
+        # The device was cleared, so a later track has the same index
+        later = { 'index': 3, 'date': datetime.datetime(2023, 1, 1) }
+        self.archive.add(HEADER, make_payload(2))
+        self.archive.add(later, make_payload(3))
+        records = list(self.archive.stream_records())
+        self.assertListEqual(records[1:], list(self.archive.stream_records(records[0]['position'])))
+
+    def test_stream_records_resume_missing_track(self):
+        self.archive.add(HEADER, make_payload(2))
+        position = dict(next(self.archive.stream_records())['position'], track_key='3@2023-01-01T00:00:00')
+        self.assertRaises(ValueError, lambda: list(self.archive.stream_records(position)))
@@ -0,0 +1,107 @@
+import unittest
+from ski.processor import enrich_point, linear_interpolate
+from ski.stream import Profiler, Stream
+from ski.utils import MovingWindow
+import ski.asyncstream as undertest
+from support import make_points
+
+
+def double(x):
+    return x * 2
+
+
+def fail_on_three(x):
+    if x == 3:
+        raise ValueError('three')
+    return x
+
+
+async def increment(x):
+    return x + 1
+
+
+async def odd_only(source):
+    async for x in source:
+        if x % 2:
+            yield x
+
+
+class TestAsyncStream(unittest.IsolatedAsyncioTestCase):
+
+    async def test_async_for(self):
+        self.assertListEqual([2, 4, 6], [x async for x in undertest.AsyncStream.create([1, 2, 3]).map(double)])
+
+    async def test_async_map(self):
+        self.assertListEqual([2, 3, 4], [x async for x in undertest.AsyncStream.create([1, 2, 3]).map(increment)])
+
+    async def test_async_pipe(self):
+        self.assertListEqual([1, 3], [x async for x in undertest.AsyncStream.create([1, 2, 3]).pipe(odd_only)])
+
+    async def test_chunks(self):
+        # Elements cross from the reading thread a chunk at a time
+        stream = undertest.AsyncStream.from_blocking(iter(range(10)), chunksize=4).map(double)
+        self.assertListEqual([[0, 2, 4, 6], [8, 10, 12, 14], [16, 18]], [c async for c in stream._source])
+
+
+class TestAsyncStreamSync(unittest.TestCase):
+
+    def test_sync_iteration(self):
+        self.assertListEqual([2, 4, 6], list(undertest.AsyncStream.create([1, 2, 3]).map(double)))
+
+    def test_from_blocking(self):
+        self.assertListEqual([x * 2 for x in range(100)], list(undertest.AsyncStream.from_blocking(iter(range(100)), queue_size=4).map(double)))
+
+    def test_sync_pipe_carries_state(self):
+        window = MovingWindow(2)
+        expected = list(Stream.create(make_points(150, gap_every=3)).pipe(linear_interpolate).map(lambda p: enrich_point(window, p)))
+
+        window = MovingWindow(2)
+        result = list(undertest.AsyncStream.from_blocking(make_points(150, gap_every=3), queue_size=3).pipe(linear_interpolate).map(lambda p: enrich_point(window, p)))
+        self.assertListEqual(expected, result)
+
+    def test_sync_pipe_chunked(self):
+        window = MovingWindow(2)
+        expected = list(Stream.create(make_points(150, gap_every=3)).pipe(linear_interpolate).map(lambda p: enrich_point(window, p)))
+
+        window = MovingWindow(2)
+        result = list(undertest.AsyncStream.from_blocking(make_points(150, gap_every=3), chunksize=7).pipe(linear_interpolate).map(lambda p: enrich_point(window, p)))
+        self.assertListEqual(expected, result)
+
+    def test_map_workers(self):
+        result = undertest.AsyncStream.create(range(100)).map(double, workers=2, executor='thread')
+        self.assertListEqual([x * 2 for x in range(100)], list(result))
+
+    def test_map_workers_chunked(self):
+        result = undertest.AsyncStream.create(range(100)).map(double, workers=2, executor='process', chunksize=30)
+        self.assertListEqual([x * 2 for x in range(100)], list(result))
+
+    def test_map_workers_profiled(self):
+        profiler = Profiler()
+        list(undertest.AsyncStream.create(range(100), profiler=profiler).map(double, name='build', workers=2, executor='thread', chunksize=30))
+        self.assertListEqual(['build'], [s.name for s in profiler.stages])
+        # One call per chunk
+        self.assertListEqual([4, 100, 100], [profiler.stages[0].counter, profiler.stages[0].items_in, profiler.stages[0].items_out])
+
+    def test_map_workers_stateful(self):
+        self.assertRaises(ValueError, lambda: undertest.AsyncStream.create([]).map(enrich_point, workers=2))
+
+    def test_map_error(self):
+        with self.assertRaises(ValueError):
+            list(undertest.AsyncStream.create(range(10)).map(fail_on_three))
+
+    def test_sync_pipe_error(self):
+        def fail(it):
+            for x in it:
+                yield fail_on_three(x)
+        with self.assertRaises(ValueError):
+            list(undertest.AsyncStream.create(range(10)).pipe(fail))
+
+    def test_profiled(self):
+        profiler = Profiler()
+        list(undertest.AsyncStream.create(make_points(30, gap_every=3), profiler=profiler).map(lambda p: p, name='identity').pipe(lambda it: (p for p in it), name='pass'))
+        self.assertListEqual(['identity', 'pass'], [s.name for s in profiler.stages])
+        self.assertListEqual([20, 20], [s.items_out for s in profiler.stages])
+
+
+if __name__ == '__main__':
+    unittest.main()
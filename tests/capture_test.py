@@ -0,0 +1,57 @@
+import os
+import tempfile
+import unittest
+from ski.archive import TrackArchive
+from ski.dg100 import stream_records, sync_tracks
+from ski.simulator import SimulatedDevice
+import ski.capture as undertest
+
+
+class TestCapture(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'session.cap')
+        with undertest.CaptureSerial(SimulatedDevice.create(3, 64), self.path) as ser:
+            self.records = list(stream_records(ser))
+
+    def test_capture_entries(self):
+        entries = undertest.read_capture(self.path)
+        self.assertEqual(undertest.REQUEST, entries[0][0])
+        self.assertIn(undertest.RESPONSE, [d for d, _ in entries])
+
+    def test_passes_through(self):
+        with undertest.CaptureSerial(SimulatedDevice.create(3, 64), self.path) as ser:
+            self.assertEqual('simulator', ser.name)
+
+    def test_replay(self):
+        self.assertListEqual(self.records, list(stream_records(undertest.ReplaySerial(self.path))))
+
+    def test_replay_out_of_order(self):
+        # The archive already holds the first track, so only later tracks are requested
+        archive = TrackArchive(tempfile.mkdtemp())
+        sync_tracks(SimulatedDevice.create(1, 64), archive)
+        self.assertEqual(2, len(sync_tracks(undertest.ReplaySerial(self.path), archive)))
+
+    def test_replay_missing_request(self):
+        entries = undertest.read_capture(self.path)
+        # Drop the response to the last request; that track is skipped
+        with open(self.path, 'wb') as f:
+            f.write(undertest.CAPTURE_MARKER)
+            last_request = max(i for i, (d, _) in enumerate(entries) if d == undertest.REQUEST)
+            for direction, data in entries[:last_request + 1]:
+                f.write(undertest._ENTRY.pack(direction, len(data)) + data)
+        self.assertListEqual(self.records[:128], list(stream_records(undertest.ReplaySerial(self.path))))
+
+    def test_truncated(self):
+        size = os.path.getsize(self.path)
+        last = len(undertest.read_capture(self.path)[-1][1])
+        # Cut in the last payload, then in the last entry's header
+        for truncated in (size - 1, size - last - 2):
+            with open(self.path, 'r+b') as f:
+                f.truncate(truncated)
+            self.assertRaises(ValueError, lambda: undertest.read_capture(self.path))
+
+    def test_not_capture(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'\x00' * 16)
+        self.assertRaises(ValueError, lambda: undertest.ReplaySerial(self.path))
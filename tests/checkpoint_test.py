@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+import ski.checkpoint as undertest
+from ski.stream import Sink
+
+
+class TestCheckpoint(unittest.TestCase):
+
+    def setUp(self):
+        self.checkpoint = undertest.Checkpoint(os.path.join(tempfile.mkdtemp(), 'checkpoint.json'), every=2)
+
+    def test_load_no_checkpoint(self):
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_save_load(self):
+        self.checkpoint.save({ 'position': { 'offset': 10, 'index': 2 }, 'count': 3 })
+        self.assertEqual({ 'position': { 'offset': 10, 'index': 2 }, 'count': 3 }, self.checkpoint.load())
+
+    def test_clear(self):
+        self.checkpoint.save({ 'count': 3 })
+        self.checkpoint.clear()
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_sink_every(self):
+        sink = self.checkpoint.sink(lambda p, pos: { 'position': pos, 'ts': p['ts'] })
+        sink({ 'ts': 1, '_pos': 'a' })
+        self.assertIsNone(self.checkpoint.load())
+        sink({ 'ts': 2, '_pos': 'b' })
+        self.assertEqual({ 'position': 'b', 'ts': 2 }, self.checkpoint.load())
+
+    def test_sink_skips_interpolated(self):
+        sink = self.checkpoint.sink(lambda p, pos: { 'position': pos, 'ts': p['ts'] })
+        sink({ 'ts': 1, '_pos': 'a' })
+        sink({ 'ts': 2 })
+        self.assertIsNone(self.checkpoint.load())
+
+    def test_sink_flushes(self):
+        written = []
+        buffered = Sink(written.extend, buffer_size=10)
+        sink = self.checkpoint.sink(lambda p, pos: { 'written': len(written) }, flush=[buffered])
+        for i in range(2):
+            buffered.write(i)
+            sink({ 'ts': i, '_pos': i })
+        self.assertEqual({ 'written': 2 }, self.checkpoint.load())
+
+    def test_sink_removes_position(self):
+        point = { 'ts': 1, '_pos': 'a' }
+        self.checkpoint.sink(lambda p, pos: {})(point)
+        self.assertEqual({ 'ts': 1 }, point)
+
+    def test_sink_saves_source(self):
+        sink = self.checkpoint.sink(lambda p, pos: { 'position': pos }, source={ 'path': '/dev/ttyUSB0' })
+        for i in range(2):
+            sink({ 'ts': i, '_pos': i })
+        self.assertEqual({ 'position': 1, 'source': { 'path': '/dev/ttyUSB0' } }, self.checkpoint.load({ 'path': '/dev/ttyUSB0' }))
+
+    def test_load_other_source(self):
+        self.checkpoint.save({ 'position': 1, 'source': { 'path': 'a.bin', 'size': 10, 'mtime': 1 } })
+        with self.assertRaises(ValueError):
+            self.checkpoint.load({ 'path': 'a.bin', 'size': 20, 'mtime': 1 })
+
+    def test_load_no_source_saved(self):
+        self.checkpoint.save({ 'position': 1 })
+        with self.assertRaises(ValueError):
+            self.checkpoint.load({ 'path': 'a.bin' })
+
+    def test_source_identity_file(self):
+        path = os.path.join(tempfile.mkdtemp(), 'track.bin')
+        with open(path, 'wb') as f:
+            f.write(b'1234')
+        identity = undertest.source_identity(path)
+        self.assertEqual(os.path.abspath(path), identity['path'])
+        self.assertEqual(4, identity['size'])
+        self.assertIn('mtime', identity)
+
+    def test_source_identity_port(self):
+        self.assertEqual({ 'path': '/dev/ttyUSB0' }, undertest.source_identity('/dev/ttyUSB0'))
+
+    def test_positioned(self):
+        build_f = undertest.positioned(lambda l: { 'ts': int(l[0]) })
+        self.assertEqual({ 'ts': 1, '_pos': 'a' }, build_f({ 'point': ['1'], 'position': 'a' }))
+
+    def test_positioned_none(self):
+        self.assertIsNone(undertest.positioned(lambda l: None)({ 'point': ['1'], 'position': 'a' }))
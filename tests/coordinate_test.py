@@ -65,6 +65,14 @@ class TestUTMtoWGS(unittest.TestCase):
         self.assertAlmostEqual(0, y_drift)
 
 
+class TestCalcUtmZone(unittest.TestCase):
+
+    def test_calc_utm_zone(self):
+        self.assertEqual('13N', undertest.calc_utm_zone(39.8856, -105.763))
+        self.assertEqual('30N', undertest.calc_utm_zone(51.5007, -0.1246))
+        self.assertEqual('34S', undertest.calc_utm_zone(-33.9, 18.4))
+
+
 class TestWGStoUTM(unittest.TestCase):
 
     def test_latitude(self):
@@ -0,0 +1,65 @@
+import unittest
+import numpy as np
+import ski.dash as undertest
+
+
+class TestColumnsFromPoints(unittest.TestCase):
+
+    def test_columns_from_points(self):
+        points = [
+            { 'ts': 1518711415, 'spd': 1.80, 'alt': 2776 },
+            { 'ts': 1518711416, 'spd': 1.81 }
+        ]
+        result = undertest.columns_from_points(points)
+        self.assertListEqual([1518711415, 1518711416], result['ts'].tolist())
+        self.assertListEqual([2776, 0], result['alt'].tolist())
+        self.assertListEqual([1.80, 1.81], result['spd'].tolist())
+
+
+class TestLTTB(unittest.TestCase):
+
+    def test_lttb_below_threshold(self):
+        self.assertListEqual([0, 1, 2], undertest.lttb([0, 1, 2], [5, 6, 7], 10).tolist())
+
+    def test_lttb_keeps_end_points(self):
+        x = np.arange(1000)
+        y = np.sin(x / 50.0)
+        result = undertest.lttb(x, y, 100)
+        self.assertEqual(100, len(result))
+        self.assertEqual(0, result[0])
+        self.assertEqual(999, result[-1])
+        self.assertTrue(np.all(np.diff(result) > 0))
+
+    def test_lttb_keeps_peak(self):
+        x = np.arange(100)
+        y = np.zeros(100)
+        y[42] = 100
+        self.assertIn(42, undertest.lttb(x, y, 10).tolist())
+
+
+class TestChartSeries(unittest.TestCase):
+
+    def setUp(self):
+        self.series = undertest.ChartSeries()
+        self.series.add_track('t1', { 'ts': np.arange(1000, 2000), 'alt': np.arange(1000) % 97 })
+
+    def test_series_full_range(self):
+        ts, alt = self.series.series('t1', 'alt', 50)
+        self.assertEqual(50, len(ts))
+        self.assertEqual(50, len(alt))
+        self.assertEqual(1000, ts[0])
+        self.assertEqual(1999, ts[-1])
+
+    def test_series_visible_range(self):
+        ts, _ = self.series.series('t1', 'alt', 50, ts_from=1200, ts_to=1300)
+        self.assertEqual(1200, ts[0])
+        self.assertEqual(1300, ts[-1])
+
+    def test_series_cached(self):
+        first = self.series.series('t1', 'alt', 50)
+        self.assertIs(first, self.series.series('t1', 'alt', 50))
+
+    def test_series_cache_cleared_on_replace(self):
+        first = self.series.series('t1', 'alt', 50)
+        self.series.add_track('t1', { 'ts': np.arange(1000, 2000), 'alt': np.arange(1000) })
+        self.assertIsNot(first, self.series.series('t1', 'alt', 50))
@@ -0,0 +1,40 @@
+import unittest
+from ski.simulator import SimulatedDevice
+import ski.devices as undertest
+
+
+def open_simulated(port):
+    if port == 'broken':
+        raise IOError('No such device')
+    tracks, records = { 'a': (2, 64), 'b': (3, 10), 'c': (1, 100) }[port]
+    return SimulatedDevice.create(tracks, records)
+
+
+class TestDownloadManager(unittest.TestCase):
+
+    def test_run(self):
+        points = { 'a': [], 'b': [], 'c': [] }
+        manager = undertest.DownloadManager(['a', 'b', 'c'], open_f=open_simulated, sinks_f=lambda port: [points[port].append])
+        status = manager.run()
+        self.assertListEqual(['done'] * 3, [s.state for s in status.values()])
+        self.assertListEqual([128, 30, 100], [len(points[p]) for p in 'abc'])
+        self.assertListEqual([128, 30, 100], [s.records for s in status.values()])
+        self.assertListEqual([2, 3, 1], [s.total_sections for s in status.values()])
+
+    def test_shared_pool(self):
+        manager = undertest.DownloadManager(['a', 'b', 'c'], open_f=open_simulated, workers=2, executor='thread')
+        self.assertListEqual([128, 30, 100], [s.points for s in manager.run().values()])
+
+    def test_failure_isolated(self):
+        manager = undertest.DownloadManager(['a', 'broken', 'c'], open_f=open_simulated)
+        status = manager.run()
+        self.assertListEqual(['done', 'failed', 'done'], [s.state for s in status.values()])
+        self.assertIn('No such device', status['broken'].error)
+        self.assertIn('broken', manager.report())
+
+    def test_pipeline(self):
+        manager = undertest.DownloadManager(['c'], open_f=open_simulated, pipeline_f=lambda port, stream: stream.map(lambda p: p if p['ts'] % 2 else None).pipe(lambda it: (p for p in it if p)))
+        self.assertEqual(50, manager.run()['c'].points)
+
+    def test_unknown_executor(self):
+        self.assertRaises(ValueError, lambda: undertest.DownloadManager(['a'], executor='fibre'))
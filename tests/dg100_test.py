@@ -0,0 +1,179 @@
+import struct
+import tempfile
+import unittest
+from ski.archive import TrackArchive
+import ski.dg100 as undertest
+
+
+def make_payload(record_format, records):
+    # Every record is padded as format C, then cut to the length of its format; the first is always format C
+    records = [struct.pack('>8i', *r, 0, record_format) for r in records]
+    record_length = {0: 8, 1: 20, 2: 32}.get(record_format, 32)
+    return records[0] + b''.join(r[:record_length] for r in records[1:])
+
+
+class MockedSerial():
+
+    def __init__(self, data) -> None:
+        self.data = bytes(data)
+        self.written = bytearray()
+        self.name = 'mock'
+
+    def read_until(self, expected) -> bytes:
+        end = self.data.find(expected)
+        end = len(self.data) if end < 0 else end + len(expected)
+        chunk, self.data = self.data[:end], self.data[end:]
+        return chunk
+
+    def write(self, data) -> None:
+        self.written += data
+
+
+def make_headers_message(indexes):
+    headers = b''.join(struct.pack('>3i', 85701, 180222, i) for i in indexes)
+    return undertest.prepare_message(undertest.TRACK_HEADER_MSG + struct.pack('>2H', len(indexes), 0) + headers + bytes(4))
+
+
+def make_device(tracks, requested=None):
+    # Device responses in the order they are requested: headers, then each requested track as two messages
+    data = make_headers_message(list(range(len(tracks)))) + make_headers_message([])
+    for payload in tracks if requested is None else [tracks[i] for i in requested]:
+        half = len(payload) // 64 * 32
+        data += undertest.prepare_message(undertest.TRACK_RECORDS_MSG + payload[:half])
+        data += undertest.prepare_message(undertest.TRACK_RECORDS_MSG + payload[half:])
+    return MockedSerial(data)
+
+
+RECORDS = [
+    (45556543, 6516060, 85701, 180222, 1500, 12640000),
+    (45556570, 6516034, 85702, 180222, 1670, 12670000),
+    (-39531388, -105457814, 161655, 150218, 180, 27760000)
+]
+
+
+class TestTrackFileColumns(unittest.TestCase):
+
+    def test_format_c(self):
+        columns = undertest.MessageParser().track_file_columns(make_payload(2, RECORDS))
+        self.assertListEqual(['lat', 'lon', 'tm', 'dt', 'spd', 'alt'], list(columns))
+        self.assertListEqual(RECORDS, list(zip(*(c.tolist() for c in columns.values()))))
+
+    def test_format_b(self):
+        columns = undertest.MessageParser().track_file_columns(make_payload(1, RECORDS))
+        self.assertListEqual(['lat', 'lon', 'tm', 'dt', 'spd'], list(columns))
+        self.assertListEqual([r[:5] for r in RECORDS], list(zip(*(c.tolist() for c in columns.values()))))
+
+    def test_format_a(self):
+        columns = undertest.MessageParser().track_file_columns(make_payload(0, RECORDS))
+        self.assertListEqual([r[:2] for r in RECORDS], list(zip(columns['lat'].tolist(), columns['lon'].tolist())))
+
+    def test_matches_track_file_response(self):
+        payload = make_payload(2, RECORDS[:2])
+        records = undertest.MessageParser().track_file_response(payload)['records']
+        columns = undertest.MessageParser().track_file_columns(payload)
+        self.assertListEqual([r['lat'] for r in records], columns['lat'].tolist())
+        self.assertListEqual([int(r['tm']) for r in records], columns['tm'].tolist())
+
+    def test_unknown_format(self):
+        self.assertRaises(ValueError, lambda: undertest.MessageParser().track_file_columns(make_payload(7, RECORDS[:1])))
+
+    def test_partial_record(self):
+        self.assertRaises(ValueError, lambda: undertest.MessageParser().track_file_columns(make_payload(2, RECORDS)[:-4]))
+
+
+class TestFrameDecoder(unittest.TestCase):
+
+    def decode(self, data, chunk_size=7):
+        decoder = undertest.FrameDecoder()
+        frames = []
+        for i in range(0, len(data), chunk_size):
+            decoder.feed(data[i:i + chunk_size])
+            frame = decoder.next_frame()
+            while frame is not None:
+                frames.append(bytes(frame))
+                frame = decoder.next_frame()
+        return frames
+
+    def test_frames(self):
+        messages = [bytes(undertest.prepare_message(b'\xbb' + bytes(i % 256 for i in range(n)))) for n in (1, 20, 300)]
+        self.assertListEqual(messages, self.decode(b''.join(messages)))
+
+    def test_end_sequence_in_payload(self):
+        message = bytes(undertest.prepare_message(b'\xb5\x01' + undertest.END_SEQ + b'\x02'))
+        self.assertListEqual([message], self.decode(message, chunk_size=3))
+
+    def test_resync(self):
+        message = bytes(undertest.prepare_message(b'\xb5\x01\x02'))
+        self.assertListEqual([message, message], self.decode(b'\x00\xa0' + message + b'\xff' + message))
+
+    def test_bad_checksum(self):
+        message = bytes(undertest.prepare_message(b'\xb5\x01\x02'))
+        corrupt = message[:5] + b'\x09' + message[6:]
+        self.assertListEqual([message], self.decode(corrupt + message + bytes(undertest.FRAME_SLACK)))
+
+    def test_length_mismatch(self):
+        # Track file messages from the device carry more bytes than their length field says
+        message = bytearray(undertest.prepare_message(b'\xb5' + bytes(range(40))))
+        message[2:4] = (37).to_bytes(2, 'big')
+        self.assertListEqual([bytes(message)], self.decode(bytes(message)))
+
+    def test_incomplete(self):
+        message = bytes(undertest.prepare_message(b'\xb5\x01\x02'))
+        self.assertListEqual([], self.decode(message[:-1]))
+
+    def test_checksum(self):
+        payload = bytes(range(256)) * 4
+        self.assertEqual((sum(payload) & 0x7FFF).to_bytes(2, 'big'), undertest.calculate_checksum(memoryview(payload)))
+
+
+class TestGetTrackPayload(unittest.TestCase):
+
+    def test_reads_both_messages(self):
+        payloads = [make_payload(2, RECORDS), make_payload(2, RECORDS[:2])]
+        ser = MockedSerial(b''.join(undertest.prepare_message(undertest.TRACK_RECORDS_MSG + p) for p in payloads))
+        self.assertEqual(b''.join(payloads), undertest.get_track_payload(ser, 3))
+        self.assertEqual(bytes(undertest.prepare_message(undertest.MessageBuilder().request_track_file(3))), bytes(ser.written))
+
+    def test_unexpected_message(self):
+        ser = MockedSerial(undertest.prepare_message(undertest.TRACK_HEADER_MSG + bytes(4)))
+        self.assertRaises(ValueError, lambda: undertest.get_track_payload(ser, 0))
+
+    def test_timeout(self):
+        self.assertRaises(ValueError, lambda: undertest.get_track_payload(MockedSerial(b''), 0))
+
+
+class TestStreamRecords(unittest.TestCase):
+
+    def test_stream_records(self):
+        ser = make_device([make_payload(2, RECORDS), make_payload(1, RECORDS[:2])])
+        records = list(undertest.stream_records(ser))
+        self.assertListEqual(RECORDS + [r[:5] + (0,) for r in RECORDS[:2]], [r['point'] for r in records])
+        self.assertListEqual([1, 1, 1, 2, 2], [r['section_count'] for r in records])
+
+    def test_stream_records_not_prefetched(self):
+        ser = make_device([make_payload(2, RECORDS), make_payload(2, RECORDS)])
+        self.assertEqual(6, len(list(undertest.stream_records(ser, prefetch_tracks=0))))
+
+    def test_stream_records_resume(self):
+        ser = make_device([make_payload(2, RECORDS), make_payload(2, RECORDS)])
+        records = list(undertest.stream_records(ser))
+        ser = make_device([make_payload(2, RECORDS), make_payload(2, RECORDS)])
+        self.assertListEqual(records[4:], list(undertest.stream_records(ser, records[3]['position'])))
+
+
+class TestSyncTracks(unittest.TestCase):
+
+    def test_sync_tracks(self):
+        archive = TrackArchive(tempfile.mkdtemp())
+        synced = undertest.sync_tracks(make_device([make_payload(2, RECORDS), make_payload(2, RECORDS[:2])]), archive)
+        self.assertListEqual([0, 1], [h['index'] for h in synced])
+
+    def test_sync_tracks_new_only(self):
+        archive = TrackArchive(tempfile.mkdtemp())
+        undertest.sync_tracks(make_device([make_payload(2, RECORDS)]), archive)
+
+        # Track 0 is held, so only the latest track is requested
+        ser = make_device([make_payload(2, RECORDS), make_payload(2, RECORDS[:2])], requested=[1])
+        synced = undertest.sync_tracks(ser, archive)
+        self.assertListEqual([1], [h['index'] for h in synced])
+        self.assertEqual(2, len(list(archive.stream_records())[3:]))
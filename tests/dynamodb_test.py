@@ -0,0 +1,197 @@
+import datetime
+import time
+import unittest
+from ski.stream import Stream
+import ski.dynamodb as undertest
+from support import make_points
+
+
+def make_table(client):
+    client.create_table(TableName='points', KeySchema=[{ 'AttributeName': 'track', 'KeyType': 'HASH' }, { 'AttributeName': 'ts', 'KeyType': 'RANGE' }])
+    return client
+
+
+class TestItems(unittest.TestCase):
+
+    def test_round_trip(self):
+        values = { 'ts': 1518711415, 'lat': 39.8856, 'name': 'a', 'data': b'\x00\x01', 'tags': ['a', 1], 'nested': { 'ok': True }, 'none': None }
+        self.assertDictEqual(values, undertest.from_item(undertest.to_item(values)))
+
+    def test_datetime(self):
+        self.assertEqual({ 'S': '2018-02-15T16:16:55' }, undertest.to_attribute(datetime.datetime(2018, 2, 15, 16, 16, 55)))
+
+    def test_unsupported(self):
+        self.assertRaises(ValueError, lambda: undertest.to_attribute(object()))
+
+    def test_item_size(self):
+        self.assertEqual(len('name') + len('abc'), undertest.item_size(undertest.to_item({ 'name': 'abc' })))
+
+
+class TestBatchWriter(unittest.TestCase):
+
+    def test_sink(self):
+        client = make_table(undertest.LocalDynamoDB())
+        writer = undertest.BatchWriter(client, 'points', item_f=undertest.point_item('t1'))
+        self.assertEqual(260, Stream.create(make_points(260)).sink(writer.sink()))
+        self.assertEqual(260, len(client.tables['points']['items']))
+        self.assertEqual(11, client.calls)
+        self.assertEqual(260, writer.items_written)
+
+    def test_retries_unprocessed(self):
+        client = make_table(undertest.LocalDynamoDB(unprocessed_rate=0.3, seed=1))
+        with undertest.BatchWriter(client, 'points', item_f=undertest.point_item('t1'), base_delay=0.001) as writer:
+            writer.write(make_points(200))
+        self.assertEqual(200, len(client.tables['points']['items']))
+        self.assertGreater(writer.retries, 0)
+
+    def test_gives_up(self):
+        client = make_table(undertest.LocalDynamoDB(unprocessed_rate=1.0))
+        writer = undertest.BatchWriter(client, 'points', item_f=undertest.point_item('t1'), max_retries=2, base_delay=0.001)
+        writer.write(make_points(10))
+        with self.assertRaises(undertest.WriteError) as cm:
+            writer.close()
+        self.assertEqual(10, len(cm.exception.items))
+
+    def test_item_keys(self):
+        client = make_table(undertest.LocalDynamoDB())
+        with undertest.BatchWriter(client, 'points', item_f=undertest.point_item('t1')) as writer:
+            writer.write(make_points(1))
+        item = client.get_item(TableName='points', Key={ 'track': { 'S': 't1' }, 'ts': { 'N': '1518711415' } })['Item']
+        self.assertEqual(make_points(1)[0], { k: v for k, v in undertest.from_item(item).items() if k != 'track' })
+
+
+class TestThroughputBudget(unittest.TestCase):
+
+    def test_acquire_waits(self):
+        budget = undertest.ThroughputBudget(100)
+        start = time.monotonic()
+        for _ in range(3):
+            budget.acquire(50)
+        self.assertGreater(time.monotonic() - start, 0.4)
+
+    def test_acquire_burst(self):
+        budget = undertest.ThroughputBudget(100)
+        start = time.monotonic()
+        budget.acquire(100)
+        self.assertLess(time.monotonic() - start, 0.1)
+
+
+def make_block_table(client):
+    client.create_table(TableName='blocks', KeySchema=[{ 'AttributeName': 'pk', 'KeyType': 'HASH' }, { 'AttributeName': 'sk', 'KeyType': 'RANGE' }])
+    return client
+
+
+def write_blocks(client, points, track='t1'):
+    with undertest.BatchWriter(client, 'blocks', item_f=lambda item: item) as writer:
+        Stream.create(points).pipe(undertest.block_items(track)).sink(writer.sink())
+
+
+class TestBlocks(unittest.TestCase):
+
+    def test_pack_unpack(self):
+        points = make_points(100)
+        columns = undertest.unpack_block(undertest.pack_block('t1', points))
+        self.assertListEqual(points, undertest.to_points(columns))
+
+    def test_block_key(self):
+        # 2018-02-15 16:16:55 UTC
+        self.assertEqual(('t1/2018-02-15', 1518711300), undertest.block_key('t1', 1518711415))
+
+    def test_block_items(self):
+        items = list(undertest.block_items('t1')(iter(make_points(1000))))
+        self.assertListEqual([185, 300, 300, 215], [int(i['n']['N']) for i in items])
+        self.assertEqual(1518711300, int(items[0]['sk']['N']))
+
+    def test_query_range(self):
+        client = make_block_table(undertest.LocalDynamoDB())
+        write_blocks(client, make_points(2000))
+        columns = undertest.query_range(client, 'blocks', 't1', 1518711500, 1518712999, page_size=2)
+        self.assertListEqual(list(range(1518711500, 1518713000)), columns['ts'].tolist())
+        self.assertListEqual(make_points(2000)[85:1585], undertest.to_points(columns))
+
+    def test_query_range_columns(self):
+        client = make_block_table(undertest.LocalDynamoDB())
+        write_blocks(client, make_points(500))
+        columns = undertest.query_range(client, 'blocks', 't1', 1518711415, 1518711914, columns=['alt'])
+        self.assertListEqual(['ts', 'alt'], sorted(columns, reverse=True))
+        self.assertEqual(500, len(columns['alt']))
+
+    def test_query_range_days(self):
+        # Points either side of midnight are held in two partitions
+        client = make_block_table(undertest.LocalDynamoDB())
+        points = [dict(p, ts=p['ts'] + 27000) for p in make_points(1200)]
+        write_blocks(client, points)
+        self.assertEqual(2, len({ k[0] for k in client.tables['blocks']['items'] }))
+        columns = undertest.query_range(client, 'blocks', 't1', points[0]['ts'], points[-1]['ts'], workers=3)
+        self.assertListEqual([p['ts'] for p in points], columns['ts'].tolist())
+
+    def test_query_range_empty(self):
+        client = make_block_table(undertest.LocalDynamoDB())
+        self.assertDictEqual({}, undertest.query_range(client, 'blocks', 't1', 0, 1000))
+
+
+class TestScanSummary(unittest.TestCase):
+
+    def setUp(self):
+        self.client = make_block_table(undertest.LocalDynamoDB())
+        points = make_points(3000)
+        for i, p in enumerate(points):
+            p['alt'] = 3000 - i
+            p['spd'] = 10.0 + (i % 700) / 100.0
+        write_blocks(self.client, points, 'alice')
+        write_blocks(self.client, [dict(p, ts=p['ts'] + 86400) for p in points[:1000]], 'alice')
+        write_blocks(self.client, points[:600], 'bob')
+
+    def test_scan_summary(self):
+        summary = undertest.scan_summary(self.client, 'blocks', segments=3, executor='thread', page_size=4)
+        alice = summary.tracks['alice']
+        self.assertEqual(4000, alice['points'])
+        self.assertEqual(3000, alice['max_alt'])
+        # Steps between blocks are counted, including the climb back to the start on the second day
+        self.assertEqual(2999 + 999, alice['total_desc'])
+        self.assertEqual(2999, alice['total_asc'])
+        self.assertAlmostEqual(16.99, alice['max_spd'])
+        self.assertEqual(600, summary.tracks['bob']['points'])
+
+    def test_add_block_any_order(self):
+        import numpy as np
+        blocks = [{ 'ts': np.array([i * 10, i * 10 + 5]), 'alt': np.array(alt) } for i, alt in enumerate([[100, 90], [80, 85], [120, 110]])]
+        for order in ([0, 1, 2], [2, 0, 1], [1, 2, 0]):
+            summary = undertest.ScanSummary()
+            for i in order:
+                summary.add_block('t1', blocks[i])
+            self.assertEqual(5 + 35, summary.tracks['t1']['total_asc'], order)
+            self.assertEqual(10 + 10 + 10, summary.tracks['t1']['total_desc'], order)
+
+    def test_scan_summary_bounded(self):
+        # Hold decoding back, so pages are only scanned as far as the bound allows
+        scanned = []
+        scan = self.client.scan
+        self.client.scan = lambda **kwargs: scanned.append(1) or scan(**kwargs)
+        summarise_items = undertest.summarise_items
+        ahead = []
+        def __summarise(items):
+            time.sleep(0.001)
+            ahead.append(len(scanned) - len(ahead))
+            return summarise_items(items)
+        undertest.summarise_items = __summarise
+        try:
+            summary = undertest.scan_summary(self.client, 'blocks', segments=1, workers=1, executor='thread', page_size=1)
+        finally:
+            undertest.summarise_items = summarise_items
+        self.assertEqual(4000, summary.tracks['alice']['points'])
+        self.assertLessEqual(max(ahead), 3)
+
+    def test_scan_summary_process(self):
+        summary = undertest.scan_summary(self.client, 'blocks', segments=2, workers=2)
+        self.assertEqual(4000, summary.tracks['alice']['points'])
+
+    def test_scan_projection(self):
+        pages = list(undertest.scan_pages(self.client, 'blocks', 0, 1, columns=['alt']))
+        self.assertListEqual(['c_alt', 'pk'], sorted(pages[0][0]))
+
+    def test_merge(self):
+        first = undertest.summarise_items(list(undertest.scan_pages(self.client, 'blocks', 0, 1))[0][:3])
+        second = undertest.summarise_items(list(undertest.scan_pages(self.client, 'blocks', 0, 1))[0][3:])
+        merged = first.merge(second)
+        self.assertDictEqual(undertest.summarise_items(list(undertest.scan_pages(self.client, 'blocks', 0, 1))[0]).tracks, merged.tracks)
@@ -0,0 +1,67 @@
+import json
+import os
+import tempfile
+import unittest
+import ski.geojson as undertest
+from ski.stream import Stream
+from support import make_points
+
+
+class TestGeoJSONWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'track.geojson')
+
+    def read(self):
+        with open(self.path) as f:
+            return json.load(f)
+
+    def test_write(self):
+        with undertest.GeoJSONWriter(self.path, name='Run') as writer:
+            points = make_points(3)
+            writer.write_points(points[:2])
+            writer.write_points(points[2:])
+        features = self.read()['features']
+        self.assertEqual(1, len(features))
+        self.assertListEqual([[-105.763, 39.8856, 2776], [-105.763, 39.8857, 2775], [-105.763, 39.8858, 2774]], features[0]['geometry']['coordinates'])
+        self.assertDictEqual({ 'segment': 1, 'start': '2018-02-15T16:16:55Z', 'end': '2018-02-15T16:16:57Z', 'points': 3, 'name': 'Run' }, features[0]['properties'])
+
+    def test_split_gap(self):
+        with undertest.GeoJSONWriter(self.path, split_gap=10) as writer:
+            writer.write_points(make_points(5, gap_at=3))
+        features = self.read()['features']
+        self.assertListEqual([3, 2], [len(f['geometry']['coordinates']) for f in features])
+        self.assertEqual('2018-02-15T16:18:38Z', features[1]['properties']['start'])
+
+    def test_single_point_segments(self):
+        # Lone points either side of a gap are Point features, as a LineString needs two positions
+        with undertest.GeoJSONWriter(self.path, split_gap=10) as writer:
+            points = make_points(4, gap_at=1)
+            writer.write_points(points[:1])
+            writer.write_points(points[1:3])
+            writer.write_points([dict(points[3], ts=points[3]['ts'] + 100)])
+        features = self.read()['features']
+        self.assertListEqual(['Point', 'LineString', 'Point'], [f['geometry']['type'] for f in features])
+        self.assertListEqual([-105.763, 39.8856, 2776], features[0]['geometry']['coordinates'])
+        self.assertListEqual([[-105.763, 39.8857, 2775], [-105.763, 39.8858, 2774]], features[1]['geometry']['coordinates'])
+        self.assertListEqual([1, 2, 1], [f['properties']['points'] for f in features])
+
+    def test_precision(self):
+        with undertest.GeoJSONWriter(self.path, precision=2) as writer:
+            writer.write(make_points(1)[0])
+        self.assertListEqual([-105.76, 39.89, 2776], self.read()['features'][0]['geometry']['coordinates'])
+
+    def test_no_alt(self):
+        with undertest.GeoJSONWriter(self.path) as writer:
+            writer.write({ 'ts': 1518711415, 'lat': 39.8856, 'lon': -105.763 })
+        self.assertListEqual([-105.763, 39.8856], self.read()['features'][0]['geometry']['coordinates'])
+
+    def test_empty(self):
+        with undertest.GeoJSONWriter(self.path):
+            pass
+        self.assertDictEqual({ 'type': 'FeatureCollection', 'features': [] }, self.read())
+
+    def test_sink(self):
+        writer = undertest.GeoJSONWriter(self.path, chunk_size=2)
+        Stream.create(make_points(5)).sink(writer.sink())
+        self.assertEqual(5, self.read()['features'][0]['properties']['points'])
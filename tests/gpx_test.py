@@ -0,0 +1,165 @@
+import io
+import os
+import tempfile
+import tracemalloc
+import unittest
+import ski.gpx as undertest
+from ski.processor import build_point_from_values
+from ski.stream import Stream
+from support import local_timezone, make_points
+
+
+GPX = b'''<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="test" xmlns="http://www.topografix.com/GPX/1/1" xmlns:gpxtpx="http://www.garmin.com/xmlschemas/TrackPointExtension/v2">
+  <metadata><name>Test</name></metadata>
+  <trk>
+    <name>Run</name>
+    <trkseg>
+      <trkpt lat="39.885647" lon="-105.763097"><ele>2776.4</ele><time>2018-02-15T16:16:55Z</time>
+        <extensions><gpxtpx:TrackPointExtension><gpxtpx:speed>0.5</gpxtpx:speed></gpxtpx:TrackPointExtension></extensions>
+      </trkpt>
+      <trkpt lat="39.885700" lon="-105.763200"><ele>2776.0</ele><time>2018-02-15T16:16:56.500Z</time></trkpt>
+    </trkseg>
+    <trkseg>
+      <trkpt lat="39.885800" lon="-105.763300"><time>2018-02-15T16:17:56Z</time></trkpt>
+      <trkpt lat="39.885900" lon="-105.763400"></trkpt>
+      <trkpt lat="39.886000" lon="-105.763500"><time>2018-02-15T17:18:57+01:00</time></trkpt>
+    </trkseg>
+  </trk>
+</gpx>
+'''
+
+
+class TestConvert(unittest.TestCase):
+
+    def test_convert_gpx_coord(self):
+        self.assertEqual(39531388, undertest.convert_gpx_coord('39.885646667'))
+        self.assertEqual(-105457814, undertest.convert_gpx_coord('-105.763023333'))
+        self.assertEqual(40000000, undertest.convert_gpx_coord('39.9999999999'))
+
+    def test_convert_gpx_time(self):
+        self.assertEqual((161655, 150218), undertest.convert_gpx_time('2018-02-15T16:16:55Z'))
+        self.assertEqual((161655, 150218), undertest.convert_gpx_time('2018-02-15T16:16:55.250Z'))
+
+    def test_convert_gpx_time_offset(self):
+        self.assertEqual((231655, 140218), undertest.convert_gpx_time('2018-02-15T01:16:55+02:00'))
+
+    def test_convert_gpx_time_invalid(self):
+        with self.assertRaises(ValueError):
+            undertest.convert_gpx_time('yesterday')
+
+    def test_convert_gpx_time_short(self):
+        # Too short to read by position; parsed instead
+        self.assertEqual((161600, 150218), undertest.convert_gpx_time('2018-02-15T16:16Z'))
+        for value in ('Z', '2018Z', '2018-02-15TZ'):
+            with self.assertRaises(ValueError):
+                undertest.convert_gpx_time(value)
+
+
+class TestStreamRecords(unittest.TestCase):
+
+    def test_stream_records(self):
+        records = list(undertest.stream_records(io.BytesIO(GPX)))
+        # The point without a time is skipped
+        self.assertListEqual([1, 2, 3, 5], [r['point_count'] for r in records])
+        self.assertListEqual([1, 1, 2, 2], [r['section_count'] for r in records])
+        self.assertIsNone(records[0]['total_sections'])
+        self.assertEqual((39531388, -105457858, 161655, 150218, 180, 27764000), records[0]['point'])
+        self.assertEqual((161857, 150218), records[3]['point'][2:4])
+
+    def test_defaults(self):
+        records = list(undertest.stream_records(io.BytesIO(GPX)))
+        self.assertEqual(0, records[1]['point'][4])
+        self.assertEqual(0, records[2]['point'][5])
+
+    def test_builds_points(self):
+        point = build_point_from_values(next(undertest.stream_records(io.BytesIO(GPX)))['point'])
+        self.assertEqual(39.8856, point['lat'])
+        self.assertEqual(-105.7631, point['lon'])
+        self.assertEqual(1.8, point['spd'])
+        self.assertEqual(2776, point['alt'])
+
+    def test_builds_points_under_one_degree(self):
+        data = b'<gpx><trk><trkseg><trkpt lat="-0.5" lon="-0.1246"><time>2018-02-15T16:16:55Z</time></trkpt><trkpt lat="51.5007" lon="-0.1246"><time>2018-02-15T16:16:56Z</time></trkpt></trkseg></trk></gpx>'
+        points = [build_point_from_values(r['point']) for r in undertest.stream_records(io.BytesIO(data))]
+        self.assertListEqual([(-0.5, -0.1246), (51.5007, -0.1246)], [(p['lat'], p['lon']) for p in points])
+        # West of the zone 30/31 boundary at 0 degrees
+        self.assertListEqual([820083, 699568], [p['x'] for p in points])
+
+    def test_resume(self):
+        position = list(undertest.stream_records(io.BytesIO(GPX)))[1]['position']
+        records = list(undertest.stream_records(io.BytesIO(GPX), position))
+        self.assertListEqual([3, 5], [r['point_count'] for r in records])
+
+    def test_memory_flat(self):
+        points = b''.join(b'<trkpt lat="39.8856" lon="-105.7630"><ele>2776</ele><time>2018-02-15T16:16:55Z</time></trkpt>' for _ in range(5000))
+        data = b'<gpx><trk><trkseg>' + points + b'</trkseg></trk></gpx>'
+        tracemalloc.start()
+        count = sum(1 for _ in undertest.stream_records(io.BytesIO(data)))
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        self.assertEqual(5000, count)
+        # Building the whole tree would take several MB
+        self.assertLess(peak, 1000000)
+
+
+class TestGPXWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'track.gpx')
+
+    def read(self):
+        with open(self.path, 'rb') as f:
+            return list(undertest.stream_records(f))
+
+    def test_round_trip(self):
+        points = make_points(5)
+        with undertest.GPXWriter(self.path) as writer:
+            writer.write_points(points)
+        built = [build_point_from_values(r['point']) for r in self.read()]
+        self.assertListEqual([{ k: p[k] for k in ('ts', 'lat', 'lon', 'spd', 'alt') } for p in points], [{ k: p[k] for k in ('ts', 'lat', 'lon', 'spd', 'alt') } for p in built])
+
+    def test_speed_extension_namespace(self):
+        # GPX 1.1 extensions only hold elements from other namespaces
+        import xml.etree.ElementTree as ET
+        with undertest.GPXWriter(self.path) as writer:
+            writer.write_points(make_points(1))
+        extensions = ET.parse(self.path).getroot().find('.//{http://www.topografix.com/GPX/1/1}extensions')
+        self.assertListEqual([f'{{{undertest.TPX_NS}}}TrackPointExtension', f'{{{undertest.TPX_NS}}}speed'], [e.tag for e in extensions.iter()][1:])
+        self.assertEqual(180, self.read()[0]['point'][4])
+
+    def test_round_trip_local_timezone(self):
+        points = make_points(2)
+        with undertest.GPXWriter(self.path) as writer:
+            writer.write_points(points)
+        with local_timezone('America/Denver'):
+            built = [build_point_from_values(r['point']) for r in self.read()]
+        self.assertListEqual([p['ts'] for p in points], [p['ts'] for p in built])
+
+    def test_split_gap(self):
+        with undertest.GPXWriter(self.path, split_gap=10) as writer:
+            writer.write_points(make_points(5, gap_at=3))
+        self.assertListEqual([1, 1, 1, 2, 2], [r['section_count'] for r in self.read()])
+
+    def test_no_split(self):
+        with undertest.GPXWriter(self.path) as writer:
+            writer.write_points(make_points(5, gap_at=3))
+        self.assertListEqual([1] * 5, [r['section_count'] for r in self.read()])
+
+    def test_precision(self):
+        with undertest.GPXWriter(self.path, precision=2) as writer:
+            writer.write(make_points(1)[0])
+        with open(self.path) as f:
+            self.assertIn('<trkpt lat="39.89" lon="-105.76">', f.read())
+
+    def test_name(self):
+        with undertest.GPXWriter(self.path, name='Run <1>') as writer:
+            pass
+        with open(self.path) as f:
+            self.assertIn('<name>Run &lt;1&gt;</name>', f.read())
+        self.assertListEqual([], self.read())
+
+    def test_sink(self):
+        writer = undertest.GPXWriter(self.path, chunk_size=2)
+        Stream.create(make_points(5)).sink(writer.sink())
+        self.assertEqual(5, len(self.read()))
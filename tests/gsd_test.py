@@ -1,4 +1,5 @@
 import logging
+import tempfile
 import unittest
 from ski.coordinate import DMSCoordinate
 import ski.gsd as undertest
@@ -231,6 +232,10 @@ class TestConvertGsdCoord(unittest.TestCase):
     def test_convert_coord_not_number(self):
         self.assertIsNone(undertest.convert_gsd_coord('123456ab'))
 
+    def test_convert_coord_value_matches_str(self):
+        for value in (9531388, -9531388, 39531388, -105457814):
+            self.assertEqual(undertest.convert_gsd_coord(str(value)), undertest.convert_gsd_coord_value(value), value)
+
 
 class TestConvertGsdDate(unittest.TestCase):
 
@@ -255,6 +260,12 @@ class TestConvertGsdDate(unittest.TestCase):
     def test_convert_date_time_invalid(self):
         self.assertIsNone(undertest.convert_gsd_date('011020', '234567'))
 
+    def test_convert_date_values(self):
+        self.assertEqual(undertest.convert_gsd_date('011020', '091011'), undertest.convert_gsd_date_values(11020, 91011))
+
+    def test_convert_date_values_invalid(self):
+        self.assertRaises(ValueError, lambda: undertest.convert_gsd_date_values(987654, 91011))
+
 
 class TestConvertGsdSpeed(unittest.TestCase):
 
@@ -263,3 +274,43 @@ class TestConvertGsdSpeed(unittest.TestCase):
 
     def test_convert_speed_not_number(self):
         self.assertEqual(0, undertest.convert_gsd_speed('1234ab'))
+
+
+class TestStreamRecords(unittest.TestCase):
+
+    def setUp(self):
+        self.file = tempfile.NamedTemporaryFile('w+', suffix='.gsd')
+        self.file.write('\n'.join([
+            '[TP]',
+            '1=001,2018-02-15:16:16:55',
+            '2=002,2018-02-15:17:16:55',
+            '[001,2018-02-15:16:16:55]',
+            '1=39531388,-105457814,161655,150218,180,27760000',
+            '2=39531389,-105457815,161656,150218,180,27760000',
+            '3=39531390,-105457816,161657,150218,180,27760000',
+            '[002,2018-02-15:17:16:55]',
+            '1=39531391,-105457817,171655,150218,180,27760000',
+            '2=39531392,-105457818,171656,150218,180,27760000',
+            ''
+        ]))
+        self.file.flush()
+        self.file.seek(0)
+
+    def tearDown(self):
+        self.file.close()
+
+    def test_stream_records(self):
+        records = list(undertest.stream_records(self.file))
+        self.assertListEqual(['161655', '161656', '161657', '171655', '171656'], [r['point'][2] for r in records])
+        self.assertListEqual([1, 1, 1, 2, 2], [r['section_count'] for r in records])
+        self.assertListEqual([1, 2, 3, 4, 5], [r['point_count'] for r in records])
+
+    def test_stream_records_resume(self):
+        records = list(undertest.stream_records(self.file))
+        resumed = list(undertest.stream_records(self.file, records[1]['position']))
+        self.assertListEqual(records[2:], resumed)
+
+    def test_stream_records_resume_end_of_section(self):
+        records = list(undertest.stream_records(self.file))
+        resumed = list(undertest.stream_records(self.file, records[2]['position']))
+        self.assertListEqual(records[3:], resumed)
@@ -0,0 +1,111 @@
+import contextlib
+import datetime
+import io
+import os
+import tempfile
+import unittest
+import ski.asyncstream
+import ski.loader as undertest
+from ski.capture import CaptureSerial
+from ski.checkpoint import Checkpoint
+from ski.dg100 import get_track_headers, track_key
+from ski.logging import point_trace
+from ski.simulator import SimulatedDevice, synthetic_track
+from ski.store import PointStore
+
+
+class TestCheckOptions(unittest.TestCase):
+
+    def test_check_options(self):
+        self.assertTrue(undertest.check_options('-f', { 'workers': 2, 'resume': True }, undertest.FILE_OPTIONS))
+
+    def test_check_options_unsupported(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertFalse(undertest.check_options('-f', { 'workers': 2, 'archive': None, 'capture': 'c' }, undertest.FILE_OPTIONS))
+        self.assertEqual('-f does not support -a/--archive, --capture\n', out.getvalue())
+
+    def test_check_options_output_resume(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            self.assertFalse(undertest.check_options('-f', { 'checkpoint': None, 'resume': True, 'output': 'track.gpx' }, undertest.FILE_OPTIONS))
+        self.assertIn('cannot be used with --resume', out.getvalue())
+
+    def test_cmdline_unsupported(self):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            undertest.cmdline(['--resume', '--devices', 'COM1,COM2'])
+        self.assertEqual('--devices does not support --resume\n', out.getvalue())
+
+    def test_cmdline_output_not_opened(self):
+        path = os.path.join(tempfile.mkdtemp(), 'track.gpx')
+        with contextlib.redirect_stdout(io.StringIO()):
+            undertest.cmdline(['-o', path, '--devices', 'COM1'])
+        self.assertFalse(os.path.exists(path))
+
+
+class TestCmdlineTrace(unittest.TestCase):
+
+    def tearDown(self):
+        point_trace.close()
+        point_trace.every, point_trace.ts_from, point_trace.ts_to = 1, None, None
+
+    def test_trace_options_any_order(self):
+        path = os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+        with contextlib.redirect_stdout(io.StringIO()):
+            undertest.cmdline(['--trace-every', '10', '-t', path, '--trace-window', '100:', '-f', os.path.join(tempfile.mkdtemp(), 'missing.gsd')])
+        self.assertEqual((10, 100, None), (point_trace.every, point_trace.ts_from, point_trace.ts_to))
+
+
+class TestLoadFromSerial(unittest.TestCase):
+
+    def test_store_by_track(self):
+        # Tracks a few minutes apart, so little is interpolated between them
+        starts = [datetime.datetime(2018, 2, 15, 9, 0, 0) + datetime.timedelta(minutes=i * 2) for i in range(2)]
+        device = lambda: SimulatedDevice([(start, synthetic_track(64, 2, start)) for start in starts])
+        store = PointStore(os.path.join(tempfile.mkdtemp(), 'points.db'))
+        with contextlib.redirect_stdout(io.StringIO()):
+            undertest.load_from_serial(device(), store=store)
+        keys = [track_key(h) for h in get_track_headers(device())]
+        self.assertListEqual(keys, [t[0] for t in store.tracks()])
+        self.assertEqual(64, store.tracks()[1][1])
+        store.close()
+
+
+class TestLoadFromReplay(unittest.TestCase):
+
+    def test_replay_sync(self):
+        # A replay has no device to wait on, so does not read in a worker thread
+        path = os.path.join(tempfile.mkdtemp(), 'session.cap')
+        with CaptureSerial(SimulatedDevice.create(1, 64), path) as ser, contextlib.redirect_stdout(io.StringIO()):
+            undertest.load_from_serial(ser)
+
+        from_blocking = ski.asyncstream.AsyncStream.from_blocking
+        ski.asyncstream.AsyncStream.from_blocking = None
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                undertest.load_from_replay(path)
+        finally:
+            ski.asyncstream.AsyncStream.from_blocking = from_blocking
+        self.assertIn('64 point(s) loaded', out.getvalue())
+
+
+class TestLoadFromDevice(unittest.TestCase):
+
+    def test_resume_track_gone(self):
+        # The checkpoint's track has since been cleared from the logger
+        import serial
+        checkpoint = Checkpoint(os.path.join(tempfile.mkdtemp(), 'checkpoint.json'))
+        position = { 'track_key': '0@2017-01-01T09:00:00', 'index': 5, 'section_count': 1, 'point_count': 6 }
+        checkpoint.save({ 'position': position, 'count': 6, 'prev_point': None, 'window': [], 'summary': {}, 'source': { 'path': 'simulator' } })
+
+        serial_class = serial.Serial
+        serial.Serial = lambda *args, **kwargs: SimulatedDevice.create(1, 64)
+        out = io.StringIO()
+        try:
+            with contextlib.redirect_stdout(out):
+                undertest.load_from_device('COM1', checkpoint=checkpoint, resume=True)
+        finally:
+            serial.Serial = serial_class
+        self.assertIn('Checkpoint no longer matches the device; run without --resume', out.getvalue())
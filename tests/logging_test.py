@@ -0,0 +1,64 @@
+import json
+import os
+import tempfile
+import unittest
+import ski.logging as undertest
+from ski.stream import Stream, stateful
+
+
+class TestPointTrace(unittest.TestCase):
+
+    def setUp(self):
+        self.trace = undertest.PointTrace()
+        self.path = os.path.join(tempfile.mkdtemp(), 'trace.jsonl')
+
+    def tearDown(self):
+        self.trace.close()
+
+    def read_trace(self):
+        self.trace.close()
+        with open(self.path, 'r') as f:
+            return [json.loads(l) for l in f]
+
+    def test_wrap_disabled(self):
+        func = lambda p: p
+        self.assertIs(func, self.trace.wrap('GSD', func))
+        self.assertIs(func, self.trace.wrap_pipe('INT', func))
+
+    def test_wrap_enabled(self):
+        self.trace.open(self.path)
+        func = self.trace.wrap('GSD', lambda l: { 'ts': int(l[0]) })
+        self.assertEqual({ 'ts': 1518711415 }, func(['1518711415']))
+        self.assertListEqual([{ 'stage': 'GSD', 'ts': 1518711415, 'src': ['1518711415'] }], self.read_trace())
+
+    def test_wrap_keeps_stateful(self):
+        self.trace.open(self.path)
+        func = self.trace.wrap('ENR', stateful(lambda p: p))
+        with self.assertRaises(ValueError):
+            Stream.create([{ 'ts': 1 }]).parallel_map(func, workers=2, executor='thread')
+
+    def test_write_threads(self):
+        # Traced stages run in a thread pool with -j; lines must not interleave
+        self.trace.open(self.path)
+        func = self.trace.wrap('GSD', lambda ts: { 'ts': ts, 'name': 'x' * 1000 })
+        list(Stream.create(range(2000)).parallel_map(func, workers=8, executor='thread', chunksize=10))
+        records = self.read_trace()
+        self.assertListEqual(list(range(2000)), sorted(r['ts'] for r in records))
+
+    def test_wrap_pipe_enabled(self):
+        self.trace.open(self.path)
+        func = self.trace.wrap_pipe('INT', lambda it: (p for p in it))
+        self.assertEqual(2, len(list(func(iter([{ 'ts': 1 }, { 'ts': 2 }])))))
+        self.assertListEqual(['INT', 'INT'], [r['stage'] for r in self.read_trace()])
+
+    def test_sample_every(self):
+        self.trace.open(self.path, every=10)
+        for ts in range(100, 130):
+            self.trace.write('ENR', { 'ts': ts })
+        self.assertListEqual([100, 110, 120], [r['ts'] for r in self.read_trace()])
+
+    def test_sample_window(self):
+        self.trace.open(self.path, ts_from=105, ts_to=107)
+        for ts in range(100, 130):
+            self.trace.write('ENR', { 'ts': ts })
+        self.assertListEqual([105, 106, 107], [r['ts'] for r in self.read_trace()])
@@ -0,0 +1,111 @@
+import io
+import unittest
+import ski.nmea as undertest
+from ski.processor import build_point_from_values
+from support import local_timezone
+
+
+NMEA = b'''$GPRMC,161655.00,A,3953.1388,N,10545.7814,W,0.97,45.0,150218,,,A*4D
+$GPGGA,161655.00,3953.1388,N,10545.7814,W,1,08,0.9,2776.4,M,-21.0,M,,*60
+$GPGSA,A,3,04,05,,09,12,,,24,,,,,2.5,1.3,2.1*39
+$GPRMC,161656.00,A,3953.1390,N,10545.7820,W,1.00,45.0,150218,,,A*4E
+$GPGGA,161656.00,3953.1390,N,10545.7820,W,1,08,0.9,2776.0,M,-21.0,M,,*69
+$GPRMC,161657.00,V,,,,,,,150218,,,N*70
+$GNRMC,161658.00,A,3953.1400,N,10545.7830,W,1.50,45.0,150218,,,A*55
+$GPGGA,161659.00,3353.5000,S,01825.2500,E,0,00,,,M,,M,,*68
+$GPRMC,161659.00,A,3353.5000,S,01825.2500,E,,,150218,,,A*4A
+'''
+
+FIXES = [
+    (39531388, -105457814, 161655, 150218, 180, 27764000),
+    (39531400, -105457830, 161658, 150218, 278, 0),
+    (-33535000, 18252500, 161659, 150218, 0, 0)
+]
+
+
+class TestSentences(unittest.TestCase):
+
+    def test_nmea_checksum(self):
+        self.assertEqual(0x4D, undertest.nmea_checksum(b'GPRMC,161655.00,A,3953.1388,N,10545.7814,W,0.97,45.0,150218,,,A'))
+        self.assertEqual(ord('A'), undertest.nmea_checksum(b'A'))
+        self.assertEqual(0, undertest.nmea_checksum(b''))
+
+    def test_read_sentence(self):
+        self.assertListEqual([b'GPGSA', b'A', b'3'], undertest.read_sentence(b'$GPGSA,A,3*30\r\n'))
+
+    def test_read_sentence_invalid(self):
+        self.assertIsNone(undertest.read_sentence(b'$GPGSA,A,3*31\r\n'))
+        self.assertIsNone(undertest.read_sentence(b'$GPGSA,A,3\r\n'))
+        self.assertIsNone(undertest.read_sentence(b'GPGSA,A,3*30\r\n'))
+        self.assertIsNone(undertest.read_sentence(b'$GPGSA,A,3*ZZ\r\n'))
+        self.assertIsNone(undertest.read_sentence(b''))
+
+    def test_convert_nmea_coord(self):
+        self.assertEqual(39531388, undertest.convert_nmea_coord(b'3953.1388', b'N'))
+        self.assertEqual(-105457814, undertest.convert_nmea_coord(b'10545.7814', b'W'))
+        self.assertEqual(-33535000, undertest.convert_nmea_coord(b'3353.5', b'S'))
+        self.assertEqual(40000000, undertest.convert_nmea_coord(b'3959.999996', b'N'))
+
+
+class TestStreamFixes(unittest.TestCase):
+
+    def test_stream_fixes(self):
+        counts = {}
+        self.assertListEqual(FIXES, list(undertest.stream_fixes(io.BytesIO(NMEA), counts)))
+        self.assertDictEqual({ 'sentences': 9, 'invalid': 1 }, counts)
+
+    def test_stream_fixes_without_gga(self):
+        self.assertListEqual([FIXES[0][:5] + (0,)], list(undertest.stream_fixes(NMEA.splitlines()[:1])))
+
+    def test_stream_fixes_bad_field(self):
+        lines = [b'$GPRMC,161655.00,A,3953.1388,N,10545.7814,W,fast,45.0,150218,,,A*5D'] + NMEA.splitlines()[6:7]
+        self.assertListEqual([FIXES[1]], list(undertest.stream_fixes(lines)))
+
+
+class TestStreamRecords(unittest.TestCase):
+
+    def test_stream_records(self):
+        records = list(undertest.stream_records(io.BytesIO(NMEA)))
+        self.assertListEqual(FIXES, [r['point'] for r in records])
+        self.assertDictEqual({ 'point': FIXES[2], 'point_count': 3, 'section_count': 1, 'total_sections': None, 'position': { 'point_count': 3, 'section_count': 1 } }, records[2])
+
+    def test_stream_records_resume(self):
+        records = list(undertest.stream_records(io.BytesIO(NMEA), { 'point_count': 2, 'section_count': 1 }))
+        self.assertListEqual([FIXES[2]], [r['point'] for r in records])
+
+    def test_build_points(self):
+        point = build_point_from_values(next(undertest.stream_records(io.BytesIO(NMEA)))['point'])
+        self.assertEqual(1518711415, point['ts'])
+        self.assertAlmostEqual(39.8856, point['lat'])
+        self.assertAlmostEqual(-105.763, point['lon'])
+        self.assertAlmostEqual(1.8, point['spd'])
+        self.assertEqual(2776, point['alt'])
+
+
+class TestReadColumns(unittest.TestCase):
+
+    def test_read_columns(self):
+        columns = undertest.read_columns(io.BytesIO(NMEA))
+        points = [build_point_from_values(v) for v in FIXES]
+        self.assertListEqual(list(undertest.COLUMNS), list(columns))
+        for c in undertest.COLUMNS:
+            self.assertListEqual([p[c] for p in points], columns[c].tolist(), c)
+
+    def test_read_columns_local_timezone(self):
+        # Both paths give UTC timestamps, whatever the local time zone
+        with local_timezone('America/Denver'):
+            columns = undertest.read_columns(io.BytesIO(NMEA))
+            points = [build_point_from_values(r['point']) for r in undertest.stream_records(io.BytesIO(NMEA))]
+        self.assertEqual(1518711415, columns['ts'][0])
+        self.assertListEqual([p['ts'] for p in points], columns['ts'].tolist())
+
+    def test_read_columns_under_one_degree(self):
+        data = b'$GPRMC,120000.00,A,0030.0000,S,00007.4760,W,0.00,0.0,150218,,,A*6C\n'
+        point = build_point_from_values(next(undertest.stream_records(io.BytesIO(data)))['point'])
+        columns = undertest.read_columns(io.BytesIO(data))
+        self.assertEqual((-0.5, -0.1246), (point['lat'], point['lon']))
+        self.assertEqual((point['lat'], point['lon']), (columns['lat'][0], columns['lon'][0]))
+
+    def test_read_columns_empty(self):
+        columns = undertest.read_columns(io.BytesIO(b''))
+        self.assertListEqual([0] * 5, [len(v) for v in columns.values()])
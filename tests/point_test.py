@@ -0,0 +1,78 @@
+import pickle
+import unittest
+import ski.point as undertest
+
+
+POINT = { 'ts': 1518711415, 'lat': 39.8856, 'lon': -105.763, 'x': 434760, 'y': 4415344, 'spd': 1.8, 'alt': 2776 }
+
+
+class TestPoint(unittest.TestCase):
+
+    def test_fixed_point(self):
+        point = undertest.Point(POINT)
+        self.assertEqual(398856, point.lat)
+        self.assertEqual(-1057630, point.lon)
+        self.assertEqual(1800, point.spd)
+        self.assertEqual(39.8856, point['lat'])
+        self.assertEqual(1.8, point['spd'])
+
+    def test_fixed(self):
+        point = undertest.Point.fixed(ts=1518711415, lat=398856)
+        self.assertEqual({ 'ts': 1518711415, 'lat': 39.8856 }, point)
+
+    def test_rounds(self):
+        self.assertEqual(39.8856, undertest.Point(lat=39.88561234)['lat'])
+
+    def test_equals_dict(self):
+        self.assertEqual(POINT, undertest.Point(POINT))
+        self.assertEqual(undertest.Point(POINT), POINT)
+        self.assertNotEqual(dict(POINT, alt=0), undertest.Point(POINT))
+
+    def test_dict_access(self):
+        point = undertest.Point(POINT)
+        self.assertIn('x', point)
+        self.assertNotIn('d', point)
+        self.assertIsNone(point.get('d'))
+        self.assertListEqual(list(POINT), list(point))
+        self.assertEqual(7, len(point))
+        with self.assertRaises(KeyError):
+            point['d']
+        del point['x']
+        self.assertNotIn('x', point)
+
+    def test_extra_keys(self):
+        point = undertest.Point(POINT)
+        point['_pos'] = { 'index': 1 }
+        self.assertEqual({ 'index': 1 }, point.pop('_pos'))
+        self.assertEqual(POINT, point)
+
+    def test_derived(self):
+        point = undertest.Point(POINT)
+        point['d'] = 1.25
+        point['alt_d'] = -2
+        self.assertEqual(1.25, point['d'])
+        self.assertEqual(-2, point['alt_d'])
+
+    def test_empty(self):
+        self.assertFalse(undertest.Point())
+        self.assertTrue(undertest.Point(POINT))
+
+    def test_copy(self):
+        point = undertest.Point(POINT, _pos=1)
+        copy = point.copy()
+        copy['alt'] = 0
+        self.assertEqual(2776, point['alt'])
+        self.assertEqual(1, copy['_pos'])
+
+    def test_pickle(self):
+        point = undertest.Point(POINT, _pos=1)
+        self.assertEqual(point, pickle.loads(pickle.dumps(point)))
+
+    def test_as_point(self):
+        point = undertest.Point(POINT)
+        self.assertIs(point, undertest.as_point(point))
+        self.assertIsInstance(undertest.as_point(POINT), undertest.Point)
+
+    def test_fixed_value(self):
+        self.assertEqual(398856, undertest.fixed_value(POINT, 'lat'))
+        self.assertEqual(398856, undertest.fixed_value(undertest.Point(POINT), 'lat'))
@@ -1,6 +1,8 @@
 import datetime
 import unittest
 import ski.processor as undertest
+from ski.point import Point
+from support import local_timezone
 
 
 class TestAddTimezone(unittest.TestCase):
@@ -61,6 +63,36 @@ class TestBuildPointFromGSD(unittest.TestCase):
         self.assertFalse('y' in point, 'y')
 
 
+class TestBuildPointFromValues(unittest.TestCase):
+
+    def test_build_point_from_values_matches_gsd(self):
+        values = (39531388, -105457814, 161655, 150218, 180, 27760000)
+        self.assertDictEqual(dict(undertest.build_point_from_gsd([str(v) for v in values])), dict(undertest.build_point_from_values(values)))
+
+    def test_build_point_from_values_fixed(self):
+        point = undertest.build_point_from_values((39531388, -105457814, 161655, 150218, 180, 27760000))
+        self.assertEqual(398856, point.lat)
+        self.assertEqual(1800, point.spd)
+
+    def test_build_point_from_values_under_one_degree(self):
+        point = undertest.build_point_from_values((-30000000 - 30000, -74760, 161655, 150218, 180, 27760000))
+        self.assertEqual(-30.05, point['lat'])
+        self.assertEqual(-0.1246, point['lon'])
+        point = undertest.build_point_from_values((-300000, 74760, 161655, 150218, 180, 27760000))
+        self.assertEqual(-0.5, point['lat'])
+        self.assertEqual(0.1246, point['lon'])
+
+    def test_build_point_local_timezone(self):
+        # GSD times are UTC, whatever the local time zone
+        values = (39531388, -105457814, 161655, 150218, 180, 27760000)
+        with local_timezone('America/Denver'):
+            self.assertEqual(1518711415, undertest.build_point_from_values(values)['ts'])
+            self.assertEqual(1518711415, undertest.build_point_from_gsd([str(v) for v in values])['ts'])
+
+    def test_build_point_from_values_invalid_date(self):
+        self.assertIsNone(undertest.build_point_from_values((39531388, -105457814, 161655, 990218, 180, 27760000)))
+
+
 class TestEnrichPoint(unittest.TestCase):
 
     def test_enrich_point_1point(self):
@@ -169,6 +201,28 @@ class TestLinearInterpolate(unittest.TestCase):
 
         self.assertListEqual(exp_points, list(undertest.linear_interpolate((x for x in points))))
         
+    def test_linear_interpolate_points(self):
+        points = [
+            Point(ts=1518711415, lat=39.8856, lon=-105.7630, spd=1.80, alt=2776, _pos={ 'index': 1 }),
+            Point(ts=1518711418, lat=39.8859, lon=-105.7636, spd=1.83, alt=2773)
+        ]
+        result = list(undertest.linear_interpolate((x for x in points)))
+        self.assertEqual(4, len(result))
+        self.assertIsInstance(result[1], Point)
+        self.assertEqual({ 'ts': 1518711416, 'lat': 39.8857, 'lon': -105.7632, 'spd': 1.81, 'alt': 2775 }, result[1])
+
+    def test_linear_interpolate_resume(self):
+        points = [
+            { 'ts': 1518711415, 'lat': 39.8856, 'lon': -105.7630, 'x': 434760, 'y': 4415344, 'spd': 1.80, 'alt': 2776 },
+            { 'ts': 1518711417, 'lat': 39.8858, 'lon': -105.7634, 'x': 434762, 'y': 4415348, 'spd': 1.81, 'alt': 2776 }
+        ]
+        exp_points = [
+            { 'ts': 1518711416, 'lat': 39.8857, 'lon': -105.7632, 'x': 434761, 'y': 4415346, 'spd': 1.805, 'alt': 2776 },
+            points[1]
+        ]
+
+        self.assertListEqual(exp_points, list(undertest.linear_interpolate((x for x in points[1:]), prev_point=points[0])))
+
 
 class TestSummary(unittest.TestCase):
 
@@ -0,0 +1,49 @@
+import time
+import unittest
+from ski.dg100 import get_track_headers, stream_records
+from ski.processor import build_point_from_values
+import ski.simulator as undertest
+
+
+class TestSyntheticTrack(unittest.TestCase):
+
+    def test_format_c(self):
+        self.assertEqual(32 * 10, len(undertest.synthetic_track(10)))
+
+    def test_format_b(self):
+        self.assertEqual(32 + 20 * 9, len(undertest.synthetic_track(10, 1)))
+
+    def test_points_build(self):
+        device = undertest.SimulatedDevice.create(1, 1100)
+        points = [build_point_from_values(r['point']) for r in stream_records(device)]
+        self.assertEqual(1100, len(points))
+        self.assertListEqual(list(range(points[0]['ts'], points[0]['ts'] + 1100)), [p['ts'] for p in points])
+
+
+class TestSimulatedDevice(unittest.TestCase):
+
+    def test_headers(self):
+        headers = get_track_headers(undertest.SimulatedDevice.create(undertest.HEADERS_PER_MESSAGE + 5, 1))
+        self.assertListEqual(list(range(undertest.HEADERS_PER_MESSAGE + 5)), [h['index'] for h in headers])
+
+    def test_stream_records(self):
+        for record_format in (1, 2):
+            records = list(stream_records(undertest.SimulatedDevice.create(3, 65, record_format)))
+            self.assertEqual(3 * 65, len(records))
+
+    def test_noise(self):
+        device = undertest.SimulatedDevice.create(5, 64, noise_rate=1.0, seed=1)
+        self.assertEqual(5 * 64, len(list(stream_records(device))))
+
+    def test_corrupt(self):
+        # Tracks with a corrupt message are skipped, without stopping the download
+        device = undertest.SimulatedDevice.create(10, 64, corrupt_rate=0.2, seed=1)
+        count = len(list(stream_records(device)))
+        self.assertLess(count, 10 * 64)
+        self.assertGreater(count, 0)
+
+    def test_baudrate(self):
+        device = undertest.SimulatedDevice.create(1, 64, baudrate=115200)
+        start = time.perf_counter()
+        list(stream_records(device))
+        self.assertGreater(time.perf_counter() - start, device.bytes_sent * undertest.BITS_PER_BYTE / 115200)
@@ -0,0 +1,146 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+import ski.store as undertest
+from ski.stream import Stream
+from support import make_points
+
+
+class TestTileKey(unittest.TestCase):
+
+    def test_tile_key(self):
+        self.assertEqual((434, 4415), undertest.tile_key(434760.0, 4415344.0))
+        self.assertEqual((-1, 0), undertest.tile_key(-0.5, 999.9))
+
+    def test_tile_key_no_coords(self):
+        self.assertEqual((None, None), undertest.tile_key(None, None))
+
+
+class TestPointStore(unittest.TestCase):
+
+    def setUp(self):
+        self.store = undertest.PointStore(os.path.join(tempfile.mkdtemp(), 'points.db'))
+        self.store.add('t1', make_points(500, x=lambda i: 434760 + i * 10, y=lambda i: 4415344 + i * 10))
+        self.store.add('t2', make_points(100, ts=1518800000, x=lambda i: 500000 + i * 10, y=lambda i: 4415344 + i * 10))
+
+    def tearDown(self):
+        self.store.close()
+
+    def test_tracks(self):
+        self.assertListEqual([('t1', 500, 1518711415, 1518711914), ('t2', 100, 1518800000, 1518800099)], self.store.tracks())
+
+    def test_query_range(self):
+        columns = self.store.query_range('t1', 1518711515, 1518711524)
+        self.assertListEqual(list(range(1518711515, 1518711525)), columns['ts'].tolist())
+        self.assertListEqual(list(undertest.COLUMNS), list(columns))
+        self.assertEqual(2676, columns['alt'][0])
+
+    def test_query_range_columns(self):
+        columns = self.store.query_range('t2', 0, 2000000000, columns=['ts', 'x'])
+        self.assertListEqual(['ts', 'x'], list(columns))
+        self.assertEqual(100, len(columns['x']))
+
+    def test_query_range_empty(self):
+        columns = self.store.query_range('t3', 0, 2000000000)
+        self.assertEqual(0, len(columns['ts']))
+
+    def test_query_unknown_column(self):
+        with self.assertRaises(ValueError):
+            self.store.query_range('t1', 0, 1, columns=['ts; DROP TABLE points'])
+
+    def test_query_bbox(self):
+        # Spans a tile boundary at x=435000
+        columns = self.store.query_bbox('13N', 434900.0, 4415000.0, 435100.0, 4416000.0)
+        self.assertListEqual([434900.0 + i * 10 for i in range(21)], columns['x'].tolist())
+
+    def test_query_bbox_track(self):
+        self.assertEqual(0, len(self.store.query_bbox('13N', 434000.0, 4415000.0, 436000.0, 4416000.0, track='t2')['ts']))
+        self.assertEqual(100, len(self.store.query_bbox('13N', 500000.0, 4415000.0, 502000.0, 4417000.0, track='t2')['ts']))
+
+    def test_query_bbox_zone(self):
+        # The same x and y in the next zone east are another place
+        self.store.add('t3', [dict(p, lon=-100.763) for p in make_points(10)])
+        self.assertEqual(10, len(self.store.query_bbox('14N', 434000.0, 4415000.0, 436000.0, 4416000.0)['ts']))
+        self.assertListEqual(['t1'], sorted(set(self.store.query_bbox('13N', 434000.0, 4415000.0, 436000.0, 4416000.0, columns=['track'])['track'].tolist())))
+
+    def test_add_replaces(self):
+        self.store.add('t1', [dict(make_points(1)[0], alt=0)])
+        self.assertEqual(500, self.store.tracks()[0][1])
+        self.assertEqual(0, self.store.query_range('t1', 1518711415, 1518711415)['alt'][0])
+
+    def test_sink(self):
+        Stream.create(make_points(250, ts=1518900000)).sink(self.store.sink('t3', buffer_size=100))
+        self.assertEqual(('t3', 250, 1518900000, 1518900249), self.store.tracks()[2])
+
+    def test_sink_tracked(self):
+        points = make_points(30, ts=1518900000)
+        points[10][undertest.TRACK_KEY] = 'a'
+        points[20][undertest.TRACK_KEY] = 'b'
+        Stream.create(points).sink(self.store.sink('t3', buffer_size=15))
+        self.assertListEqual([('a', 10, 1518900010, 1518900019), ('b', 10, 1518900020, 1518900029), ('t3', 10, 1518900000, 1518900009)],
+            [t for t in self.store.tracks() if t[0] not in ('t1', 't2')])
+
+    def test_no_coords(self):
+        self.store.add('t3', [{ 'ts': 1, 'lat': 39.8856, 'lon': -105.763 }])
+        self.assertIsNone(self.store.query_range('t3', 0, 2)['x'][0])
+
+
+class TestSchemaVersion(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'points.db')
+
+    def test_version(self):
+        undertest.PointStore(self.path).close()
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(undertest.SCHEMA_VERSION, conn.execute('PRAGMA user_version').fetchone()[0])
+        conn.close()
+
+    def test_migrate_unversioned(self):
+        # A store made before the schema was versioned, with no zone
+        conn = sqlite3.connect(self.path)
+        conn.executescript('''
+            CREATE TABLE points (track TEXT NOT NULL, ts INTEGER NOT NULL, lat INTEGER, lon INTEGER, x REAL, y REAL, spd INTEGER, alt INTEGER, tx INTEGER, ty INTEGER, PRIMARY KEY (track, ts)) WITHOUT ROWID;
+            CREATE INDEX points_tile ON points (tx, ty);
+            INSERT INTO points VALUES ('t1', 1518711415, 398856, -1057630, 434760.0, 4415344.0, 1800, 2776, 434, 4415);
+        ''')
+        conn.commit()
+        conn.close()
+
+        with undertest.PointStore(self.path) as store:
+            self.assertEqual(1, len(store.query_bbox('13N', 434000.0, 4415000.0, 435000.0, 4416000.0)['ts']))
+            store.add('t1', make_points(2))
+            self.assertEqual(2, store.tracks()[0][1])
+
+    def test_migrate_unversioned_real(self):
+        # The first stores held latitude, longitude and speed as REAL plain units
+        conn = sqlite3.connect(self.path)
+        conn.executescript('''
+            CREATE TABLE points (track TEXT NOT NULL, ts INTEGER NOT NULL, lat REAL, lon REAL, x REAL, y REAL, spd REAL, alt INTEGER, tx INTEGER, ty INTEGER, PRIMARY KEY (track, ts)) WITHOUT ROWID;
+            CREATE INDEX points_tile ON points (tx, ty);
+            INSERT INTO points VALUES ('t1', 1518711415, 39.8856, -105.763, 434760.0, 4415344.0, 1.8, 2776, 434, 4415);
+            INSERT INTO points VALUES ('t1', 1518711416, 39.8857, -105.763, NULL, NULL, 1.9, 2775, NULL, NULL);
+        ''')
+        conn.commit()
+        conn.close()
+
+        with undertest.PointStore(self.path) as store:
+            columns = store.query_range('t1', 0, 2000000000, columns=['lat', 'lon', 'spd', 'zone'])
+            self.assertListEqual([39.8856, 39.8857], columns['lat'].tolist())
+            self.assertListEqual([-105.763, -105.763], columns['lon'].tolist())
+            self.assertListEqual([1.8, 1.9], columns['spd'].tolist())
+            self.assertListEqual(['13N', None], columns['zone'].tolist())
+            self.assertEqual(1, len(store.query_bbox('13N', 434000.0, 4415000.0, 435000.0, 4416000.0)['ts']))
+
+        conn = sqlite3.connect(self.path)
+        self.assertEqual(('integer', 'integer', 'integer'), conn.execute('SELECT typeof(lat), typeof(lon), typeof(spd) FROM points LIMIT 1').fetchone())
+        self.assertEqual(undertest.SCHEMA_VERSION, conn.execute('PRAGMA user_version').fetchone()[0])
+        conn.close()
+
+    def test_refuse_later_version(self):
+        conn = sqlite3.connect(self.path)
+        conn.execute(f'PRAGMA user_version = {undertest.SCHEMA_VERSION + 1}')
+        conn.close()
+        with self.assertRaises(ValueError):
+            undertest.PointStore(self.path)
@@ -0,0 +1,213 @@
+import tracemalloc
+import unittest
+from ski.processor import enrich_point, linear_interpolate
+from ski.utils import MovingWindow
+import ski.stream as undertest
+from support import make_points
+
+
+class TestStream(unittest.TestCase):
+
+    def test_create_from_list(self):
+        self.assertListEqual([2, 4, 6], list(undertest.Stream.create([1, 2, 3]).map(lambda x: x * 2)))
+
+    def test_pipe(self):
+        self.assertListEqual([1, 3], list(undertest.Stream.create([1, 2, 3]).pipe(lambda it: (x for x in it if x % 2))))
+
+
+class TestStreamBatch(unittest.TestCase):
+
+    def test_batch(self):
+        self.assertListEqual([[1, 2], [3, 4], [5]], list(undertest.Stream.create(range(1, 6)).batch(2)))
+
+    def test_unbatch(self):
+        self.assertListEqual([1, 2, 3, 4, 5], list(undertest.Stream.create(range(1, 6)).batch(2).unbatch()))
+
+    def test_unbatch_not_batched(self):
+        self.assertListEqual([1, 2, 3], list(undertest.Stream.create(range(1, 4)).unbatch()))
+
+    def test_rebatch(self):
+        self.assertListEqual([[1, 2, 3], [4, 5]], list(undertest.Stream.create(range(1, 6)).batch(2).batch(3)))
+
+    def test_map_per_element(self):
+        self.assertListEqual([[2, 4], [6]], list(undertest.Stream.create([1, 2, 3]).batch(2).map(lambda x: x * 2)))
+
+    def test_map_batch(self):
+        self.assertListEqual([3, 3], list(undertest.Stream.create([1, 2, 3]).batch(2).map_batch(lambda c: [sum(c)]).unbatch()))
+
+    def test_map_batch_not_batched(self):
+        self.assertRaises(ValueError, lambda: undertest.Stream.create([1, 2, 3]).map_batch(lambda c: [sum(c)]))
+
+    def test_pipe_batched(self):
+        self.assertListEqual([[1, 3], [5]], list(undertest.Stream.create(range(1, 7)).batch(2).pipe(lambda it: (x for x in it if x % 2))))
+
+    def test_stateful_stages_across_chunks(self):
+        window = MovingWindow(2)
+        expected = list(undertest.Stream.create(make_points(150, gap_every=3)).pipe(linear_interpolate).map(lambda p: enrich_point(window, p)))
+
+        window = MovingWindow(2)
+        result = list(undertest.Stream.create(make_points(150, gap_every=3)).batch(7).pipe(linear_interpolate).map(lambda p: enrich_point(window, p)).unbatch())
+
+        self.assertEqual(149, len(result))
+        self.assertListEqual(expected, result)
+
+
+def double(x):
+    return x * 2
+
+
+def fail_on_three(x):
+    if x == 3:
+        raise ValueError('three')
+    return x
+
+
+class TestStreamParallelMap(unittest.TestCase):
+
+    def test_parallel_map_thread(self):
+        result = undertest.Stream.create(range(1000)).parallel_map(double, workers=4, executor='thread', chunksize=10)
+        self.assertListEqual([x * 2 for x in range(1000)], list(result))
+
+    def test_parallel_map_process(self):
+        result = undertest.Stream.create(range(1000)).parallel_map(double, workers=2, executor='process', chunksize=100)
+        self.assertListEqual([x * 2 for x in range(1000)], list(result))
+
+    def test_parallel_map_batched(self):
+        result = undertest.Stream.create(range(5)).batch(2).parallel_map(double, workers=2, executor='thread')
+        self.assertListEqual([[0, 2], [4, 6], [8]], list(result))
+
+    def test_parallel_map_error_has_item(self):
+        result = undertest.Stream.create(range(10)).parallel_map(fail_on_three, workers=2, executor='thread', chunksize=2)
+        with self.assertRaises(undertest.StreamError) as cm:
+            list(result)
+        self.assertEqual(3, cm.exception.item)
+        self.assertIsInstance(cm.exception.__cause__, ValueError)
+
+    def test_parallel_map_process_error_has_item(self):
+        result = undertest.Stream.create(range(10)).parallel_map(fail_on_three, workers=2, executor='process', chunksize=2)
+        with self.assertRaises(undertest.StreamError) as cm:
+            list(result)
+        self.assertEqual(3, cm.exception.item)
+
+    def test_parallel_map_shared_pool(self):
+        from concurrent.futures import ThreadPoolExecutor
+        with ThreadPoolExecutor(max_workers=2) as pool:
+            first = undertest.Stream.create(range(100)).parallel_map(double, workers=2, chunksize=10, pool=pool)
+            second = undertest.Stream.create(range(50)).parallel_map(double, workers=2, chunksize=10, pool=pool)
+            self.assertListEqual([x * 2 for x in range(100)], list(first))
+            self.assertListEqual([x * 2 for x in range(50)], list(second))
+
+    def test_parallel_map_stateful(self):
+        self.assertRaises(ValueError, lambda: undertest.Stream.create([]).parallel_map(enrich_point))
+
+    def test_parallel_map_unknown_executor(self):
+        self.assertRaises(ValueError, lambda: undertest.Stream.create([]).parallel_map(double, executor='fibre'))
+
+
+class TestStreamProfiler(unittest.TestCase):
+
+    def test_map_counts(self):
+        profiler = undertest.Profiler()
+        list(undertest.Stream.create(range(10), profiler).map(lambda x: x if x % 2 else None, name='odd'))
+        stage = profiler.stages[0]
+        self.assertEqual('odd', stage.name)
+        self.assertEqual(10, stage.counter)
+        self.assertEqual(10, stage.items_in)
+        self.assertEqual(5, stage.items_out)
+
+    def test_pipe_counts(self):
+        profiler = undertest.Profiler()
+        list(undertest.Stream.create(make_points(30, gap_every=3), profiler).pipe(linear_interpolate))
+        stage = profiler.stages[0]
+        self.assertEqual('linear_interpolate', stage.name)
+        self.assertEqual(20, stage.items_in)
+        self.assertEqual(29, stage.items_out)
+
+    def test_map_batch_counts(self):
+        profiler = undertest.Profiler()
+        list(undertest.Stream.create(range(10), profiler).batch(4).map_batch(lambda c: c[:1], name='first'))
+        stage = profiler.stages[0]
+        self.assertEqual(3, stage.counter)
+        self.assertEqual(10, stage.items_in)
+        self.assertEqual(3, stage.items_out)
+
+    def test_map_batch_generator_profiled(self):
+        profiler = undertest.Profiler()
+        result = list(undertest.Stream.create(range(10), profiler).batch(4).map_batch(lambda c: (x * 2 for x in c), name='double').unbatch())
+        self.assertListEqual([x * 2 for x in range(10)], result)
+        self.assertEqual(10, profiler.stages[0].items_out)
+
+    def test_all_stages_profiled(self):
+        profiler = undertest.Profiler()
+        list(undertest.Stream.create(range(10), profiler).map(double).pipe(lambda it: it, name='pass').parallel_map(double, workers=2, executor='thread'))
+        self.assertListEqual(['double', 'pass', 'double'], [s.name for s in profiler.stages])
+        self.assertListEqual([10, 10, 10], [s.items_out for s in profiler.stages])
+
+    def test_memory(self):
+        profiler = undertest.Profiler(trace_memory=True)
+        list(undertest.Stream.create(range(10), profiler).map(lambda x: [0] * 1000))
+        self.assertGreater(profiler.stages[0].mem_delta, 0)
+        self.assertIn('ALLOC KiB', profiler.report())
+        tracemalloc.stop()
+
+    def test_report(self):
+        profiler = undertest.Profiler()
+        list(undertest.Stream.create(range(10), profiler).map(double))
+        report = profiler.report().splitlines()
+        self.assertEqual(2, len(report))
+        self.assertTrue(report[1].startswith('double'))
+
+
+class TestPrefetch(unittest.TestCase):
+
+    def test_prefetch(self):
+        self.assertListEqual(list(range(100)), list(undertest.prefetch(range(100), 4)))
+
+    def test_prefetch_error(self):
+        def fail():
+            yield 1
+            raise ValueError('fail')
+        with self.assertRaises(ValueError):
+            list(undertest.prefetch(fail()))
+
+    def test_prefetch_close_early(self):
+        read = []
+        prefetched = undertest.prefetch((read.append(x) or x for x in range(100)), 2)
+        self.assertEqual(0, next(prefetched))
+        prefetched.close()
+        self.assertLess(len(read), 100)
+
+
+class TestStreamTee(unittest.TestCase):
+
+    def test_tee_passes_through(self):
+        seen = []
+        self.assertListEqual([1, 2, 3], list(undertest.Stream.create([1, 2, 3]).tee(seen.append)))
+        self.assertListEqual([1, 2, 3], seen)
+
+    def test_tee_batched(self):
+        seen = []
+        self.assertListEqual([[1, 2], [3]], list(undertest.Stream.create([1, 2, 3]).batch(2).tee(seen.append)))
+        self.assertListEqual([1, 2, 3], seen)
+
+    def test_sink_multiple(self):
+        first, second = [], []
+        self.assertEqual(3, undertest.Stream.create([1, 2, 3]).sink(first.append, second.append))
+        self.assertListEqual([1, 2, 3], first)
+        self.assertListEqual([1, 2, 3], second)
+
+    def test_sink_buffered(self):
+        batches = []
+        closed = []
+        sink = undertest.Sink(batches.append, buffer_size=2, close=lambda: closed.append(True))
+        self.assertEqual(5, undertest.Stream.create(range(5)).sink(sink))
+        self.assertListEqual([[0, 1], [2, 3], [4]], batches)
+        self.assertListEqual([True], closed)
+
+    def test_sink_batched_stream(self):
+        seen = []
+        self.assertEqual(5, undertest.Stream.create(range(5)).batch(2).sink(seen.append))
+        self.assertListEqual([0, 1, 2, 3, 4], seen)
+
+    def test_sink_empty(self):
+        self.assertEqual(0, undertest.Stream.create([]).sink())
@@ -0,0 +1,49 @@
+"""
+  Helpers shared by the tests.
+"""
+
+import contextlib
+import os
+import time
+import unittest
+from ski.point import Point
+
+
+def make_points(count:int, ts:int=1518711415, gap_at:int=None, gap_every:int=None, **values) -> list:
+    """
+    Make a track of `count` points a second apart, heading north and descending a metre a second.
+    Pass a value, or a function of the point's index, to replace a field; None leaves the field out.
+    `gap_at` leaves a gap of 100 seconds before that point; `gap_every` leaves out the last point of every `gap_every`, so there are gaps to interpolate.
+    """
+    fields = {'lat': lambda i: 39.8856 + i * 0.0001, 'lon': -105.763, 'x': 434760, 'y': 4415344, 'spd': 1.8, 'alt': lambda i: 2776 - i}
+    fields.update(values)
+
+    points = []
+    for i in range(count):
+        if gap_every and i % gap_every == gap_every - 1:
+            continue
+        point = Point(ts=ts + i + (100 if gap_at is not None and i >= gap_at else 0))
+        for k, v in fields.items():
+            if v is not None:
+                point[k] = v(i) if callable(v) else v
+        points.append(point)
+    return points
+
+
+@contextlib.contextmanager
+def local_timezone(name:str):
+    """Run with the local time zone set to `name`, as if the tests were run with TZ set. Skips the test where time zones cannot be set."""
+    if not hasattr(time, 'tzset'):
+        raise unittest.SkipTest('Local time zone cannot be set on this platform')
+
+    tz = os.environ.get('TZ')
+    os.environ['TZ'] = name
+    time.tzset()
+    try:
+        yield
+    finally:
+        if tz is None:
+            del os.environ['TZ']
+        else:
+            os.environ['TZ'] = tz
+        time.tzset()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+import numpy as np
+import ski.trackfile as undertest
+from ski.stream import Stream
+from support import make_points
+
+# Points varying in every column, with steps of several sizes
+VALUES = { 'x': lambda i: 434760 + i, 'y': lambda i: 4415344 - i // 2, 'alt': lambda i: 2776 - i // 10, 'd': 1.3 }
+
+
+class TestVarints(unittest.TestCase):
+
+    def test_encode(self):
+        self.assertEqual(bytes([0x02, 0x01, 0xac, 0x02]), undertest.encode_varints([1, -1, 150]))
+
+    def test_round_trip(self):
+        values = [0, 1, -1, 63, -64, 64, 300, -300, 2 ** 40, -2 ** 40, 2 ** 62, -2 ** 62]
+        self.assertListEqual(values, undertest.decode_varints(undertest.encode_varints(values)).tolist())
+
+    def test_empty(self):
+        self.assertEqual(b'', undertest.encode_varints([]))
+        self.assertEqual(0, len(undertest.decode_varints(b'')))
+
+
+class TestTrackFile(unittest.TestCase):
+
+    def setUp(self):
+        self.path = os.path.join(tempfile.mkdtemp(), 'track.trk')
+
+    def write(self, points, **kwargs):
+        with undertest.TrackWriter(self.path, block_size=100, **kwargs) as writer:
+            for p in points:
+                writer.write(p)
+        return undertest.TrackReader(self.path)
+
+    def test_round_trip(self):
+        points = make_points(250, **VALUES)
+        with self.write(points) as reader:
+            expected = [{ k: v for k, v in p.items() if k != 'd' } for p in points]
+            self.assertListEqual(expected, list(reader))
+
+    def test_compression(self):
+        for compression in ('zlib', 'lzma'):
+            with self.write(make_points(250, **VALUES), compression=compression) as reader:
+                self.assertEqual(compression, reader.header['compression'])
+                self.assertEqual(250, sum(1 for _ in reader))
+
+    def test_unknown_compression(self):
+        with self.assertRaises(ValueError):
+            undertest.TrackWriter(self.path, compression='zip')
+
+    def test_header(self):
+        with self.write(make_points(10, **VALUES), zone='13S') as reader:
+            self.assertEqual('13S', reader.header['zone'])
+            self.assertEqual(1518711415, reader.header['start'])
+            self.assertEqual(434760, reader.header['origin']['x'])
+            self.assertEqual(398856, reader.header['origin']['lat'])
+            self.assertListEqual(['ts', 'lat', 'lon', 'x', 'y', 'spd', 'alt'], reader.columns)
+
+    def test_header_zone(self):
+        with self.write(make_points(10, **VALUES)) as reader:
+            self.assertEqual('13N', reader.header['zone'])
+
+    def test_columns(self):
+        with self.write(make_points(10, **VALUES), columns=['ts', 'alt']) as reader:
+            self.assertEqual({ 'ts': 1518711415, 'alt': 2776 }, next(iter(reader)))
+
+    def test_index(self):
+        with self.write(make_points(250, **VALUES)) as reader:
+            self.assertListEqual([(1518711415, 1518711514, 100), (1518711515, 1518711614, 100), (1518711615, 1518711664, 50)], [(e[0], e[1], e[3]) for e in reader.index])
+            block = reader.read_block(2)
+            self.assertEqual(1518711615, block['ts'][0])
+            self.assertEqual(434960, block['x'][0])
+
+    def test_columns_between(self):
+        with self.write(make_points(250, **VALUES)) as reader:
+            columns = reader.columns_between(1518711510, 1518711520)
+            np.testing.assert_array_equal(np.arange(1518711510, 1518711521), columns['ts'])
+            self.assertEqual(0, len(reader.columns_between(0, 1)['ts']))
+
+    def test_empty(self):
+        with self.write([]) as reader:
+            self.assertListEqual([], list(reader))
+            self.assertListEqual([], reader.index)
+
+    def test_incomplete(self):
+        writer = undertest.TrackWriter(self.path, block_size=100)
+        for p in make_points(150, **VALUES):
+            writer.write(p)
+        writer._file.close()
+        with undertest.TrackReader(self.path) as reader:
+            self.assertEqual(100, sum(1 for _ in reader))
+            with self.assertRaises(ValueError):
+                reader.index
+
+    def test_not_track_file(self):
+        with open(self.path, 'wb') as f:
+            f.write(b'{}')
+        with self.assertRaises(ValueError):
+            undertest.TrackReader(self.path)
+
+    def test_sink(self):
+        writer = undertest.TrackWriter(self.path, block_size=100)
+        Stream.create(make_points(150, **VALUES)).sink(writer.sink())
+        with undertest.TrackReader(self.path) as reader:
+            self.assertEqual(150, sum(1 for _ in reader))
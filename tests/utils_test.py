@@ -1,5 +1,6 @@
 import unittest
 import ski.utils as undertest
+from ski.point import Point
 from datetime import datetime
 from json import dumps
 from zoneinfo import ZoneInfo
@@ -11,11 +12,23 @@ class TestDateAwareJsonEncoder(unittest.TestCase):
         self.assertEqual('2023-02-01T12:01:02+00:00', undertest.DateAwareJSONEncoder().default(dt))
         self.assertEqual('{"date": "2023-02-01T12:01:02+00:00"}', dumps({ 'date' : dt }, cls=undertest.DateAwareJSONEncoder))
 
+    def test_default_with_point(self):
+        point = Point(ts=1518711415, lat=39.8856, dt=datetime(2018, 2, 15, 16, 16, 55))
+        self.assertEqual('{"ts": 1518711415, "lat": 39.8856, "dt": "2018-02-15T16:16:55"}', dumps(point, cls=undertest.DateAwareJSONEncoder))
+
     def test_default_with_string(self):
         self.assertRaises(TypeError, lambda: undertest.DateAwareJSONEncoder().default('test'))
         self.assertEqual('{"str": "test"}', dumps({ 'str' : 'test' }, cls=undertest.DateAwareJSONEncoder))
 
 
+class TestIsoUtc(unittest.TestCase):
+
+    def test_iso_utc(self):
+        self.assertEqual('2018-02-15T16:16:55Z', undertest.iso_utc(1518711415))
+        self.assertEqual('1970-01-01T00:00:00Z', undertest.iso_utc(0))
+        self.assertEqual('2100-01-01T00:00:00Z', undertest.iso_utc(4102444800))
+
+
 class TestMovingWindow(unittest.TestCase):
 
     def test_average_empty_window(self):